@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document, QueryHistory
+from .models import Conversation, ConversationTurn, Document, QueryHistory
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
@@ -17,4 +17,15 @@ class QueryHistoryAdmin(admin.ModelAdmin):
     def query_text_short(self, obj):
         return obj.query_text[:50] + '...' if len(obj.query_text) > 50 else obj.query_text
     
-    query_text_short.short_description = 'Query'
\ No newline at end of file
+    query_text_short.short_description = 'Query'
+
+class ConversationTurnInline(admin.TabularInline):
+    model = ConversationTurn
+    fields = ('query_text', 'response_text', 'reused_context', 'timestamp')
+    readonly_fields = ('timestamp',)
+    extra = 0
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'updated_at')
+    inlines = (ConversationTurnInline,)
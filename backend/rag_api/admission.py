@@ -0,0 +1,339 @@
+"""Admission control for the query endpoints.
+
+Each query holds Gemini, Cohere and a worker thread for seconds at a
+time, so under a spike letting every request through only makes every
+request slow. ``query_admission`` bounds the work per process instead:
+
+- at most ``QUERY_MAX_IN_FLIGHT`` queries run at once
+- up to ``QUERY_QUEUE_SIZE`` more wait for a slot, first come first served,
+  each for at most ``QUERY_QUEUE_TIMEOUT`` seconds
+- everything else is rejected straight away with ``AdmissionRejected``,
+  which the views turn into a ``503`` with a ``Retry-After`` header
+
+Admitted queries then run with no more concurrency than the limit, so
+their latency stays close to that of an idle server. Per-client rate
+limits are handled separately by ``utils.throttles.QueryRateThrottle``.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+from .metrics import ADMISSION_REJECTIONS, QUERIES_IN_FLIGHT, QUERIES_QUEUED, STAGE_DURATION
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Weight of the latest query in the moving average of time a slot is held
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a query cannot be admitted; carries the Retry-After hint."""
+    
+    def __init__(self, message: str, reason: str, retry_after: int):
+        """Initialize with the reason ("queue_full" or "queue_timeout") and seconds to wait."""
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued query: the event that wakes it and, for async callers, its loop."""
+    
+    __slots__ = ("event", "loop", "granted")
+    
+    def __init__(self, event, loop=None):
+        self.event = event
+        self.loop = loop
+        self.granted = False
+
+
+class AdmissionController:
+    """Bounds in-flight queries with a short FIFO wait queue.
+    
+    A slot freed while queries are waiting is handed straight to the
+    oldest one, so a new arrival can never jump the queue. Sync views wait
+    on a thread event; async views wait on their event loop without
+    holding a thread.
+    """
+    
+    def __init__(self, max_in_flight: Optional[int] = None, queue_size: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        """Initialize the controller; limits left as None are read from config."""
+        self._max_in_flight = max_in_flight
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._in_flight = 0
+        self._service_time = None
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+    
+    @property
+    def max_in_flight(self) -> int:
+        """Queries allowed to run at once (0 for no limit)."""
+        return config.query_max_in_flight if self._max_in_flight is None else self._max_in_flight
+    
+    @property
+    def queue_size(self) -> int:
+        """Queries allowed to wait for a slot."""
+        return config.query_queue_size if self._queue_size is None else self._queue_size
+    
+    @property
+    def queue_timeout(self) -> float:
+        """Seconds a query may wait for a slot."""
+        return config.query_queue_timeout if self._queue_timeout is None else self._queue_timeout
+    
+    def _enter(self, waiter_factory) -> Optional[_Waiter]:
+        """Take a free slot, or queue a waiter. Must be called with the lock held.
+        
+        Returns:
+            None if a slot was taken, otherwise the queued waiter.
+        
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        limit = self.max_in_flight
+        if limit <= 0 or (self._in_flight < limit and not self._waiters):
+            self._in_flight += 1
+            self.admitted += 1
+            self._update_gauges()
+            return None
+        
+        if len(self._waiters) >= self.queue_size:
+            raise self._rejection("queue_full")
+        
+        waiter = waiter_factory()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        return waiter
+    
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Take a waiter that stopped waiting out of the queue.
+        
+        Returns:
+            True if it was granted a slot in the meantime, which it now holds.
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self._update_gauges()
+            return False
+    
+    def _rejection(self, reason: str) -> AdmissionRejected:
+        """Count a rejection and build its exception with a Retry-After estimate."""
+        self.rejected[reason] += 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        
+        # Time for the queries ahead of a retry to drain through the slots
+        limit = max(self.max_in_flight, 1)
+        service_time = self._service_time or 1.0
+        retry_after = max(1, math.ceil(service_time * (len(self._waiters) + 1) / limit))
+        
+        logger.warning(f"Rejected query ({reason}): {self._in_flight} running, {len(self._waiters)} waiting")
+        return AdmissionRejected(
+            f"Server is busy ({self._in_flight} queries running, {len(self._waiters)} waiting); "
+            f"retry after {retry_after}s",
+            reason,
+            retry_after
+        )
+    
+    def _update_gauges(self) -> None:
+        """Publish the in-flight and queued counts. Called with the lock held."""
+        QUERIES_IN_FLIGHT.set(self._in_flight)
+        QUERIES_QUEUED.set(len(self._waiters))
+    
+    def acquire(self) -> None:
+        """Take a slot, waiting in the queue if all are busy.
+        
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        start = time.perf_counter()
+        with self._lock:
+            waiter = self._enter(lambda: _Waiter(threading.Event()))
+        if waiter is None:
+            return
+        
+        if not waiter.event.wait(self.queue_timeout) and not self._withdraw(waiter):
+            with self._lock:
+                raise self._rejection("queue_timeout")
+        STAGE_DURATION.observe(time.perf_counter() - start, pipeline="query", stage="admission")
+    
+    async def acquire_async(self) -> None:
+        """Take a slot from an async view, waiting on the event loop if all are busy.
+        
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enter(lambda: _Waiter(asyncio.Event(), loop))
+        if waiter is None:
+            return
+        
+        try:
+            await asyncio.wait_for(waiter.event.wait(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._withdraw(waiter):
+                with self._lock:
+                    raise self._rejection("queue_timeout")
+        except asyncio.CancelledError:
+            # The client went away; give back a slot granted just before
+            if self._withdraw(waiter):
+                self.release()
+            raise
+        STAGE_DURATION.observe(time.perf_counter() - start, pipeline="query", stage="admission")
+    
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the oldest waiting query if there is one.
+        
+        Args:
+            held_seconds: How long the slot was held, for the Retry-After estimate
+        """
+        with self._lock:
+            if held_seconds is not None:
+                if self._service_time is None:
+                    self._service_time = held_seconds
+                else:
+                    self._service_time += SERVICE_TIME_SMOOTHING * (held_seconds - self._service_time)
+            
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    if waiter.loop is None:
+                        waiter.event.set()
+                    else:
+                        waiter.loop.call_soon_threadsafe(waiter.event.set)
+                except RuntimeError:
+                    # The waiter's event loop has closed; try the next one
+                    continue
+                waiter.granted = True
+                self.admitted += 1
+                self._update_gauges()
+                return
+            
+            self._in_flight -= 1
+            self._update_gauges()
+    
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold a slot for the duration of a ``with`` block."""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+    
+    @asynccontextmanager
+    async def admit_async(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of an ``async with`` block."""
+        await self.acquire_async()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get the limits, current load and admission counts."""
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "queue_size": self.queue_size,
+                "queue_timeout": self.queue_timeout,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "service_time": round(self._service_time, 3) if self._service_time is not None else None,
+            }
+
+
+class _AdmittedBody:
+    """A streaming response body that holds an admission slot until it is closed."""
+    
+    def __init__(self, iterable: Iterable, controller: AdmissionController):
+        """Wrap a body whose slot has already been acquired from ``controller``."""
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._controller = controller
+        self._start = time.perf_counter()
+        self._released = False
+        self._release_lock = threading.Lock()
+    
+    def close(self) -> None:
+        """Close the wrapped body and release the slot, once."""
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        except ValueError:
+            # A step is still running in a pool thread; the generator is dropped instead
+            pass
+        finally:
+            self._controller.release(time.perf_counter() - self._start)
+
+
+class AdmittedStream(_AdmittedBody):
+    """Synchronous streaming body, for WSGI.
+    
+    Django closes the body when the response finishes or the client goes
+    away, even if it was never iterated, so the slot is always released.
+    """
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        return next(self._iterator)
+
+
+def _next_step(iterator: Iterator) -> Tuple[bool, Any]:
+    """Advance a synchronous iterator, returning (finished, item)."""
+    try:
+        return False, next(iterator)
+    except StopIteration:
+        return True, None
+
+
+class AsyncAdmittedStream(_AdmittedBody):
+    """Asynchronous streaming body over a synchronous one, for ASGI.
+    
+    Django reads a synchronous body under ASGI by collecting it into a list
+    first, so nothing would reach the client before the answer finished.
+    Here each step of the wrapped body runs on the stream pool and is sent
+    as soon as it is produced. The slot is released when iteration ends,
+    or, if the client disconnects, when the response task is cancelled or
+    the abandoned body is finalized.
+    """
+    
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        from .executors import run_stream
+        
+        try:
+            while True:
+                finished, item = await run_stream(_next_step, self._iterator)
+                if finished:
+                    return
+                yield item
+        finally:
+            self.close()
+
+
+# Process-wide admission control for the query endpoints
+query_admission = AdmissionController()
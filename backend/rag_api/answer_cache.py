@@ -0,0 +1,232 @@
+"""Semantic answer cache for the RAG system.
+
+Answers are reused when a new query's embedding is close enough (cosine
+similarity at or above ``ANSWER_CACHE_THRESHOLD``) to a recent query that
+was answered against the same index version. The cache is backed by
+``QueryHistory`` rows, which store the query embedding, index version and
+sources, and held in each process as a small in-memory matrix that is
+topped up from the database every few seconds so workers see each other's
+answers.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.utils import timezone
+
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def encode_embedding(embedding: List[float]) -> bytes:
+    """Pack an embedding as float32 bytes for storage in QueryHistory."""
+    return array("f", embedding).tobytes()
+
+
+class SemanticAnswerCache:
+    """In-memory nearest-neighbour index over recent QueryHistory answers."""
+    
+    def __init__(self, threshold: Optional[float] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[int] = None, refresh_interval: Optional[int] = None):
+        """Initialize an empty cache; entries are loaded from the database on first use."""
+        self.threshold = threshold if threshold is not None else config.answer_cache_threshold
+        self.max_entries = max_entries or config.answer_cache_size
+        self.ttl = ttl if ttl is not None else config.answer_cache_ttl
+        self.refresh_interval = refresh_interval if refresh_interval is not None else config.answer_cache_refresh
+        
+        self._lock = threading.Lock()
+        self._index_version = None
+        self._vectors = None
+        self._entries = []
+        self._history_ids = set()
+        self._last_id = 0
+        self._last_refresh = 0.0
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _normalize(embedding):
+        """Return the embedding as a unit float32 vector, or None for a zero vector."""
+        import numpy as np
+        
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def lookup(self, query_embedding: List[float], index_version: str) -> Optional[Dict[str, Any]]:
+        """Find a cached answer for a query embedding.
+        
+        Returns:
+            The cached entry (history_id, query_text, response, sources,
+            similarity) or None on a miss.
+        """
+        vector = self._normalize(query_embedding)
+        self._sync(index_version)
+        
+        with self._lock:
+            best = None
+            if vector is not None and self._entries and vector.shape[0] == self._vectors.shape[1]:
+                similarities = self._vectors @ vector
+                position = int(similarities.argmax())
+                entry = self._entries[position]
+                if similarities[position] >= self.threshold and not self._expired(entry):
+                    best = {**entry, "similarity": float(similarities[position])}
+            
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        return best
+    
+    def add(self, history_id: int, query_text: str, query_embedding: List[float],
+            response: str, sources: List[Dict[str, Any]], index_version: str) -> None:
+        """Add a freshly generated answer to this process's cache."""
+        vector = self._normalize(query_embedding)
+        if vector is None:
+            return
+        
+        with self._lock:
+            if index_version != self._index_version:
+                # The entry belongs to an index this process has not loaded (yet)
+                return
+            self._append(vector, {
+                "history_id": history_id,
+                "query_text": query_text,
+                "response": response,
+                "sources": sources,
+                "timestamp": timezone.now(),
+            })
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit, miss and size statistics for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": config.answer_cache_enabled,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "index_version": self._index_version,
+        }
+    
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        """Check whether an entry is older than the cache TTL."""
+        return bool(self.ttl) and entry["timestamp"] < timezone.now() - timedelta(seconds=self.ttl)
+    
+    def _append(self, vector, entry: Dict[str, Any]) -> None:
+        """Append one entry. Must be called with the lock held."""
+        self._extend(vector[None, :], [entry])
+    
+    def _extend(self, vectors, entries: List[Dict[str, Any]]) -> None:
+        """Append rows in one copy, evicting the oldest beyond ``max_entries``.
+        
+        Must be called with the lock held. Entries already cached (e.g. added
+        by this process while the rows were being read) are skipped.
+        """
+        import numpy as np
+        
+        keep = [
+            position for position, entry in enumerate(entries)
+            if entry["history_id"] not in self._history_ids
+            and (self._vectors is None or vectors.shape[1] == self._vectors.shape[1])
+        ]
+        if not keep:
+            return
+        if len(keep) < len(entries):
+            vectors = vectors[keep]
+            entries = [entries[position] for position in keep]
+        
+        self._vectors = vectors if self._vectors is None else np.concatenate([self._vectors, vectors])
+        self._entries.extend(entries)
+        self._history_ids.update(entry["history_id"] for entry in entries)
+        
+        if len(self._entries) > self.max_entries:
+            overflow = len(self._entries) - self.max_entries
+            for evicted in self._entries[:overflow]:
+                self._history_ids.discard(evicted["history_id"])
+            self._vectors = self._vectors[overflow:]
+            self._entries = self._entries[overflow:]
+    
+    def _sync(self, index_version: str) -> None:
+        """Reload on an index version change, or top up with rows other processes wrote.
+        
+        The rows are read and the matrix is built outside the lock, so
+        lookups in other threads keep using the current entries meanwhile.
+        Only one thread refreshes at a time; the others skip it.
+        """
+        with self._lock:
+            if index_version != self._index_version:
+                self._index_version = index_version
+                self._vectors = None
+                self._entries = []
+                self._history_ids = set()
+                self._last_id = 0
+            elif time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = time.monotonic()
+            last_id = self._last_id
+        
+        vectors, entries = self._load(index_version, last_id)
+        if not entries:
+            return
+        
+        with self._lock:
+            if index_version != self._index_version:
+                # Another request moved the cache to a newer index meanwhile
+                return
+            self._extend(vectors, entries)
+            self._last_id = max(self._last_id, entries[-1]["history_id"])
+        logger.info(f"Loaded {len(entries)} cached answers for index version {index_version}")
+    
+    def _load(self, index_version: str, last_id: int):
+        """Read answers for an index version newer than ``last_id``.
+        
+        Returns:
+            The unit vectors as one matrix (or None) and their entries, oldest first.
+        """
+        import numpy as np
+        from .models import QueryHistory
+        
+        rows = QueryHistory.objects.filter(
+            index_version=index_version,
+            served_from_cache=False,
+            query_embedding__isnull=False,
+            id__gt=last_id
+        )
+        if self.ttl:
+            rows = rows.filter(timestamp__gte=timezone.now() - timedelta(seconds=self.ttl))
+        
+        # Newest rows first so the limit keeps the most recent answers
+        rows = rows.order_by('-id').values(
+            'id', 'query_text', 'response_text', 'sources', 'timestamp', 'query_embedding'
+        )[:self.max_entries]
+        
+        vectors = []
+        entries = []
+        for row in reversed(list(rows)):
+            vector = self._normalize(np.frombuffer(bytes(row['query_embedding']), dtype=np.float32))
+            if vector is None or (vectors and vector.shape[0] != vectors[0].shape[0]):
+                continue
+            vectors.append(vector)
+            entries.append({
+                "history_id": row['id'],
+                "query_text": row['query_text'],
+                "response": row['response_text'],
+                "sources": row['sources'],
+                "timestamp": row['timestamp'],
+            })
+        
+        return (np.stack(vectors) if vectors else None), entries
+
+
+# Process-wide cache instance
+answer_cache = SemanticAnswerCache()
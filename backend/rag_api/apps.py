@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class RagApiConfig(AppConfig):
+    """App configuration for the RAG API."""
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'rag_api'
+    
+    def ready(self):
+        from .db import configure_sqlite_connection
+        
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='rag_api.configure_sqlite_connection')
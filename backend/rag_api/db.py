@@ -0,0 +1,26 @@
+"""Database connection tuning for the RAG system.
+
+SQLite is tuned per connection, since most pragmas do not persist in the
+database file. ``configure_sqlite_connection`` runs on Django's
+``connection_created`` signal and applies ``settings.SQLITE_PRAGMAS``.
+"""
+
+import logging
+
+from django.conf import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs) -> None:
+    """Apply ``SQLITE_PRAGMAS`` to a new SQLite connection; other databases are left alone."""
+    if connection.vendor != 'sqlite':
+        return
+    
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    
+    logger.debug(f"Applied SQLite pragmas: {', '.join(f'{name}={value}' for name, value in pragmas.items())}")
@@ -0,0 +1,50 @@
+"""Query deadlines for the RAG system.
+
+A query gets one overall time budget, shared by its stages in order:
+embedding the query, searching the vector store and generating the
+answer. Each stage may use its configured share of the time that is left,
+so time a stage does not use rolls over to the stages after it.
+"""
+
+import time
+from typing import Dict, Optional
+
+from .rag_config import config
+
+# Query stages, in the order they run
+STAGES = ("embed", "search", "generate")
+
+
+class Deadline:
+    """An overall time budget for one query, split across its stages."""
+    
+    def __init__(self, seconds: Optional[float] = None, split: Optional[Dict[str, float]] = None):
+        """Start the deadline clock.
+        
+        Args:
+            seconds: Total budget (defaults to ``QUERY_DEADLINE``)
+            split: Relative share of each stage (defaults to ``QUERY_DEADLINE_SPLIT``)
+        """
+        self.seconds = seconds or config.query_deadline
+        self.split = split or config.query_deadline_split
+        self.expires_at = time.monotonic() + self.seconds
+    
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+    
+    def expired(self) -> bool:
+        """Check whether the deadline has passed."""
+        return self.remaining() <= 0
+    
+    def stage_timeout(self, stage: str) -> float:
+        """Seconds a stage may use: its share of the time left among itself and later stages."""
+        later_shares = sum(self.split.get(name, 0) for name in STAGES[STAGES.index(stage):])
+        if not later_shares:
+            return self.remaining()
+        return self.remaining() * self.split.get(stage, 0) / later_shares
+    
+    def check(self, stage: str) -> None:
+        """Raise ``TimeoutError`` if the deadline passed before a stage could start."""
+        if self.expired():
+            raise TimeoutError(f"Query deadline of {self.seconds:g}s exceeded before {stage}")
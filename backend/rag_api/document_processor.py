@@ -1,13 +1,11 @@
 """Document processing module for the RAG system using Docling."""
 
 import os
+import threading
 from pathlib import Path
 from typing import List, Dict, Union, Optional
 from tqdm import tqdm
 
-# Import Docling components
-from docling.document_converter import DocumentConverter
-
 from .rag_config import config
 
 
@@ -45,7 +43,9 @@ class DocumentProcessor:
         self.chunk_size = chunk_size or config.chunk_size
         self.chunk_overlap = chunk_overlap or config.chunk_overlap
         
-        # Initialize Docling converter
+        # Initialize Docling converter; Docling is only imported when a document is processed
+        from docling.document_converter import DocumentConverter
+        
         self.converter = DocumentConverter()
     
     def load_document(self, file_path: Union[str, Path]) -> Union[Document, List[Document]]:
@@ -307,4 +307,23 @@ class DocumentProcessor:
                 raise
                 
         else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
\ No newline at end of file
+            raise ValueError(f"Unsupported file type: {file_extension}")
+
+
+# Shared processor for ingestion, created on first use
+_shared_processor = None
+_shared_processor_lock = threading.Lock()
+
+
+def get_document_processor() -> DocumentProcessor:
+    """Get the process-wide document processor with the configured chunking.
+    
+    Docling loads its models into the converter on first conversion, so
+    sharing one processor means they are loaded once per process.
+    """
+    global _shared_processor
+    if _shared_processor is None:
+        with _shared_processor_lock:
+            if _shared_processor is None:
+                _shared_processor = DocumentProcessor()
+    return _shared_processor
@@ -1,23 +1,40 @@
 """Embedding module for the RAG system using Cohere API."""
 
 import asyncio
+import atexit
+import math
+import re
+import threading
 import time
-from typing import List, Dict, Any, Optional, Union, Tuple
-import cohere
-import numpy as np
+import zlib
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Union, Tuple
 from tqdm import tqdm
-import httpx
 import ssl
 import logging
 
+from .metrics import FALLBACKS, RETRIES
 from .rag_config import config
 from .document_processor import DocumentChunk
 
+if TYPE_CHECKING:
+    import cohere
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def _connection_errors() -> Tuple[type, ...]:
+    """Errors worth retrying: dropped or refused connections, timeouts and TLS failures.
+    
+    httpx is imported here rather than at module load; it is already
+    loaded by the time a Cohere call can fail.
+    """
+    import httpx
+    
+    return (httpx.ReadError, httpx.ConnectError, httpx.TimeoutException, ssl.SSLError)
+
+
 class EmbeddingGenerator:
     """Generates embeddings for document chunks using Cohere API."""
     
@@ -26,13 +43,32 @@ class EmbeddingGenerator:
         self.api_key = api_key or config.cohere_api_key
         self.model = model
         self.max_retries = max_retries
-        self.client = cohere.Client(api_key=self.api_key)
+        self._client = None
+        self._http_client = None
+        self._async_client = None
+        self._async_http_client = None
+        self._async_loop = None
+        self._client_lock = threading.Lock()
         
         # Configure SSL context for better compatibility
         self.ssl_context = ssl.create_default_context()
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
     
+    @property
+    def client(self) -> "cohere.Client":
+        """Cohere client, created on first use and reused for every call."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import cohere
+                    import httpx
+                    
+                    # Our own httpx client, so its connections can be closed on shutdown
+                    self._http_client = httpx.Client()
+                    self._client = cohere.Client(api_key=self.api_key, httpx_client=self._http_client)
+        return self._client
+    
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text."""
         response = self.client.embed(
@@ -42,20 +78,28 @@ class EmbeddingGenerator:
         )
         return response.embeddings[0]
     
-    def _call_with_retry(self, func, *args, **kwargs) -> Any:
-        """Call a function with retry logic for handling connection errors."""
+    def _call_with_retry(self, func, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Call a function with retry logic for handling connection errors.
+        
+        With a ``timeout``, each Cohere call is limited to the time left and
+        ``TimeoutError`` is raised instead of sleeping past it.
+        """
         retry_count = 0
         last_exception = None
+        expires_at = time.monotonic() + timeout if timeout is not None else None
         
         while retry_count < self.max_retries:
             try:
-                return func(*args, **kwargs)
-            except (httpx.ReadError, httpx.ConnectError, httpx.TimeoutException, ssl.SSLError) as e:
+                return func(*args, **self._with_time_left(kwargs, expires_at))
+            except _connection_errors() as e:
                 retry_count += 1
                 wait_time = 2 ** retry_count  # Exponential backoff
                 last_exception = e
                 
                 logger.warning(f"Connection error on attempt {retry_count}/{self.max_retries}: {str(e)}")
+                RETRIES.inc(operation="cohere_embed")
+                if expires_at is not None and time.monotonic() + wait_time >= expires_at:
+                    raise TimeoutError(f"Embedding timed out after {timeout:g}s") from e
                 logger.info(f"Retrying in {wait_time} seconds...")
                 
                 time.sleep(wait_time)
@@ -68,8 +112,94 @@ class EmbeddingGenerator:
         logger.error(f"Failed after {self.max_retries} retries. Last error: {str(last_exception)}")
         raise last_exception
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts in batches with retry logic."""
+    @staticmethod
+    def _with_time_left(kwargs: Dict[str, Any], expires_at: Optional[float]) -> Dict[str, Any]:
+        """Add a Cohere request timeout for the time left before ``expires_at``."""
+        if expires_at is None:
+            return kwargs
+        time_left = max(math.ceil(expires_at - time.monotonic()), 1)
+        return {**kwargs, "request_options": {"timeout_in_seconds": time_left}}
+    
+    @property
+    def async_client(self) -> "cohere.AsyncClient":
+        """Cohere async client for the running event loop, created on first use.
+        
+        Pooled connections belong to the loop that opened them, so the client
+        is replaced when called from another loop; under ASGI there is only
+        one and the client is reused for every call.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            with self._client_lock:
+                if self._async_client is None or self._async_loop is not loop:
+                    import cohere
+                    import httpx
+                    
+                    self._async_http_client = httpx.AsyncClient()
+                    self._async_client = cohere.AsyncClient(api_key=self.api_key,
+                                                            httpx_client=self._async_http_client)
+                    self._async_loop = loop
+        return self._async_client
+    
+    def close(self) -> None:
+        """Close the Cohere clients and their connections.
+        
+        The async client can only be closed on its own event loop; if that
+        loop is running or already closed, its connections go with the loop.
+        """
+        with self._client_lock:
+            http_client, async_http_client, loop = self._http_client, self._async_http_client, self._async_loop
+            self._client = self._http_client = None
+            self._async_client = self._async_http_client = self._async_loop = None
+        
+        if http_client is not None:
+            http_client.close()
+        if async_http_client is not None and not loop.is_closed() and not loop.is_running():
+            try:
+                loop.run_until_complete(async_http_client.aclose())
+            except Exception as e:
+                logger.warning(f"Could not close the Cohere async client: {str(e)}")
+    
+    async def _call_with_retry_async(self, func, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Await a coroutine function with the same retry logic as ``_call_with_retry``."""
+        retry_count = 0
+        last_exception = None
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        
+        while retry_count < self.max_retries:
+            try:
+                call = func(*args, **self._with_time_left(kwargs, expires_at))
+                if expires_at is None:
+                    return await call
+                return await asyncio.wait_for(call, max(expires_at - time.monotonic(), 0))
+            except asyncio.TimeoutError as e:
+                raise TimeoutError(f"Embedding timed out after {timeout:g}s") from e
+            except _connection_errors() as e:
+                retry_count += 1
+                wait_time = 2 ** retry_count  # Exponential backoff
+                last_exception = e
+                
+                logger.warning(f"Connection error on attempt {retry_count}/{self.max_retries}: {str(e)}")
+                RETRIES.inc(operation="cohere_embed")
+                if expires_at is not None and time.monotonic() + wait_time >= expires_at:
+                    raise TimeoutError(f"Embedding timed out after {timeout:g}s") from e
+                logger.info(f"Retrying in {wait_time} seconds...")
+                
+                await asyncio.sleep(wait_time)
+            except Exception as e:
+                # For non-connection errors, don't retry
+                logger.error(f"Non-connection error: {str(e)}")
+                raise
+        
+        # If we've exhausted retries, raise the last exception
+        logger.error(f"Failed after {self.max_retries} retries. Last error: {str(last_exception)}")
+        raise last_exception
+    
+    def generate_embeddings(self, texts: List[str], input_type: str = "search_document") -> List[List[float]]:
+        """Generate embeddings for multiple texts in batches with retry logic.
+        
+        Use ``input_type="search_query"`` to embed a batch of queries.
+        """
         # Cohere has rate limits, so we'll process in batches
         batch_size = 96  # Cohere's recommended batch size
         all_embeddings = []
@@ -83,13 +213,14 @@ class EmbeddingGenerator:
                     self.client.embed,
                     texts=batch_texts,
                     model=self.model,
-                    input_type="search_document"
+                    input_type=input_type
                 )
                 all_embeddings.extend(response.embeddings)
             except Exception as e:
                 logger.error(f"Failed to generate embeddings for batch {i//batch_size + 1}: {str(e)}")
                 # Return empty embeddings for this batch to allow partial processing
                 logger.warning("Using zero vectors as fallback for failed embeddings")
+                FALLBACKS.inc(kind="zero_embedding")
                 # Create zero vectors with the same dimensions as the model (1024 for embed-english-v3.0)
                 embedding_dim = 1024
                 for _ in range(len(batch_texts)):
@@ -97,22 +228,50 @@ class EmbeddingGenerator:
         
         return all_embeddings
     
-    def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate embedding for a search query with retry logic."""
+    def generate_query_embedding(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Generate embedding for a search query with retry logic.
+        
+        Raises:
+            TimeoutError: If ``timeout`` seconds pass before Cohere answers.
+        """
         try:
             response = self._call_with_retry(
                 self.client.embed,
                 texts=[query],
                 model=self.model,
-                input_type="search_query"
+                input_type="search_query",
+                timeout=timeout
             )
             return response.embeddings[0]
+        except TimeoutError:
+            # A zero vector would only retrieve arbitrary chunks
+            raise
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {str(e)}")
             logger.warning("Using zero vector as fallback for query embedding")
+            FALLBACKS.inc(kind="zero_embedding")
             # Return a zero vector with the same dimensions as the model
             return [0.0] * 1024  # 1024 is the dimension for embed-english-v3.0
     
+    async def generate_query_embedding_async(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Generate embedding for a search query without blocking the event loop."""
+        try:
+            response = await self._call_with_retry_async(
+                self.async_client.embed,
+                texts=[query],
+                model=self.model,
+                input_type="search_query",
+                timeout=timeout
+            )
+            return response.embeddings[0]
+        except TimeoutError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to generate query embedding: {str(e)}")
+            logger.warning("Using zero vector as fallback for query embedding")
+            FALLBACKS.inc(kind="zero_embedding")
+            return [0.0] * 1024  # 1024 is the dimension for embed-english-v3.0
+    
     async def generate_embeddings_async(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings asynchronously for better performance."""
         # This is a placeholder for async implementation
@@ -121,17 +280,138 @@ class EmbeddingGenerator:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.generate_embeddings, texts)
     
-    def embed_document_chunks(self, chunks: List[DocumentChunk]) -> Dict[str, Any]:
-        """Generate embeddings for document chunks and return with metadata."""
+    def embed_document_chunks(self, chunks: List[DocumentChunk], id_prefix: str = "chunk") -> Dict[str, Any]:
+        """Generate embeddings for document chunks and return with metadata.
+        
+        Chunk IDs are ``{id_prefix}_{i}``; use a per-document prefix so chunks
+        from different documents never collide in the vector store.
+        """
         texts = [chunk.content for chunk in chunks]
         embeddings = self.generate_embeddings(texts)
         
         # Create a dictionary with embeddings and metadata
         embedded_chunks = {
-            "ids": [f"chunk_{i}" for i in range(len(chunks))],
+            "ids": [f"{id_prefix}_{i}" for i in range(len(chunks))],
             "embeddings": embeddings,
             "metadatas": [chunk.metadata for chunk in chunks],
             "documents": texts
         }
         
-        return embedded_chunks
\ No newline at end of file
+        return embedded_chunks
+
+
+class LocalEmbeddingGenerator(EmbeddingGenerator):
+    """Deterministic offline stand-in for the Cohere embedding API.
+    
+    Every word, Persian or English, is hashed to a signed position in the
+    vector, so texts that share words land close together and searches
+    still return related chunks. Each call waits ``latency`` seconds plus
+    ``per_text_latency`` per text to approximate a Cohere round trip.
+    """
+    
+    def __init__(self, latency: Optional[float] = None, per_text_latency: Optional[float] = None,
+                 dimension: Optional[int] = None):
+        """Initialize the stand-in from ``LOCAL_EMBEDDING`` unless overridden."""
+        # The Cohere clients are created on first use, so the stand-in never makes any
+        super().__init__(model="local")
+        settings = config.local_embedding
+        self.latency = latency if latency is not None else settings['LATENCY']
+        self.per_text_latency = per_text_latency if per_text_latency is not None else settings['PER_TEXT_LATENCY']
+        self.dimension = dimension or settings['DIMENSION']
+    
+    def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for a single text."""
+        time.sleep(self._call_seconds(1))
+        return self._vector(text)
+    
+    def generate_embeddings(self, texts: List[str], input_type: str = "search_document") -> List[List[float]]:
+        """Generate embeddings in Cohere-sized batches, one simulated call per batch."""
+        batch_size = 96
+        all_embeddings = []
+        for i in range(0, len(texts), batch_size):
+            batch_texts = texts[i:i + batch_size]
+            time.sleep(self._call_seconds(len(batch_texts)))
+            all_embeddings.extend(self._vector(text) for text in batch_texts)
+        return all_embeddings
+    
+    def generate_query_embedding(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Generate embedding for a search query.
+        
+        Raises:
+            TimeoutError: If the simulated call takes longer than ``timeout``.
+        """
+        duration = self._call_seconds(1)
+        if timeout is not None and duration > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Embedding timed out after {timeout:g}s")
+        time.sleep(duration)
+        return self._vector(query)
+    
+    async def generate_query_embedding_async(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Generate embedding for a search query without blocking the event loop."""
+        duration = self._call_seconds(1)
+        if timeout is not None and duration > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Embedding timed out after {timeout:g}s")
+        await asyncio.sleep(duration)
+        return self._vector(query)
+    
+    def _call_seconds(self, text_count: int) -> float:
+        """Simulated duration of one embedding call."""
+        return self.latency + self.per_text_latency * text_count
+    
+    def _vector(self, text: str) -> List[float]:
+        """Hash the words of a text into a unit vector."""
+        import numpy as np
+        
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = zlib.crc32(word.encode("utf-8"))
+            vector[(digest >> 1) % self.dimension] += 1.0 if digest & 1 else -1.0
+        
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+
+# Generators shared by every request in the process, by configuration
+_generators = {}
+_generators_lock = threading.Lock()
+_atexit_registered = False
+
+
+def get_embedding_generator(api_key: Optional[str] = None, model: Optional[str] = None) -> EmbeddingGenerator:
+    """Return the configured embedding generator ("cohere" or "local").
+    
+    The generator is created once per process and configuration, so its
+    Cohere clients and their connection pools are reused by every request
+    and closed when the process exits. ``api_key`` and ``model`` only apply
+    to the Cohere backend.
+    """
+    global _atexit_registered
+    
+    key = (config.embedding_backend, api_key or config.cohere_api_key, model)
+    if key not in _generators:
+        with _generators_lock:
+            if key not in _generators:
+                if config.embedding_backend == "local":
+                    generator = LocalEmbeddingGenerator()
+                elif config.embedding_backend == "cohere":
+                    generator = EmbeddingGenerator(api_key=api_key, **({"model": model} if model else {}))
+                else:
+                    raise ValueError(f"Unknown embedding backend '{config.embedding_backend}', "
+                                     f"expected 'cohere' or 'local'")
+                _generators[key] = generator
+                
+                if not _atexit_registered:
+                    atexit.register(close_embedding_generators)
+                    _atexit_registered = True
+    return _generators[key]
+
+
+def close_embedding_generators() -> None:
+    """Close and forget the cached generators; registered to run at exit."""
+    with _generators_lock:
+        generators = list(_generators.values())
+        _generators.clear()
+    for generator in generators:
+        generator.close()
@@ -0,0 +1,63 @@
+"""Bounded thread pools for blocking work on the async query path.
+
+The async views never call Chroma or the Django ORM on the event loop.
+That work is handed to one of two small, fixed-size pools, so a burst of
+requests queues up for a thread instead of starting unbounded threads,
+and slow database writes cannot starve vector searches (or the reverse).
+A third pool advances the synchronous event streams of the SSE endpoint
+one step at a time when it is served under ASGI.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from django.db import close_old_connections
+
+from .rag_config import config
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Return the named process-wide pool ("vector_store", "database" or "stream"), creating it on first use."""
+    if name not in _executors:
+        with _executors_lock:
+            if name not in _executors:
+                max_workers = {
+                    "vector_store": config.async_vector_store_workers,
+                    "database": config.async_database_workers,
+                    "stream": config.async_stream_workers,
+                }[name]
+                _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+    return _executors[name]
+
+
+async def run_vector_store(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking vector store work on the vector store pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor("vector_store"), functools.partial(func, *args, **kwargs))
+
+
+async def run_database(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking ORM work on the database pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor("database"), functools.partial(_with_connection_cleanup, func, *args, **kwargs))
+
+
+async def run_stream(func: Callable, *args, **kwargs) -> Any:
+    """Run one blocking step of an event stream on the stream pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor("stream"), functools.partial(_with_connection_cleanup, func, *args, **kwargs))
+
+
+def _with_connection_cleanup(func: Callable, *args, **kwargs) -> Any:
+    """Call ``func``, letting Django recycle the pool thread's connection like it does per request."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
@@ -0,0 +1,292 @@
+"""Generation backends for the RAG system.
+
+``TextGenerator`` builds the prompt and hands it to a backend, which turns
+it into text. ``GeminiBackend`` calls Google's Gemini API. ``LocalBackend``
+is a deterministic stand-in that answers from the prompt's own context with
+configurable latency, token rate and error injection, so the query path can
+be load-tested offline and Gemini latency can be separated from our own
+overhead. Either backend can be paired with a fallback that takes over when
+the primary one fails.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics import FALLBACKS
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class GenerationBackend(ABC):
+    """Interface for turning a prompt into text."""
+    
+    name = "base"
+    
+    @abstractmethod
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response for a prompt.
+        
+        Raises:
+            TimeoutError: If no response arrived within ``timeout`` seconds.
+        """
+    
+    @abstractmethod
+    async def generate_async(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response without blocking the event loop."""
+    
+    @abstractmethod
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Generate the response, yielding text fragments as they are produced."""
+
+
+class GeminiBackend(GenerationBackend):
+    """Generates text with Google's Gemini API."""
+    
+    name = "gemini"
+    
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 generation_config: Optional[Dict[str, Any]] = None):
+        """Initialize the Gemini model."""
+        import google.generativeai as genai
+        
+        self.api_key = api_key or config.gemini_api_key
+        self.model = model or config.generation_model
+        self.generation_config = generation_config or {
+            "temperature": 0.7,
+            "top_p": 0.95,
+            "top_k": 40,
+            "max_output_tokens": 1024,
+        }
+        
+        # Configure the Gemini API
+        genai.configure(api_key=self.api_key)
+        self.gemini_model = genai.GenerativeModel(
+            model_name=self.model,
+            generation_config=self.generation_config
+        )
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response for a prompt."""
+        from google.api_core.exceptions import DeadlineExceeded
+        
+        try:
+            response = self.gemini_model.generate_content(
+                prompt,
+                request_options={"timeout": timeout} if timeout is not None else None
+            )
+        except DeadlineExceeded as e:
+            raise TimeoutError(f"Gemini did not answer within {timeout:g}s") from e
+        return response.text
+    
+    async def generate_async(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response without blocking the event loop."""
+        try:
+            response = await asyncio.wait_for(self.gemini_model.generate_content_async(prompt), timeout)
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"Gemini did not answer within {timeout:g}s") from e
+        return response.text
+    
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Generate the response, yielding text fragments as Gemini produces them."""
+        for chunk in self.gemini_model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. only safety ratings) raise on .text
+                continue
+            if text:
+                yield text
+
+
+class LocalBackend(GenerationBackend):
+    """Deterministic offline stand-in for a generation API.
+    
+    The response is built from the prompt's context, so the same prompt
+    always gets the same answer. Timing follows a simple model: ``latency``
+    seconds before the first token, then ``token_rate`` tokens per second.
+    A seeded fraction ``error_rate`` of calls fails before producing output.
+    """
+    
+    name = "local"
+    
+    def __init__(self, latency: Optional[float] = None, token_rate: Optional[float] = None,
+                 response_tokens: Optional[int] = None, error_rate: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """Initialize the stand-in from ``LOCAL_GENERATION`` unless overridden."""
+        settings = config.local_generation
+        self.latency = latency if latency is not None else settings['LATENCY']
+        self.token_rate = token_rate if token_rate is not None else settings['TOKEN_RATE']
+        self.response_tokens = response_tokens or settings['RESPONSE_TOKENS']
+        self.error_rate = error_rate if error_rate is not None else settings['ERROR_RATE']
+        
+        self._random = random.Random(seed if seed is not None else settings['SEED'])
+        self._random_lock = threading.Lock()
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response for a prompt."""
+        tokens = self._start(prompt)
+        duration = self.latency + self._token_seconds(len(tokens))
+        if timeout is not None and duration > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Local generation takes {duration:g}s, over the {timeout:g}s timeout")
+        time.sleep(duration)
+        return "".join(tokens)
+    
+    async def generate_async(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the complete response without blocking the event loop."""
+        tokens = self._start(prompt)
+        duration = self.latency + self._token_seconds(len(tokens))
+        if timeout is not None and duration > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Local generation takes {duration:g}s, over the {timeout:g}s timeout")
+        await asyncio.sleep(duration)
+        return "".join(tokens)
+    
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Generate the response, yielding one token at the configured rate."""
+        tokens = self._start(prompt)
+        time.sleep(self.latency)
+        for token in tokens:
+            time.sleep(self._token_seconds(1))
+            yield token
+    
+    def _start(self, prompt: str) -> List[str]:
+        """Apply error injection, then build the response tokens."""
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise RuntimeError("Injected local generation error")
+        return self._response_tokens(prompt)
+    
+    def _token_seconds(self, count: int) -> float:
+        """Time taken to produce ``count`` tokens."""
+        return count / self.token_rate if self.token_rate else 0.0
+    
+    def _response_tokens(self, prompt: str) -> List[str]:
+        """Build a cited answer from the text of the prompt's context blocks."""
+        question = re.search(r"User question: (.*)", prompt)
+        context = re.search(r"Context information:\n(.*?)\n\nUser question:", prompt, re.DOTALL)
+        
+        words = []
+        if context:
+            # Skip the "Document n (...)" header lines of the context blocks
+            words = [
+                word
+                for line in context.group(1).splitlines()
+                if line.strip() and not line.startswith("Document ") and line.strip() != "---"
+                for word in line.split()
+            ]
+        
+        if not words:
+            return ["I ", "don't ", "have ", "enough ", "information ", "to ", "answer ", "this ", "question."]
+        
+        opening = f"Regarding \"{question.group(1).strip()}\": " if question else ""
+        body = words[:max(self.response_tokens - len(opening.split()), 1)]
+        tokens = [f"{word} " for word in opening.split()] + [f"{word} " for word in body]
+        tokens.append("[Document 1]")
+        return tokens
+
+
+class FallbackBackend(GenerationBackend):
+    """Uses a primary backend, switching to a fallback for calls where it fails."""
+    
+    def __init__(self, primary: GenerationBackend, fallback: GenerationBackend):
+        """Initialize with the primary and fallback backends."""
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+    
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate with the primary backend, or the fallback if it fails.
+        
+        A timeout is not retried on the fallback: the time is already spent.
+        """
+        try:
+            return self.primary.generate(prompt, timeout=timeout)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            self._record_fallback(e)
+            return self.fallback.generate(prompt, timeout=timeout)
+    
+    async def generate_async(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Asynchronous version of ``generate``."""
+        try:
+            return await self.primary.generate_async(prompt, timeout=timeout)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            self._record_fallback(e)
+            return await self.fallback.generate_async(prompt, timeout=timeout)
+    
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Stream from the primary backend, or the fallback if it fails before the first fragment.
+        
+        A failure after text has been sent is raised, since the client
+        already has part of the primary answer.
+        """
+        started = False
+        try:
+            for text in self.primary.generate_stream(prompt):
+                started = True
+                yield text
+        except Exception as e:
+            if started:
+                raise
+            self._record_fallback(e)
+            yield from self.fallback.generate_stream(prompt)
+    
+    def _record_fallback(self, error: Exception) -> None:
+        """Log and count a switch to the fallback backend."""
+        FALLBACKS.inc(kind="generation_backend")
+        logger.warning(f"{self.primary.name} generation failed, using {self.fallback.name}: {str(error)}")
+
+
+BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+
+def create_backend(name: str, **kwargs) -> GenerationBackend:
+    """Create a backend by name ("gemini" or "local")."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown generation backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+# Backends shared by every request in the process, by configuration
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_generation_backend(api_key: Optional[str] = None, model: Optional[str] = None) -> GenerationBackend:
+    """Return the configured backend, wrapped with the configured fallback if any.
+    
+    The backend is created once per process and configuration, so the Gemini
+    client is reused and the local stand-in's error injection draws from one
+    seeded sequence rather than restarting it on every request.
+    ``api_key`` and ``model`` only apply to a Gemini backend.
+    """
+    key = (config.generation_backend, config.generation_fallback, api_key, model)
+    if key not in _backends:
+        with _backends_lock:
+            if key not in _backends:
+                def build(name):
+                    if name == GeminiBackend.name:
+                        return GeminiBackend(api_key=api_key, model=model)
+                    return create_backend(name)
+                
+                backend = build(config.generation_backend)
+                if config.generation_fallback and config.generation_fallback != config.generation_backend:
+                    backend = FallbackBackend(backend, build(config.generation_fallback))
+                _backends[key] = backend
+    return _backends[key]
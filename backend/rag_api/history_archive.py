@@ -0,0 +1,180 @@
+"""Query history retention and archival for the RAG system.
+
+Rows past the retention policy (older than ``HISTORY_RETENTION_DAYS``, or
+beyond the newest ``HISTORY_RETENTION_ROWS``) are moved out of the
+``QueryHistory`` table into zstd-compressed Parquet files partitioned by
+day::
+    
+    <archive dir>/date=2025-03-15/part-<first id>-<last id>.parquet
+
+The layout is Hive-style, so the archive can be queried offline as one
+dataset with pyarrow, pandas, DuckDB or Spark (see ``read_archive``).
+Each batch is written before its rows are deleted: an interrupted run can
+leave a batch both archived and in the table, which the next run archives
+again under the same file name, never loses.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from django.db import transaction
+from django.utils import timezone
+
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def archive_cutoff(retention_days: Optional[int] = None, retention_rows: Optional[int] = None) -> Optional[datetime]:
+    """Get the timestamp before which history rows are archived, or None if nothing is due.
+    
+    Args:
+        retention_days: Keep rows newer than this many days (0 for no age limit)
+        retention_rows: Keep at most this many newest rows (0 for no row limit)
+    """
+    from .models import QueryHistory
+    
+    retention_days = config.history_retention_days if retention_days is None else retention_days
+    retention_rows = config.history_retention_rows if retention_rows is None else retention_rows
+    
+    cutoffs = []
+    if retention_days:
+        cutoffs.append(timezone.now() - timedelta(days=retention_days))
+    if retention_rows:
+        # Timestamp of the oldest row to keep; ties with it are kept as well
+        boundary = list(
+            QueryHistory.objects.order_by('-timestamp').values_list('timestamp', flat=True)[
+                retention_rows - 1:retention_rows
+            ]
+        )
+        if boundary:
+            cutoffs.append(boundary[0])
+    
+    return max(cutoffs) if cutoffs else None
+
+
+def archive_history(cutoff: Optional[datetime], output_dir: Optional[Union[str, Path]] = None,
+                    batch_size: int = 5000, dry_run: bool = False) -> Dict[str, Any]:
+    """Move history rows older than ``cutoff`` into the Parquet archive.
+    
+    Args:
+        cutoff: Archive rows with an earlier timestamp (None archives nothing)
+        output_dir: Archive root (defaults to ``HISTORY_ARCHIVE_DIRECTORY``)
+        batch_size: Rows read, written and deleted per batch
+        dry_run: Only count the rows that would be archived
+    
+    Returns:
+        Dict with the number of rows archived and the files written.
+    """
+    from .models import QueryHistory
+    
+    if cutoff is None:
+        return {"archived": 0, "files": []}
+    
+    rows = QueryHistory.objects.filter(timestamp__lt=cutoff)
+    if dry_run:
+        return {"archived": rows.count(), "files": []}
+    
+    output_dir = Path(output_dir or config.history_archive_directory)
+    archived = 0
+    files = []
+    
+    while True:
+        batch = list(rows.order_by('id').values(
+            'id', 'timestamp', 'query_text', 'response_text', 'sources', 'index_version', 'served_from_cache'
+        )[:batch_size])
+        if not batch:
+            break
+        
+        ids = [row['id'] for row in batch]
+        document_ids = {}
+        Link = QueryHistory.documents_retrieved.through
+        for history_id, document_id in Link.objects.filter(queryhistory_id__in=ids).values_list(
+            'queryhistory_id', 'document_id'
+        ):
+            document_ids.setdefault(history_id, []).append(document_id)
+        
+        # One file per day in the batch
+        days = {}
+        for row in batch:
+            row['document_ids'] = sorted(document_ids.get(row['id'], []))
+            days.setdefault(row['timestamp'].date(), []).append(row)
+        for day, day_rows in sorted(days.items()):
+            files.append(_write_partition(output_dir, day, day_rows))
+        
+        # Remove rows only once their files are complete
+        with transaction.atomic():
+            Link.objects.filter(queryhistory_id__in=ids).delete()
+            QueryHistory.objects.filter(id__in=ids).delete()
+        
+        archived += len(batch)
+        logger.info(f"Archived {archived} query history rows")
+    
+    return {"archived": archived, "files": [str(path) for path in files]}
+
+
+def _write_partition(output_dir: Path, day, rows) -> Path:
+    """Write one day's rows of a batch to a Parquet file in that day's partition."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("query_text", pa.string()),
+        ("response_text", pa.string()),
+        ("sources", pa.string()),
+        ("document_ids", pa.list_(pa.int64())),
+        ("index_version", pa.string()),
+        ("served_from_cache", pa.bool_()),
+    ])
+    table = pa.Table.from_pylist([
+        {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "query_text": row["query_text"],
+            "response_text": row["response_text"],
+            # Sources vary in shape, so they are kept as JSON text
+            "sources": json.dumps(row["sources"], ensure_ascii=False),
+            "document_ids": row["document_ids"],
+            "index_version": row["index_version"],
+            "served_from_cache": row["served_from_cache"],
+        }
+        for row in rows
+    ], schema=schema)
+    
+    partition_dir = output_dir / f"date={day.isoformat()}"
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    path = partition_dir / f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet"
+    
+    # Write then rename so readers never see a partial file
+    temp_path = path.with_name(f"{path.name}.tmp")
+    pq.write_table(table, temp_path, compression="zstd")
+    temp_path.replace(path)
+    
+    return path
+
+
+def read_archive(archive_dir: Optional[Union[str, Path]] = None, filter=None):
+    """Open the archive as a pyarrow dataset for offline queries.
+    
+    Args:
+        archive_dir: Archive root (defaults to ``HISTORY_ARCHIVE_DIRECTORY``)
+        filter: Optional pyarrow expression, e.g. ``pc.field("date") >= "2025-03-01"``
+    
+    Returns:
+        A ``pyarrow.Table`` with a ``date`` column taken from the partitions.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    
+    dataset = ds.dataset(
+        archive_dir or config.history_archive_directory,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+    )
+    return dataset.to_table(filter=filter)
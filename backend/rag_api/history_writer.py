@@ -0,0 +1,210 @@
+"""Background query history writer for the RAG system.
+
+Query history bookkeeping (the ``QueryHistory`` row, mapping retrieved
+chunks back to ``Document`` rows and the M2M links) happens after the
+response is sent. Request threads hand a record to a queue; one writer
+thread drains it in batches and inserts them with ``bulk_create``, so
+response latency no longer depends on database write contention.
+
+Set ``HISTORY_WRITE_MODE`` to "sync" to write records inline instead
+(e.g. for management commands or tests that read history back at once).
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.db import close_old_connections, connection, transaction
+
+from .metrics import time_stage
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def write_history_batch(records: List[Dict[str, Any]]) -> List[Any]:
+    """Insert a batch of history records with their document links.
+    
+    Each record holds ``query_text``, ``response_text``, ``sources``,
+    ``query_embedding``, ``encoded_embedding``, ``index_version`` and either
+    the retrieved chunk ``metadatas`` or, for answer cache hits, the
+    ``cached_from`` history ID whose documents are reused.
+    
+    Returns:
+        The created QueryHistory objects.
+    """
+    # One transaction, so a failed batch can be retried without inserting its rows twice
+    with time_stage("query", "history_write"), transaction.atomic():
+        return _write_history_batch(records)
+
+
+def _write_history_batch(records: List[Dict[str, Any]]) -> List[Any]:
+    """Insert a batch of history records (see ``write_history_batch``)."""
+    from .answer_cache import answer_cache
+    from .models import QueryHistory
+    from .services.query_service import QueryService
+    
+    histories = [
+        QueryHistory(
+            query_text=record["query_text"],
+            response_text=record["response_text"],
+            query_embedding=record["encoded_embedding"],
+            index_version=record["index_version"],
+            sources=record["sources"],
+            served_from_cache=record.get("cached_from") is not None
+        )
+        for record in records
+    ]
+    
+    if connection.features.can_return_rows_from_bulk_insert:
+        histories = QueryHistory.objects.bulk_create(histories)
+    else:
+        # Without RETURNING the batch would come back without primary keys
+        for history in histories:
+            history.save()
+    
+    # Documents linked to reused answers, fetched in one query
+    Link = QueryHistory.documents_retrieved.through
+    cached_from_ids = {record["cached_from"] for record in records if record.get("cached_from") is not None}
+    cached_documents = {}
+    for history_id, document_id in Link.objects.filter(
+        queryhistory_id__in=cached_from_ids
+    ).values_list('queryhistory_id', 'document_id'):
+        cached_documents.setdefault(history_id, set()).add(document_id)
+    
+    links = []
+    for record, history in zip(records, histories):
+        if record.get("cached_from") is not None:
+            document_ids = cached_documents.get(record["cached_from"], set())
+        else:
+            document_ids = QueryService.resolve_document_ids(record.get("metadatas", []))
+        links.extend(Link(queryhistory_id=history.pk, document_id=document_id) for document_id in document_ids)
+    
+    if links:
+        Link.objects.bulk_create(links, ignore_conflicts=True)
+    
+    # Fresh answers become available to the answer cache once their rows are committed
+    if config.answer_cache_enabled:
+        def add_to_answer_cache():
+            for record, history in zip(records, histories):
+                if record.get("cached_from") is None and record["query_embedding"]:
+                    answer_cache.add(
+                        history.pk, record["query_text"], record["query_embedding"],
+                        record["response_text"], record["sources"], record["index_version"]
+                    )
+        
+        transaction.on_commit(add_to_answer_cache)
+    
+    return histories
+
+
+class HistoryWriter:
+    """Queue plus a single writer thread that stores history records in batches."""
+    
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 max_queue_size: Optional[int] = None):
+        """Initialize the writer; the thread starts on the first submitted record."""
+        self.batch_size = batch_size or config.history_batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else config.history_flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size or config.history_queue_size)
+        
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+        
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+    
+    def submit(self, record: Dict[str, Any]) -> None:
+        """Queue a record for writing; never blocks the caller."""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"History queue full, dropped record for query: {record['query_text'][:50]}")
+    
+    def _ensure_started(self) -> None:
+        """Start the writer thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.flush)
+                    self._atexit_registered = True
+    
+    def _run(self) -> None:
+        """Writer loop: wait for a record, gather a batch, write it."""
+        while not self._stopping.is_set() or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            
+            # Give concurrent requests a moment to join the batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            
+            self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+    
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Write one batch, retrying once (e.g. on a locked SQLite database)."""
+        for attempt in range(2):
+            close_old_connections()
+            try:
+                write_history_batch(batch)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} history records (attempt {attempt + 1}): {str(e)}")
+                time.sleep(0.5)
+        self.failed_batches += 1
+    
+    def flush(self, timeout: float = 10.0) -> None:
+        """Stop accepting work and wait for queued records to be written."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queue and write statistics for this process."""
+        return {
+            "mode": config.history_write_mode,
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+
+# Process-wide writer instance
+history_writer = HistoryWriter()
+
+
+def record_history(record: Dict[str, Any]) -> Optional[Any]:
+    """Store a history record according to ``HISTORY_WRITE_MODE``.
+    
+    Returns:
+        The created QueryHistory in "sync" mode, None in "background" mode.
+    """
+    if config.history_write_mode == "sync":
+        return write_history_batch([record])[0]
+    
+    history_writer.submit(record)
+    return None
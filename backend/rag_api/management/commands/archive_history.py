@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from ...history_archive import archive_cutoff, archive_history
+from ...rag_config import config
+
+
+class Command(BaseCommand):
+    """Enforce the query history retention policy, archiving old rows to Parquet."""
+    help = "Move query history rows past the retention policy into compressed, date-partitioned Parquet files"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Keep rows newer than this many days (default HISTORY_RETENTION_DAYS, 0 for no limit)")
+        parser.add_argument('--rows', type=int, default=None,
+                            help="Keep at most this many newest rows (default HISTORY_RETENTION_ROWS, 0 for no limit)")
+        parser.add_argument('--output-dir', default=None,
+                            help="Archive directory (default HISTORY_ARCHIVE_DIRECTORY)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows archived per batch")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would be archived")
+    
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['days'], options['rows'])
+        if cutoff is None:
+            self.stdout.write("No query history is past the retention policy")
+            return
+        
+        result = archive_history(
+            cutoff,
+            output_dir=options['output_dir'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(f"Would archive {result['archived']} rows older than {cutoff.isoformat()}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {result['archived']} rows older than {cutoff.isoformat()} into {len(result['files'])} files "
+                f"under {options['output_dir'] or config.history_archive_directory}"
+            ))
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from ...models import Document
+from ...vector_store import VectorStore
+
+
+class Command(BaseCommand):
+    """Stamp chunks ingested before document IDs were stored with their Document's primary key."""
+    help = "Add the Document ID to the metadata of chunks that only carry a file name"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', default='documents', help="Base collection name")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records read and updated per page")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without updating")
+    
+    def handle(self, *args, **options):
+        vector_store = VectorStore(collection_name=options['collection'])
+        
+        # File names shared by several documents cannot be resolved safely
+        documents_by_name = {}
+        for document_id, file_name in Document.objects.values_list('id', 'file_name'):
+            documents_by_name.setdefault(file_name.lower(), []).append(document_id)
+        
+        updates = {}
+        unmatched = 0
+        ambiguous = 0
+        for page in vector_store.iter_documents(batch_size=options['batch_size'], include=["metadatas"]):
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                if metadata.get("document_id") is not None:
+                    continue
+                
+                file_name = metadata.get("filename") or Path(metadata.get("source", "")).name
+                matches = documents_by_name.get(file_name.lower(), [])
+                if len(matches) == 1:
+                    updates[chunk_id] = {"document_id": matches[0]}
+                elif matches:
+                    ambiguous += 1
+                else:
+                    unmatched += 1
+        
+        if options['dry_run']:
+            self.stdout.write(f"Would update {len(updates)} chunks")
+        else:
+            updated = vector_store.update_metadata(updates, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Updated {updated} chunks with their document ID"))
+        
+        if unmatched or ambiguous:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {unmatched} chunks with no matching document and "
+                f"{ambiguous} chunks whose file name matches several documents"
+            ))
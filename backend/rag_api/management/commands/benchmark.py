@@ -0,0 +1,413 @@
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...document_processor import get_document_processor
+from ...embedding import get_embedding_generator
+from ...rag_config import config
+from ...services.query_service import QueryService
+from ...text_generation import TextGenerator
+from ...vector_store import VectorStore
+
+# Topic vocabularies of the synthetic corpus, as (English, Persian) word lists
+TOPICS = {
+    "finance": (
+        ["budget", "invoice", "payment", "tax", "revenue", "audit", "expense", "salary"],
+        ["بودجه", "فاکتور", "پرداخت", "مالیات", "درآمد", "حسابرسی", "هزینه", "حقوق"],
+    ),
+    "health": (
+        ["patient", "doctor", "hospital", "treatment", "medicine", "clinic", "diagnosis", "nurse"],
+        ["بیمار", "پزشک", "بیمارستان", "درمان", "دارو", "درمانگاه", "تشخیص", "پرستار"],
+    ),
+    "education": (
+        ["student", "teacher", "school", "exam", "course", "university", "lesson", "grade"],
+        ["دانشجو", "معلم", "مدرسه", "امتحان", "دوره", "دانشگاه", "درس", "نمره"],
+    ),
+    "transport": (
+        ["train", "airport", "ticket", "station", "flight", "route", "driver", "schedule"],
+        ["قطار", "فرودگاه", "بلیط", "ایستگاه", "پرواز", "مسیر", "راننده", "برنامه"],
+    ),
+    "technology": (
+        ["server", "network", "database", "software", "security", "backup", "cloud", "update"],
+        ["سرور", "شبکه", "پایگاه", "نرم‌افزار", "امنیت", "پشتیبان", "ابر", "به‌روزرسانی"],
+    ),
+}
+
+# Common words that pad the sentences of each language
+FILLER = (
+    ["the", "of", "and", "for", "with", "in", "on", "is", "was", "to", "new", "annual", "report", "system"],
+    ["و", "در", "به", "از", "که", "این", "با", "برای", "است", "شد", "جدید", "سالانه", "گزارش", "سامانه"],
+)
+
+# Question templates of each language, filled with two topic words
+QUESTIONS = (
+    ["What does the report say about {} and {}?", "How is the {} related to the {}?"],
+    ["درباره {} و {} چه گفته شده است؟", "{} چه ارتباطی با {} دارد؟"],
+)
+
+# Query stages timed for every benchmark query
+QUERY_STAGES = ("embed", "search", "format", "generate")
+
+
+class Command(BaseCommand):
+    """Benchmark ingestion and querying end to end with the local stand-ins for Cohere and Gemini."""
+    help = (
+        "Generate a synthetic Persian/English corpus, ingest it into a scratch vector store and query it "
+        "at several concurrency levels using the local embedding and generation stand-ins. Reports "
+        "ingest throughput per stage, index size, query p50/p95/p99 and peak memory as JSON"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=100, help="Number of synthetic documents")
+        parser.add_argument('--paragraphs', type=int, default=20, help="Paragraphs per document")
+        parser.add_argument('--queries', type=int, default=50, help="Queries per concurrency level")
+        parser.add_argument('--concurrency', default='1,4,16', help="Comma-separated concurrency levels")
+        parser.add_argument('--shards', type=int, default=None,
+                            help="Vector store shards (defaults to VECTOR_SHARDS)")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the corpus and queries")
+        parser.add_argument('--work-dir', default=None,
+                            help="Keep the corpus and index in this directory instead of a temporary one")
+        parser.add_argument('--output', default='benchmark.json', help="File the JSON results are written to")
+        parser.add_argument('--baseline', default=None,
+                            help="Earlier results to compare against; regressions fail the command")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Relative slowdown allowed against the baseline before failing")
+    
+    def handle(self, *args, **options):
+        concurrency_levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        if not concurrency_levels or min(concurrency_levels) < 1:
+            raise CommandError("--concurrency needs one or more positive integers")
+        
+        started_at = timezone.now()
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        
+        with self._work_dir(options['work_dir']) as work_dir, self._stand_ins():
+            rng = random.Random(options['seed'])
+            memory = {}
+            
+            corpus_dir = work_dir / "corpus"
+            corpus = self._write_corpus(corpus_dir, options['documents'], options['paragraphs'], rng)
+            memory["corpus"] = self._peak_rss_mb()
+            self.stdout.write(f"Wrote {len(corpus)} documents ({sum(corpus.values()) / 1e6:.1f} MB) to {corpus_dir}")
+            
+            vector_store = VectorStore(persist_directory=str(work_dir / "index"), num_shards=options['shards'])
+            ingest = self._ingest(vector_store, corpus)
+            memory["ingest"] = self._peak_rss_mb()
+            self.stdout.write(
+                f"Ingested {ingest['chunks']} chunks in {ingest['seconds']:.1f}s "
+                f"({ingest['chunks_per_second']:.1f} chunks/s)"
+            )
+            
+            index = {
+                "bytes": sum(path.stat().st_size for path in (work_dir / "index").rglob("*") if path.is_file()),
+                "chunks": vector_store.get_collection_stats()["document_count"],
+                "shards": vector_store.num_shards,
+            }
+            
+            queries = []
+            for concurrency in concurrency_levels:
+                texts = [self._question(rng) for _ in range(options['queries'])]
+                level = self._run_queries(vector_store, texts, concurrency)
+                queries.append(level)
+                self.stdout.write(
+                    f"concurrency={concurrency:<4} p50={level['latency_ms']['p50']:.1f}ms "
+                    f"p95={level['latency_ms']['p95']:.1f}ms p99={level['latency_ms']['p99']:.1f}ms "
+                    f"throughput={level['throughput_qps']:.1f} q/s errors={level['errors']}"
+                )
+            memory["query"] = self._peak_rss_mb()
+        
+        results = {
+            "started_at": started_at.isoformat(),
+            "version": self._version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "documents": options['documents'],
+                "paragraphs": options['paragraphs'],
+                "seed": options['seed'],
+                "chunk_size": config.chunk_size,
+                "chunk_overlap": config.chunk_overlap,
+                "top_k_results": config.top_k_results,
+                "hnsw": config.hnsw_settings("documents"),
+                "local_embedding": config.local_embedding,
+                "local_generation": config.local_generation,
+            },
+            "ingest": ingest,
+            "index": index,
+            "queries": queries,
+            "peak_rss_mb": memory,
+        }
+        
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        
+        if baseline is not None:
+            regressions = self._compare(baseline, results, options['tolerance'])
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+    
+    @staticmethod
+    @contextmanager
+    def _work_dir(path):
+        """Use the given directory, or a temporary one removed afterwards."""
+        if path:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            yield Path(path)
+            return
+        
+        with tempfile.TemporaryDirectory(prefix="rag_benchmark_") as temp_dir:
+            yield Path(temp_dir)
+    
+    @staticmethod
+    @contextmanager
+    def _stand_ins():
+        """Switch to the local embedding and generation stand-ins, with caches off, for the run."""
+        overrides = {
+            "embedding_backend": "local",
+            "generation_backend": "local",
+            "generation_fallback": "",
+            "retrieval_cache_enabled": False,
+            "answer_cache_enabled": False,
+        }
+        saved = {name: getattr(config, name) for name in overrides}
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+    
+    @staticmethod
+    def _write_corpus(corpus_dir, count, paragraphs, rng):
+        """Write synthetic English, Persian and mixed-language Markdown documents.
+        
+        Markdown is used because Docling converts it; for a format it does not
+        support, the convert stage would time a failed conversion and the
+        plain-text fallback instead.
+        
+        Returns:
+            Dict mapping each file path to its size in bytes.
+        """
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        corpus = {}
+        for i in range(count):
+            # Alternate English, Persian and documents mixing both
+            languages = [(0,), (1,), (0, 1)][i % 3]
+            topics = rng.sample(sorted(TOPICS), 2)
+            
+            text = []
+            for p in range(paragraphs):
+                language = languages[p % len(languages)]
+                sentences = []
+                for _ in range(rng.randint(3, 6)):
+                    words = [
+                        rng.choice(TOPICS[rng.choice(topics)][language]) if rng.random() < 0.4
+                        else rng.choice(FILLER[language])
+                        for _ in range(rng.randint(8, 16))
+                    ]
+                    sentences.append(" ".join(words) + ".")
+                text.append(" ".join(sentences))
+            
+            # A title and one section per paragraph, so Docling has structure to convert
+            title = " ".join(TOPICS[topic][languages[0]][0] for topic in topics)
+            sections = [f"## {p + 1}\n\n{paragraph}" for p, paragraph in enumerate(text)]
+            path = corpus_dir / f"document_{i:05d}.md"
+            path.write_text(f"# {title}\n\n" + "\n\n".join(sections), encoding="utf-8")
+            corpus[path] = path.stat().st_size
+        return corpus
+    
+    @staticmethod
+    def _question(rng):
+        """Build a question about two words of one topic, in English or Persian."""
+        language = rng.randrange(2)
+        words = rng.sample(TOPICS[rng.choice(sorted(TOPICS))][language], 2)
+        return rng.choice(QUESTIONS[language]).format(*words)
+    
+    @staticmethod
+    def _ingest(vector_store, corpus):
+        """Run each document through convert, chunk, embed and store, timing every stage."""
+        processor = get_document_processor()
+        embedding_generator = get_embedding_generator()
+        stages = {"convert": 0.0, "chunk": 0.0, "embed": 0.0, "store": 0.0}
+        chunk_count = 0
+        
+        def timed(stage, func, *args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            stages[stage] += time.perf_counter() - start
+            return result
+        
+        for document_id, path in enumerate(corpus, start=1):
+            documents = timed("convert", processor.load_document, path)
+            documents = documents if isinstance(documents, list) else [documents]
+            
+            chunks = timed("chunk", processor.process_documents, documents)
+            for chunk in chunks:
+                chunk.metadata["document_id"] = document_id
+            
+            embedded_chunks = timed(
+                "embed", embedding_generator.embed_document_chunks, chunks, id_prefix=f"doc_{document_id}_chunk"
+            )
+            timed("store", vector_store.add_documents, embedded_chunks)
+            chunk_count += len(chunks)
+        
+        seconds = sum(stages.values())
+        total_bytes = sum(corpus.values())
+        return {
+            "documents": len(corpus),
+            "chunks": chunk_count,
+            "bytes": total_bytes,
+            "seconds": seconds,
+            "documents_per_second": len(corpus) / seconds if seconds else 0.0,
+            "chunks_per_second": chunk_count / seconds if seconds else 0.0,
+            "mb_per_second": total_bytes / 1e6 / seconds if seconds else 0.0,
+            "stages": {
+                stage: {
+                    "seconds": stage_seconds,
+                    "chunks_per_second": chunk_count / stage_seconds if stage_seconds else 0.0,
+                }
+                for stage, stage_seconds in stages.items()
+            },
+        }
+    
+    @staticmethod
+    def _query(vector_store, query_text):
+        """Answer one query along the path ``QueryService.process_query`` takes, timing each stage.
+        
+        The answer cache and the history write are left out: the first is
+        disabled for the run and the second happens after the response.
+        """
+        stages = {}
+        
+        start = time.perf_counter()
+        query_embedding = QueryService.embed_query(query_text)
+        stages["embed"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        search_results = QueryService.search(vector_store, query_embedding)
+        stages["search"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        text_generator = TextGenerator()
+        formatted_docs = text_generator.format_search_results(search_results)
+        stages["format"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        text_generator.generate_response(query_text, formatted_docs)
+        stages["generate"] = time.perf_counter() - start
+        
+        return stages
+    
+    def _run_queries(self, vector_store, texts, concurrency):
+        """Run the queries with ``concurrency`` in flight and summarize their latency."""
+        import numpy as np
+        
+        # Warm up the clients and the index before measuring
+        self._query(vector_store, texts[0])
+        
+        def run(query_text):
+            start = time.perf_counter()
+            try:
+                stages = self._query(vector_store, query_text)
+            except Exception as e:
+                self.stderr.write(f"Query failed: {str(e)}")
+                return None
+            return time.perf_counter() - start, stages
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run, texts))
+        wall_seconds = time.perf_counter() - start
+        
+        completed = [outcome for outcome in outcomes if outcome is not None]
+        if not completed:
+            raise CommandError(f"All {len(texts)} queries failed at concurrency {concurrency}")
+        
+        def summary(seconds):
+            milliseconds = np.asarray(seconds) * 1000
+            return {
+                "p50": float(np.percentile(milliseconds, 50)),
+                "p95": float(np.percentile(milliseconds, 95)),
+                "p99": float(np.percentile(milliseconds, 99)),
+                "max": float(milliseconds.max()),
+            }
+        
+        return {
+            "concurrency": concurrency,
+            "queries": len(texts),
+            "errors": len(texts) - len(completed),
+            "seconds": wall_seconds,
+            "throughput_qps": len(completed) / wall_seconds if wall_seconds else 0.0,
+            "latency_ms": summary([latency for latency, _ in completed]),
+            "stages_ms": {stage: summary([stages[stage] for _, stages in completed]) for stage in QUERY_STAGES},
+        }
+    
+    @staticmethod
+    def _peak_rss_mb():
+        """Peak resident memory of this process so far, in MB."""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    
+    @staticmethod
+    def _version():
+        """Current git commit, if the code runs from a checkout."""
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    
+    def _compare(self, baseline, results, tolerance):
+        """Print the change of each headline number against the baseline and return the regressions.
+        
+        Latencies and memory regress when they grow by more than
+        ``tolerance``; throughputs when they drop by more than it.
+        """
+        # (name, baseline value, current value, whether higher is better)
+        checks = [
+            ("ingest chunks/s", baseline["ingest"]["chunks_per_second"], results["ingest"]["chunks_per_second"], True),
+            ("index bytes", baseline["index"]["bytes"], results["index"]["bytes"], False),
+            ("peak RSS MB", max(baseline["peak_rss_mb"].values()), max(results["peak_rss_mb"].values()), False),
+        ]
+        baseline_levels = {level["concurrency"]: level for level in baseline["queries"]}
+        for level in results["queries"]:
+            previous = baseline_levels.get(level["concurrency"])
+            if previous is None:
+                continue
+            name = f"concurrency {level['concurrency']}"
+            checks.append((f"{name} p95 ms", previous["latency_ms"]["p95"], level["latency_ms"]["p95"], False))
+            checks.append((f"{name} q/s", previous["throughput_qps"], level["throughput_qps"], True))
+        
+        regressions = []
+        for name, before, after, higher_is_better in checks:
+            if not before:
+                continue
+            change = (after - before) / before
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            line = f"{name:<28} {before:>12.1f} -> {after:>12.1f} ({change:+.1%})"
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.WARNING(f"{line} REGRESSION"))
+            else:
+                self.stdout.write(line)
+        return regressions
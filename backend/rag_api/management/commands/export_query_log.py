@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ...query_replay import export_query_log
+
+
+class Command(BaseCommand):
+    """Export QueryHistory query texts with their timing for load replay."""
+    help = "Write QueryHistory query texts with their offsets from the first query to a JSON lines file"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="JSON lines file to write")
+        parser.add_argument('--since', default=None, help="Only queries at or after this date or datetime")
+        parser.add_argument('--until', default=None, help="Only queries before this date or datetime")
+        parser.add_argument('--limit', type=int, default=None, help="Only the first N queries of the range")
+    
+    def handle(self, *args, **options):
+        count = export_query_log(
+            options['output'],
+            since=self._parse_time(options['since']),
+            until=self._parse_time(options['until']),
+            limit=options['limit']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} queries to {options['output']}"))
+    
+    @staticmethod
+    def _parse_time(value):
+        """Parse an ISO date or datetime, in the current time zone if it has none."""
+        if not value:
+            return None
+        
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f"Cannot parse '{value}' as a date or datetime")
+            parsed = datetime(date.year, date.month, date.day)
+        
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...vector_store import VectorStore
+from ...vector_snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    """Export the vector store collection to a snapshot directory."""
+    help = "Export the vector store collection (embeddings, texts and metadata) to a snapshot directory"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help="Directory to write the snapshot into")
+        parser.add_argument('--collection', default='documents', help="Collection to export")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records fetched per page")
+    
+    def handle(self, *args, **options):
+        vector_store = VectorStore(collection_name=options['collection'])
+        manifest = export_snapshot(vector_store, options['output_dir'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {manifest['count']} records ({manifest['dimension']} dimensions) to {options['output_dir']}"
+        ))
@@ -0,0 +1,65 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Dependencies that should only load when a request or command needs them
+HEAVY_PACKAGES = ("chromadb", "cohere", "docling", "google", "numpy", "pyarrow", "pandas", "torch")
+
+# Code run in a fresh interpreter for each startup phase
+TARGETS = {
+    "setup": "import django; django.setup()",
+    "urls": "import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns",
+}
+
+# One line of ``python -X importtime`` output: self and cumulative microseconds, then the module name
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+class Command(BaseCommand):
+    """Profile the imports of Django startup in a fresh interpreter."""
+    help = (
+        "Run Django setup (and optionally URL loading) under `python -X importtime` and report the "
+        "total import time, the slowest packages and which heavy dependencies were loaded"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='urls',
+                            help="setup: django.setup() only (what every manage.py command pays); "
+                                 "urls: also import the URL configuration and views, as a worker does")
+        parser.add_argument('--top', type=int, default=15, help="Number of packages to list")
+        parser.add_argument('--check', action='store_true',
+                            help="Fail if any heavy dependency is imported during the target")
+    
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "rag_project.settings")}
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", TARGETS[options['target']]],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Profiling failed:\n{process.stderr[-2000:]}")
+        
+        # Self time per top-level package; cumulative times would count nested imports twice
+        packages = {}
+        for line in process.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                package = match.group(2).split(".")[0]
+                packages[package] = packages.get(package, 0) + int(match.group(1))
+        
+        total = sum(packages.values())
+        self.stdout.write(f"Target '{options['target']}': {total / 1e6:.2f}s importing {len(packages)} packages")
+        for package, microseconds in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<30} {microseconds / 1e3:>9.1f}ms {100 * microseconds / total:>5.1f}%")
+        
+        heavy = sorted(package for package in HEAVY_PACKAGES if package in packages)
+        if not heavy:
+            self.stdout.write(self.style.SUCCESS("No heavy dependencies imported"))
+        elif options['check']:
+            raise CommandError(f"Heavy dependencies imported at startup: {', '.join(heavy)}")
+        else:
+            self.stdout.write(self.style.WARNING(f"Heavy dependencies imported: {', '.join(heavy)}"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...vector_store import VectorStore
+from ...vector_snapshot import import_snapshot, read_manifest
+
+
+class Command(BaseCommand):
+    """Load a snapshot directory into the vector store without re-embedding."""
+    help = "Import a snapshot written by export_vectors into the vector store"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('snapshot_dir', help="Snapshot directory to import")
+        parser.add_argument('--collection', default=None,
+                            help="Target collection (defaults to the collection named in the snapshot)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records added per page")
+        parser.add_argument('--replace', action='store_true',
+                            help="Delete the target collection before importing")
+    
+    def handle(self, *args, **options):
+        try:
+            manifest = read_manifest(options['snapshot_dir'])
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        
+        vector_store = VectorStore(collection_name=options['collection'] or manifest['collection_name'])
+        if options['replace']:
+            vector_store.delete_collection()
+        
+        import_snapshot(vector_store, options['snapshot_dir'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {manifest['count']} records into '{vector_store.collection_name}'"
+        ))
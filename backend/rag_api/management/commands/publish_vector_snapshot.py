@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...rag_config import config
+from ...vector_publish import PublishedIndex, publish_snapshot
+from ...vector_store import VectorStore
+
+
+class Command(BaseCommand):
+    """Publish a read-only copy of the vector store for reader processes."""
+    help = (
+        "Copy the writer's vector store into VECTOR_SNAPSHOT_DIRECTORY and point readers at it. "
+        "Run it once before starting readers, and after import_vectors, rebuild_shard or backfill_document_ids"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', help="Publish directory (defaults to VECTOR_SNAPSHOT_DIRECTORY)")
+        parser.add_argument('--keep', type=int, help="Copies to keep (defaults to VECTOR_SNAPSHOT_KEEP)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records copied per page")
+    
+    def handle(self, *args, **options):
+        if config.vector_store_role == "reader":
+            raise CommandError("Publish from the writer; this process is configured as a vector store reader")
+        
+        version = publish_snapshot(
+            VectorStore(read_only=False),
+            root=options['output_dir'],
+            keep=options['keep'],
+            batch_size=options['batch_size']
+        )
+        if version is None:
+            raise CommandError("The vector store changed while it was being copied; run the command again")
+        
+        published = PublishedIndex(options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f"Published version {version} to {published.path(version)}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...vector_store import VectorStore
+
+
+class Command(BaseCommand):
+    """Rebuild one vector store shard while the others keep serving searches."""
+    help = "Rebuild a single shard's collection from its own records"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('shard', type=int, help="Index of the shard to rebuild")
+        parser.add_argument('--collection', default='documents', help="Base collection name")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records copied per page")
+    
+    def handle(self, *args, **options):
+        vector_store = VectorStore(collection_name=options['collection'])
+        if not 0 <= options['shard'] < vector_store.num_shards:
+            raise CommandError(f"Shard must be between 0 and {vector_store.num_shards - 1}")
+        
+        copied = vector_store.rebuild_shard(options['shard'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt shard '{vector_store.shard_names[options['shard']]}' with {copied} records"
+        ))
@@ -0,0 +1,94 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...query_replay import ENDPOINTS, read_query_log, replay_queries
+
+
+class Command(BaseCommand):
+    """Replay an exported query log against a running server to validate capacity."""
+    help = (
+        "Send the queries of a log written by export_query_log to a server with their original gaps "
+        "(divided by --speedup) and report the latency histogram, error rate and throughput"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('log', help="JSON lines file written by export_query_log")
+        parser.add_argument('--base-url', default='http://localhost:8000', help="Root URL of the server")
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='query',
+                            help="Replay against /api/query/, /api/query/async/ or /api/query/sources/")
+        parser.add_argument('--speedup', type=float, default=1.0,
+                            help="Divide the original gaps by this factor (0 sends as fast as possible)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Maximum requests in flight")
+        parser.add_argument('--max-gap', type=float, default=None,
+                            help="Cap gaps (after the speed-up) at this many seconds, e.g. to skip nights")
+        parser.add_argument('--limit', type=int, default=None, help="Replay only the first N queries")
+        parser.add_argument('--timeout', type=float, default=60.0, help="Per-request timeout in seconds")
+        parser.add_argument('--deadline', type=float, default=None, help="Query deadline sent with each request")
+        parser.add_argument('--output', default=None, help="Write the summary as JSON to this file")
+    
+    def handle(self, *args, **options):
+        if options['speedup'] < 0 or options['concurrency'] < 1:
+            raise CommandError("--speedup must not be negative and --concurrency must be at least 1")
+        
+        entries = list(read_query_log(options['log']))[:options['limit']]
+        if not entries:
+            raise CommandError(f"No queries in {options['log']}")
+        
+        duration = entries[-1]["offset"] - entries[0]["offset"]
+        self.stdout.write(
+            f"Replaying {len(entries)} queries spanning {duration:.0f}s at {options['speedup']:g}x "
+            f"against {options['base_url']}{ENDPOINTS[options['endpoint']]} (concurrency {options['concurrency']})"
+        )
+        
+        summary = replay_queries(
+            entries,
+            options['base_url'],
+            endpoint=options['endpoint'],
+            speedup=options['speedup'],
+            concurrency=options['concurrency'],
+            max_gap=options['max_gap'],
+            timeout=options['timeout'],
+            deadline=options['deadline']
+        )
+        self._report(summary)
+        
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({"log": options['log'], "options": {
+                    name: options[name]
+                    for name in ('base_url', 'endpoint', 'speedup', 'concurrency', 'max_gap', 'timeout', 'deadline')
+                }, **summary}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Summary written to {options['output']}"))
+    
+    def _report(self, summary):
+        """Print the summary with a bar per latency bucket."""
+        latency = summary["latency_ms"]
+        
+        def ms(value):
+            return f"{value:.0f}ms" if value is not None else "-"
+        
+        self.stdout.write(
+            f"{summary['succeeded']}/{summary['requests']} succeeded ({summary['degraded']} degraded), "
+            f"error rate {summary['error_rate']:.2%}, {summary['throughput_rps']:.2f} req/s"
+        )
+        self.stdout.write(
+            f"latency p50={ms(latency['p50'])} p95={ms(latency['p95'])} "
+            f"p99={ms(latency['p99'])} max={ms(latency['max'])}"
+        )
+        self.stdout.write(f"statuses: {', '.join(f'{k}={v}' for k, v in sorted(summary['statuses'].items()))}")
+        
+        # The histogram is cumulative; print the count that falls in each bucket
+        previous = 0
+        total = max(summary["succeeded"], 1)
+        for bound, cumulative in summary["latency_histogram"].items():
+            count = cumulative - previous
+            previous = cumulative
+            label = f"<= {bound}s" if bound != "+Inf" else "> last"
+            self.stdout.write(f"  {label:>10} {count:>7} {'#' * round(40 * count / total)}")
+        
+        lag = summary["schedule_lag_ms"]
+        if lag["max"] is not None and lag["max"] > 1000:
+            self.stdout.write(self.style.WARNING(
+                f"Requests started up to {ms(lag['max'])} late: raise --concurrency to keep the schedule"
+            ))
@@ -0,0 +1,208 @@
+import itertools
+import json
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...embedding import get_embedding_generator
+from ...models import QueryHistory
+from ...vector_store import VectorStore, hnsw_metadata
+
+
+class Command(BaseCommand):
+    """Measure recall@k and query latency for a grid of HNSW parameters."""
+    help = (
+        "Build scratch HNSW indexes from the stored embeddings for each parameter combination "
+        "and report recall@k against exact brute-force search plus p50/p99 query latency"
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', default='documents', help="Collection to sample vectors from")
+        parser.add_argument('--sample-size', type=int, default=20000,
+                            help="Maximum number of stored vectors to index")
+        parser.add_argument('--queries', type=int, default=200, help="Number of query vectors")
+        parser.add_argument('--query-source', choices=['history', 'corpus'], default='history',
+                            help="Embed recent QueryHistory texts, or hold out stored vectors as queries")
+        parser.add_argument('--k', type=int, default=5, help="Number of neighbours for recall@k")
+        parser.add_argument('--space', choices=['l2', 'cosine', 'ip'], default=None,
+                            help="Distance metric (defaults to the configured one)")
+        parser.add_argument('--m', default='16', help="Comma-separated M values")
+        parser.add_argument('--ef-construction', default='100', help="Comma-separated ef_construction values")
+        parser.add_argument('--ef-search', default='10,50,100', help="Comma-separated ef_search values")
+        parser.add_argument('--output', default=None, help="Write the results as JSON to this file")
+    
+    def handle(self, *args, **options):
+        import numpy as np
+        
+        vector_store = VectorStore(collection_name=options['collection'])
+        space = options['space'] or vector_store.hnsw_metadata["hnsw:space"]
+        k = options['k']
+        
+        corpus = self._load_corpus(vector_store, options['sample_size'])
+        if len(corpus) == 0:
+            raise CommandError(f"No vectors stored in '{options['collection']}'")
+        
+        if options['query_source'] == 'history':
+            queries = self._embed_history_queries(options['queries'])
+            if len(queries) == 0:
+                raise CommandError("No QueryHistory rows to sample; use --query-source corpus")
+        else:
+            # Hold out random stored vectors so queries are never in the index
+            rng = np.random.default_rng(0)
+            holdout = rng.choice(len(corpus), size=min(options['queries'], len(corpus) // 10 or 1), replace=False)
+            mask = np.ones(len(corpus), dtype=bool)
+            mask[holdout] = False
+            queries, corpus = corpus[holdout], corpus[mask]
+        
+        # Checked after the held-out queries are removed, which shrinks the corpus
+        if len(corpus) <= k:
+            raise CommandError(
+                f"Need more than {k} vectors to index, found {len(corpus)} "
+                f"(held-out queries are not indexed); "
+                f"lower --k or store more chunks"
+            )
+        
+        self.stdout.write(f"Indexing {len(corpus)} vectors, {len(queries)} queries, space={space}, k={k}")
+        exact = self._exact_neighbours(corpus, queries, k, space)
+        
+        grid = itertools.product(
+            self._int_list(options['m']),
+            self._int_list(options['ef_construction']),
+            self._int_list(options['ef_search'])
+        )
+        
+        results = []
+        for m, ef_construction, ef_search in grid:
+            result = self._evaluate(corpus, queries, exact, k, {
+                "SPACE": space,
+                "M": m,
+                "EF_CONSTRUCTION": ef_construction,
+                "EF_SEARCH": ef_search,
+            })
+            results.append(result)
+            self.stdout.write(
+                f"M={m:<4} ef_construction={ef_construction:<5} ef_search={ef_search:<5} "
+                f"recall@{k}={result['recall']:.4f} p50={result['p50_ms']:.2f}ms "
+                f"p99={result['p99_ms']:.2f}ms build={result['build_seconds']:.1f}s"
+            )
+        
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    "collection": options['collection'],
+                    "corpus_size": len(corpus),
+                    "query_count": len(queries),
+                    "k": k,
+                    "space": space,
+                    "results": results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+    
+    @staticmethod
+    def _int_list(value):
+        """Parse a comma-separated list of integers."""
+        return [int(item) for item in value.split(',') if item.strip()]
+    
+    @staticmethod
+    def _load_corpus(vector_store, sample_size):
+        """Load up to ``sample_size`` stored embeddings, page by page."""
+        import numpy as np
+        
+        vectors = []
+        for page in vector_store.iter_documents(include=["embeddings"]):
+            vectors.extend(page["embeddings"])
+            if len(vectors) >= sample_size:
+                break
+        
+        return np.asarray(vectors[:sample_size], dtype=np.float32)
+    
+    @staticmethod
+    def _embed_history_queries(count):
+        """Embed the most recent distinct QueryHistory texts as search queries."""
+        import numpy as np
+        
+        texts = []
+        for query_text in QueryHistory.objects.order_by('-timestamp').values_list('query_text', flat=True):
+            if query_text not in texts:
+                texts.append(query_text)
+            if len(texts) >= count:
+                break
+        
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        embeddings = get_embedding_generator().generate_embeddings(texts, input_type="search_query")
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    @staticmethod
+    def _distances(corpus, queries, space):
+        """Compute exact distances the way Chroma's HNSW spaces define them."""
+        import numpy as np
+        
+        if space == 'cosine':
+            corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            return 1.0 - queries @ corpus.T
+        if space == 'ip':
+            return 1.0 - queries @ corpus.T
+        
+        # Squared L2, expanded to avoid materializing query/corpus differences
+        return (
+            np.sum(queries ** 2, axis=1, keepdims=True)
+            - 2.0 * queries @ corpus.T
+            + np.sum(corpus ** 2, axis=1)
+        )
+    
+    def _exact_neighbours(self, corpus, queries, k, space):
+        """Brute-force top-k neighbour indices for every query."""
+        import numpy as np
+        
+        neighbours = []
+        # Bound the distance matrix to ~64 queries at a time
+        for i in range(0, len(queries), 64):
+            distances = self._distances(corpus, queries[i:i + 64], space)
+            top = np.argpartition(distances, k, axis=1)[:, :k]
+            neighbours.extend(set(row) for row in top.tolist())
+        return neighbours
+    
+    @staticmethod
+    def _evaluate(corpus, queries, exact, k, hnsw_settings):
+        """Build a scratch index with the given settings and measure recall and latency."""
+        import chromadb
+        import numpy as np
+        from chromadb.config import Settings
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client = chromadb.PersistentClient(path=temp_dir, settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(name="hnsw_tuning", metadata=hnsw_metadata(hnsw_settings))
+            
+            start = time.perf_counter()
+            batch_size = 1000
+            for i in range(0, len(corpus), batch_size):
+                batch = corpus[i:i + batch_size]
+                collection.add(
+                    ids=[str(j) for j in range(i, i + len(batch))],
+                    embeddings=batch.tolist()
+                )
+            build_seconds = time.perf_counter() - start
+            
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries, exact):
+                start = time.perf_counter()
+                result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(expected & {int(j) for j in result["ids"][0]})
+            
+            del collection, client
+        
+        return {
+            "m": hnsw_settings["M"],
+            "ef_construction": hnsw_settings["EF_CONSTRUCTION"],
+            "ef_search": hnsw_settings["EF_SEARCH"],
+            "recall": hits / (k * len(queries)),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "build_seconds": build_seconds,
+        }
@@ -0,0 +1,211 @@
+"""Latency and event metrics for the RAG system.
+
+A small in-process metrics registry rendered in the Prometheus text
+format at ``/api/system/metrics/``. Every stage of query processing
+(embed, search, format, generate, history write) and ingestion (convert,
+chunk, embed, store) is timed into one histogram labelled by pipeline and
+stage, so the source of tail latency (Cohere, Chroma, Gemini or the
+database) can be read straight from the buckets. Counters track cache
+lookups, retries and fallbacks.
+
+Values are kept per process: with several workers, scrape each one or
+aggregate with ``sum by`` in Prometheus.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, covering fast local steps up to slow API calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], le: Optional[str] = None) -> str:
+    """Render a label set as ``{name="value",...}``, with a bucket bound if given."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping whole numbers free of a decimal point."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    """Base class for a named metric with a fixed set of labels."""
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize the metric and add it to the registry."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Order label values by the metric's label names."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Render this metric's sample lines."""
+    
+    def render(self) -> str:
+        """Render the metric with its HELP and TYPE lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. the number of cache hits."""
+    
+    type_name = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize an empty counter."""
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase the counter for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self) -> List[str]:
+        """Render one line per label set."""
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    """A value that can go up and down, e.g. a queue depth."""
+    
+    type_name = "gauge"
+    
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values (durations, in seconds) in cumulative buckets."""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initialize an empty histogram."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+    
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+    
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the ``with`` block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def samples(self) -> List[str]:
+        """Render the bucket, sum and count lines per label set."""
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, str(bound))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# Every metric created in this process, in definition order
+REGISTRY: List[Metric] = []
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+STAGE_DURATION = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of query processing and document ingestion.",
+    ["pipeline", "stage"]
+)
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total",
+    "Lookups in the retrieval and answer caches, by result.",
+    ["cache", "result"]
+)
+RETRIES = Counter(
+    "rag_retries_total",
+    "Retried calls to external services after a connection error.",
+    ["operation"]
+)
+FALLBACKS = Counter(
+    "rag_fallbacks_total",
+    "Times a degraded result was used: zero embedding, fallback backend or sources only.",
+    ["kind"]
+)
+HISTORY_QUEUE_DEPTH = Gauge(
+    "rag_history_queue_depth",
+    "Query history records waiting for the background writer.",
+)
+ANSWER_CACHE_ENTRIES = Gauge(
+    "rag_answer_cache_entries",
+    "Answers held in this process's semantic answer cache.",
+)
+QUERIES_IN_FLIGHT = Gauge(
+    "rag_queries_in_flight",
+    "Queries admitted and running in this process.",
+)
+QUERIES_QUEUED = Gauge(
+    "rag_queries_queued",
+    "Queries waiting for an admission slot in this process.",
+)
+ADMISSION_REJECTIONS = Counter(
+    "rag_admission_rejections_total",
+    "Queries turned away with a 503 or 429, by reason.",
+    ["reason"]
+)
+
+
+def time_stage(pipeline: str, stage: str):
+    """Time a ``with`` block as one stage of the "query" or "ingest" pipeline."""
+    return STAGE_DURATION.time(pipeline=pipeline, stage=stage)
@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rag_api", "0002_queryhistory_answer_cache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ConversationTurn",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("query_text", models.TextField()),
+                ("response_text", models.TextField(blank=True, default="")),
+                ("timestamp", models.DateTimeField(auto_now_add=True)),
+                ("sources", models.JSONField(blank=True, default=list)),
+                ("chunk_ids", models.JSONField(blank=True, default=list)),
+                ("context", models.JSONField(blank=True, default=dict)),
+                (
+                    "search_embedding",
+                    models.BinaryField(blank=True, editable=False, null=True),
+                ),
+                (
+                    "index_version",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                ("reused_context", models.BooleanField(default=False)),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="turns",
+                        to="rag_api.conversation",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["timestamp", "id"],
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rag_api", "0003_conversation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="queryhistory",
+            index=models.Index(fields=["timestamp"], name="queryhistory_timestamp_idx"),
+        ),
+    ]
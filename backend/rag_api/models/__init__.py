@@ -1,4 +1,5 @@
 from .document import Document
 from .query_history import QueryHistory
+from .conversation import Conversation, ConversationTurn
 
-__all__ = ['Document', 'QueryHistory'] 
\ No newline at end of file
+__all__ = ['Document', 'QueryHistory', 'Conversation', 'ConversationTurn'] 
@@ -0,0 +1,35 @@
+from django.db import models
+
+class Conversation(models.Model):
+    """Model grouping the turns of a multi-turn query session."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Conversation {self.pk}"
+
+class ConversationTurn(models.Model):
+    """Model storing one question and answer in a conversation with its retrieved context.
+    
+    The retrieved chunks (IDs, texts, metadata and distances) and the
+    embedding they were searched with are kept so a follow-up question can
+    reuse them instead of searching again.
+    """
+    conversation = models.ForeignKey(Conversation, related_name='turns', on_delete=models.CASCADE)
+    query_text = models.TextField()
+    response_text = models.TextField(blank=True, default='')
+    timestamp = models.DateTimeField(auto_now_add=True)
+    sources = models.JSONField(default=list, blank=True)
+    
+    # Retrieved context: search results in the vector store's own shape
+    chunk_ids = models.JSONField(default=list, blank=True)
+    context = models.JSONField(default=dict, blank=True)
+    search_embedding = models.BinaryField(null=True, blank=True, editable=False)
+    index_version = models.CharField(max_length=64, blank=True, default='')
+    reused_context = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['timestamp', 'id']
+    
+    def __str__(self):
+        return self.query_text[:50] + '...' if len(self.query_text) > 50 else self.query_text
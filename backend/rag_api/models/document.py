@@ -8,5 +8,13 @@ class Document(models.Model):
     upload_date = models.DateTimeField(auto_now_add=True)
     chunk_count = models.IntegerField(default=0)
     
+    class Meta:
+        indexes = [
+            # Source resolution, shared-file checks and backfills look documents up by file name
+            models.Index(fields=['file_name'], name='document_file_name_idx'),
+            # The document list is sorted by upload date and stamped with its maximum
+            models.Index(fields=['upload_date'], name='document_upload_date_idx'),
+        ]
+    
     def __str__(self):
         return self.title 
\ No newline at end of file
@@ -8,5 +8,18 @@ class QueryHistory(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     documents_retrieved = models.ManyToManyField(Document, related_name='queries')
     
+    # Semantic answer cache: the query embedding (float32 bytes), the index
+    # version the answer was generated against and the sources returned
+    query_embedding = models.BinaryField(null=True, blank=True, editable=False)
+    index_version = models.CharField(max_length=64, blank=True, default='')
+    sources = models.JSONField(default=list, blank=True)
+    served_from_cache = models.BooleanField(default=False)
+    
+    class Meta:
+        indexes = [
+            # History is listed and cursor-paginated newest first
+            models.Index(fields=['timestamp'], name='queryhistory_timestamp_idx'),
+        ]
+    
     def __str__(self):
-        return self.query_text[:50] + '...' if len(self.query_text) > 50 else self.query_text 
\ No newline at end of file
+        return self.query_text[:50] + '...' if len(self.query_text) > 50 else self.query_text 
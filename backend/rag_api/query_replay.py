@@ -0,0 +1,204 @@
+"""Query log export and load replay for the RAG system.
+
+``export_query_log`` writes the query texts of ``QueryHistory`` to a JSON
+lines file, one query per line with its offset in seconds from the first
+exported query::
+    
+    {"offset": 12.5, "timestamp": "2025-03-15T09:00:12.500000+00:00", "query": "..."}
+
+``replay_queries`` sends a log back to a running server with the original
+gaps between queries, divided by a speed-up factor, and reports latency,
+errors and throughput. The log holds no answers or sources, so it can be
+replayed against any deployment.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .metrics import DEFAULT_BUCKETS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# API paths a log can be replayed against
+ENDPOINTS = {
+    "query": "/api/query/",
+    "async": "/api/query/async/",
+    "sources": "/api/query/sources/",
+}
+
+
+def export_query_log(output_path: Union[str, Path], since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, limit: Optional[int] = None) -> int:
+    """Write QueryHistory query texts with their timing to a JSON lines file.
+    
+    Args:
+        output_path: File to write
+        since: Only queries at or after this time
+        until: Only queries before this time
+        limit: Only the first ``limit`` queries of the range
+    
+    Returns:
+        The number of queries written.
+    """
+    from .models import QueryHistory
+    
+    queries = QueryHistory.objects.order_by('timestamp', 'id')
+    if since is not None:
+        queries = queries.filter(timestamp__gte=since)
+    if until is not None:
+        queries = queries.filter(timestamp__lt=until)
+    if limit:
+        queries = queries[:limit]
+    
+    count = 0
+    first = None
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for timestamp, query_text in queries.values_list('timestamp', 'query_text').iterator(chunk_size=2000):
+            first = first or timestamp
+            f.write(json.dumps({
+                "offset": (timestamp - first).total_seconds(),
+                "timestamp": timestamp.isoformat(),
+                "query": query_text,
+            }, ensure_ascii=False) + "\n")
+            count += 1
+    
+    logger.info(f"Exported {count} queries to {output_path}")
+    return count
+
+
+def read_query_log(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Read the entries of a query log written by ``export_query_log``."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def replay_queries(entries: List[Dict[str, Any]], base_url: str, endpoint: str = "query",
+                   speedup: float = 1.0, concurrency: int = 8, max_gap: Optional[float] = None,
+                   timeout: float = 60.0, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """Replay logged queries against a server and measure the responses.
+    
+    Each query is sent at its logged offset divided by ``speedup``. At most
+    ``concurrency`` requests are in flight; a query that is due while all
+    of them are busy waits, and that wait is reported as schedule lag. A
+    growing lag means the client, not the server, is limiting the rate.
+    
+    Args:
+        entries: Log entries with "offset" and "query"
+        base_url: Server root, e.g. ``http://localhost:8000``
+        endpoint: "query", "async" or "sources"
+        speedup: Factor the original gaps are divided by (0 sends as fast as possible)
+        concurrency: Maximum requests in flight
+        max_gap: Longest gap in seconds kept from the log, after the speed-up
+        timeout: Per-request timeout in seconds
+        deadline: Query deadline sent with every request, if any
+    
+    Returns:
+        The summary built by ``summarize_replay``.
+    
+    Raises:
+        ValueError: If the endpoint is unknown
+    """
+    import httpx
+    
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f"Unknown endpoint '{endpoint}', expected one of: {', '.join(ENDPOINTS)}")
+    url = base_url.rstrip('/') + ENDPOINTS[endpoint]
+    
+    schedule = []
+    scheduled_at = 0.0
+    for i, entry in enumerate(entries):
+        if i:
+            gap = (entry["offset"] - entries[i - 1]["offset"]) / speedup if speedup else 0.0
+            scheduled_at += min(max(gap, 0.0), max_gap) if max_gap is not None else max(gap, 0.0)
+        schedule.append((scheduled_at, entry["query"]))
+    
+    results = []
+    results_lock = threading.Lock()
+    
+    with httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=concurrency)) as client:
+        def send(scheduled, query_text):
+            lag = time.monotonic() - start - scheduled
+            payload = {"query": query_text}
+            if deadline is not None:
+                payload["deadline"] = deadline
+            
+            sent = time.monotonic()
+            try:
+                response = client.post(url, json=payload)
+                outcome = {"status": response.status_code}
+                if response.status_code == 200:
+                    outcome["degraded"] = bool(response.json().get("degraded", False))
+            except (httpx.HTTPError, ValueError) as e:
+                # ValueError: a 200 response whose body is not JSON
+                outcome = {"status": None, "error": type(e).__name__}
+            outcome.update({"latency": time.monotonic() - sent, "lag": lag})
+            
+            with results_lock:
+                results.append(outcome)
+        
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for scheduled, query_text in schedule:
+                delay = start + scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(send, scheduled, query_text)
+        wall_seconds = time.monotonic() - start
+    
+    return summarize_replay(results, wall_seconds)
+
+
+def summarize_replay(results: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Summarize replay outcomes: status counts, error rate, throughput and latency.
+    
+    Any response other than 200, and any request that got no response,
+    counts as an error. Degraded answers (sources without a response) are
+    successes but counted separately.
+    """
+    import numpy as np
+    
+    statuses = {}
+    for outcome in results:
+        key = str(outcome["status"]) if outcome["status"] is not None else outcome["error"]
+        statuses[key] = statuses.get(key, 0) + 1
+    
+    successes = [outcome for outcome in results if outcome["status"] == 200]
+    latencies = np.asarray([outcome["latency"] for outcome in successes])
+    lags = np.asarray([outcome["lag"] for outcome in results])
+    
+    # Cumulative counts per upper bound, as in the metrics histograms
+    histogram = {str(bound): int((latencies <= bound).sum()) for bound in DEFAULT_BUCKETS}
+    histogram["+Inf"] = len(latencies)
+    
+    def percentile(values, q):
+        return float(np.percentile(values, q) * 1000) if len(values) else None
+    
+    return {
+        "requests": len(results),
+        "succeeded": len(successes),
+        "degraded": sum(1 for outcome in successes if outcome.get("degraded")),
+        "error_rate": 1 - len(successes) / len(results) if results else 0.0,
+        "statuses": statuses,
+        "seconds": wall_seconds,
+        "throughput_rps": len(successes) / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": float(latencies.max() * 1000) if len(latencies) else None,
+        },
+        "latency_histogram": histogram,
+        "schedule_lag_ms": {
+            "p50": percentile(lags, 50),
+            "max": float(lags.max() * 1000) if len(lags) else None,
+        },
+    }
@@ -3,19 +3,85 @@
 import os
 from pathlib import Path
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+# Chroma's own HNSW defaults, used when RAG_SETTINGS has no 'HNSW' entry
+DEFAULT_HNSW = {
+    'SPACE': 'l2',
+    'M': 16,
+    'EF_CONSTRUCTION': 100,
+    'EF_SEARCH': 10,
+}
+
+# Local generation stand-in defaults, used for keys missing from 'LOCAL_GENERATION'
+DEFAULT_LOCAL_GENERATION = {
+    'LATENCY': 0.5,
+    'TOKEN_RATE': 50.0,
+    'RESPONSE_TOKENS': 120,
+    'ERROR_RATE': 0.0,
+    'SEED': 0,
+}
+
+# Local embedding stand-in defaults, used for keys missing from 'LOCAL_EMBEDDING'
+DEFAULT_LOCAL_EMBEDDING = {
+    'LATENCY': 0.05,
+    'PER_TEXT_LATENCY': 0.001,
+    'DIMENSION': 1024,
+}
+
+# Warmup steps run before the readiness endpoint reports ready
+DEFAULT_WARMUP_STEPS = ['vector_store', 'embedding', 'generation', 'document_processor', 'query']
+
+# Relative share of the query deadline each stage may use
+DEFAULT_QUERY_DEADLINE_SPLIT = {
+    'embed': 0.2,
+    'search': 0.1,
+    'generate': 0.7,
+}
 
 
 class RAGConfig:
     """Configuration for the RAG system."""
     
     def __init__(self):
-        """Initialize configuration from Django settings."""
+        """Initialize configuration from Django settings.
+        
+        Only the core keys are required; newer keys fall back to defaults so
+        minimal ``RAG_SETTINGS`` (e.g. in standalone scripts) keep working.
+        """
+        rag_settings = settings.RAG_SETTINGS
+        
         # API Keys
         self.gemini_api_key = os.getenv("GEMINI_API_KEY", "")
         self.cohere_api_key = os.getenv("COHERE_API_KEY", "")
         
         # Vector DB Settings
         self.chroma_persist_directory = settings.RAG_SETTINGS['CHROMA_PERSIST_DIRECTORY']
+        self.vector_shards = rag_settings.get('VECTOR_SHARDS', 1)
+        self.shard_key = rag_settings.get('SHARD_KEY', 'document_id')
+        self.shard_search_workers = rag_settings.get('SHARD_SEARCH_WORKERS', 8)
+        self.hnsw = rag_settings.get('HNSW', DEFAULT_HNSW)
+        self.collection_hnsw = rag_settings.get('COLLECTION_HNSW', {})
+        self.vector_store_mode = rag_settings.get('VECTOR_STORE_MODE', 'embedded')
+        self.vector_store_role = rag_settings.get('VECTOR_STORE_ROLE', 'writer')
+        self.chroma_server_host = rag_settings.get('CHROMA_SERVER_HOST', 'localhost')
+        self.chroma_server_port = rag_settings.get('CHROMA_SERVER_PORT', 8001)
+        self.vector_snapshot_directory = rag_settings.get(
+            'VECTOR_SNAPSHOT_DIRECTORY', str(Path(self.chroma_persist_directory).parent / 'chroma_published')
+        )
+        self.vector_snapshot_keep = rag_settings.get('VECTOR_SNAPSHOT_KEEP', 3)
+        
+        # Retrieval Cache Settings
+        self.retrieval_cache_enabled = rag_settings.get('RETRIEVAL_CACHE_ENABLED', False)
+        self.retrieval_cache_alias = rag_settings.get('RETRIEVAL_CACHE_ALIAS', 'default')
+        self.retrieval_cache_ttl = rag_settings.get('RETRIEVAL_CACHE_TTL', 3600)
+        
+        # Answer Cache Settings
+        self.answer_cache_enabled = rag_settings.get('ANSWER_CACHE_ENABLED', False)
+        self.answer_cache_threshold = rag_settings.get('ANSWER_CACHE_THRESHOLD', 0.95)
+        self.answer_cache_size = rag_settings.get('ANSWER_CACHE_SIZE', 1000)
+        self.answer_cache_ttl = rag_settings.get('ANSWER_CACHE_TTL', 86400)
+        self.answer_cache_refresh = rag_settings.get('ANSWER_CACHE_REFRESH', 10)
         
         # Document Storage
         self.documents_directory = settings.RAG_SETTINGS['DOCUMENTS_DIRECTORY']
@@ -24,17 +90,64 @@ class RAGConfig:
         self.chunk_size = settings.RAG_SETTINGS['CHUNK_SIZE']
         self.chunk_overlap = settings.RAG_SETTINGS['CHUNK_OVERLAP']
         self.top_k_results = settings.RAG_SETTINGS['TOP_K_RESULTS']
+        self.context_token_budget = rag_settings.get('CONTEXT_TOKEN_BUDGET', 3000)
+        self.query_deadline = rag_settings.get('QUERY_DEADLINE', 30.0)
+        self.query_deadline_split = rag_settings.get('QUERY_DEADLINE_SPLIT', DEFAULT_QUERY_DEADLINE_SPLIT)
+        
+        # Generation Settings
+        self.generation_backend = rag_settings.get('GENERATION_BACKEND', 'gemini')
+        self.generation_fallback = rag_settings.get('GENERATION_FALLBACK', '')
+        self.generation_model = rag_settings.get('GENERATION_MODEL', 'models/gemini-2.0-pro-exp-02-05')
+        self.local_generation = {**DEFAULT_LOCAL_GENERATION, **rag_settings.get('LOCAL_GENERATION', {})}
+        
+        # Embedding Settings
+        self.embedding_backend = rag_settings.get('EMBEDDING_BACKEND', 'cohere')
+        self.local_embedding = {**DEFAULT_LOCAL_EMBEDDING, **rag_settings.get('LOCAL_EMBEDDING', {})}
+        
+        # Warmup Settings
+        self.warmup_steps = rag_settings.get('WARMUP_STEPS', DEFAULT_WARMUP_STEPS)
+        self.warmup_query = rag_settings.get('WARMUP_QUERY', 'warmup')
+        
+        # Conversation Settings
+        self.session_reuse_threshold = rag_settings.get('SESSION_REUSE_THRESHOLD', 0.8)
+        self.session_history_turns = rag_settings.get('SESSION_HISTORY_TURNS', 3)
+        
+        # Query History Settings
+        self.history_write_mode = rag_settings.get('HISTORY_WRITE_MODE', 'background')
+        self.history_batch_size = rag_settings.get('HISTORY_BATCH_SIZE', 50)
+        self.history_flush_interval = rag_settings.get('HISTORY_FLUSH_INTERVAL', 0.2)
+        self.history_queue_size = rag_settings.get('HISTORY_QUEUE_SIZE', 10000)
+        self.history_retention_days = rag_settings.get('HISTORY_RETENTION_DAYS', 90)
+        self.history_retention_rows = rag_settings.get('HISTORY_RETENTION_ROWS', 0)
+        self.history_archive_directory = rag_settings.get(
+            'HISTORY_ARCHIVE_DIRECTORY', str(Path(self.chroma_persist_directory).parent / 'history_archive')
+        )
+        
+        # Async Query Path Settings
+        self.async_vector_store_workers = rag_settings.get('ASYNC_VECTOR_STORE_WORKERS', 8)
+        self.async_database_workers = rag_settings.get('ASYNC_DATABASE_WORKERS', 4)
+        self.async_stream_workers = rag_settings.get('ASYNC_STREAM_WORKERS', 16)
+        
+        # Admission Control Settings
+        self.query_max_in_flight = rag_settings.get('QUERY_MAX_IN_FLIGHT', 8)
+        self.query_queue_size = rag_settings.get('QUERY_QUEUE_SIZE', 16)
+        self.query_queue_timeout = rag_settings.get('QUERY_QUEUE_TIMEOUT', 2.0)
+    
+    def hnsw_settings(self, collection_name: str) -> dict:
+        """Get the HNSW settings for a collection, with its overrides applied."""
+        return {**DEFAULT_HNSW, **self.hnsw, **self.collection_hnsw.get(collection_name, {})}
 
 
-# Create a global config instance
-config = RAGConfig()
+# Global config instance, built from settings on first attribute access so
+# importing this module never requires configured settings
+config = SimpleLazyObject(RAGConfig)
 
 
 def validate_config():
     """Validate that all required configuration is present."""
-    if not config.gemini_api_key:
+    if not config.gemini_api_key and "gemini" in (config.generation_backend, config.generation_fallback):
         raise ValueError("GEMINI_API_KEY is required but not set")
-    if not config.cohere_api_key:
+    if not config.cohere_api_key and config.embedding_backend == "cohere":
         raise ValueError("COHERE_API_KEY is required but not set")
     
     # Create chroma directory if it doesn't exist
@@ -0,0 +1,149 @@
+"""Retrieval result cache for the RAG system.
+
+Search results are cached in a Django cache alias keyed by a hash of
+(query embedding, top_k, filters, index version). The index version is a
+token stored next to the Chroma data; every write to the vector store
+replaces it, so cached results are invalidated exactly when the index
+changes. Pointing the cache alias at a shared backend (Redis, memcached,
+file-based) shares entries, statistics and invalidation between worker
+processes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+import uuid
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import caches
+
+from .metrics import CACHE_LOOKUPS
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class IndexVersion:
+    """A version token for one collection, shared by every process using its persist directory."""
+    
+    def __init__(self, persist_directory: str, collection_name: str):
+        """Initialize the version token location for a collection."""
+        self.path = Path(persist_directory) / f"{collection_name}.version"
+    
+    def current(self) -> str:
+        """Get the current version token ("0" before the first write)."""
+        try:
+            return self.path.read_text(encoding="utf-8").strip() or "0"
+        except FileNotFoundError:
+            return "0"
+    
+    def last_modified(self) -> Optional[float]:
+        """Get the time of the last bump as a Unix timestamp, or None before the first write."""
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+    
+    def bump(self) -> str:
+        """Replace the version token with a new, unique one.
+        
+        Tokens are random rather than incremented, so concurrent bumps from
+        different processes can never produce the same token twice.
+        """
+        token = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write then rename so readers never see a partial token
+        temp_path = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_text(token, encoding="utf-8")
+        os.replace(temp_path, self.path)
+        
+        return token
+
+
+class RetrievalCache:
+    """Cache of vector search results invalidated by index version."""
+    
+    KEY_PREFIX = "retrieval"
+    
+    def __init__(self, alias: Optional[str] = None, timeout: Optional[int] = None):
+        """Initialize the cache on a Django cache alias."""
+        self.alias = alias or config.retrieval_cache_alias
+        self.timeout = timeout if timeout is not None else config.retrieval_cache_ttl
+        self.cache = caches[self.alias]
+    
+    @staticmethod
+    def make_key(collection_name: str, query_embedding: List[float], top_k: int,
+                 where: Optional[Dict[str, Any]], version: str) -> str:
+        """Build the cache key for a search."""
+        digest = hashlib.sha256()
+        digest.update(array("f", query_embedding).tobytes())
+        digest.update(json.dumps(
+            {"collection": collection_name, "top_k": top_k, "where": where, "version": version},
+            sort_keys=True,
+            default=str
+        ).encode("utf-8"))
+        return f"{RetrievalCache.KEY_PREFIX}:{digest.hexdigest()}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached search results, recording a hit or miss."""
+        results = self.cache.get(key)
+        self._incr("hits" if results is not None else "misses")
+        CACHE_LOOKUPS.inc(cache="retrieval", result="hit" if results is not None else "miss")
+        return results
+    
+    def set(self, key: str, results: Dict[str, Any]) -> None:
+        """Store search results."""
+        self.cache.set(key, results, self.timeout)
+        self._incr("entries_written")
+        self._incr("bytes_written", len(pickle.dumps(results, pickle.HIGHEST_PROTOCOL)))
+    
+    def _incr(self, counter: str, delta: int = 1) -> None:
+        """Increment a shared statistics counter."""
+        key = f"{self.KEY_PREFIX}:stats:{counter}"
+        try:
+            # Counters never expire so hit rates cover the cache's lifetime
+            self.cache.add(key, 0, None)
+            self.cache.incr(key, delta)
+        except Exception as e:
+            logger.debug(f"Could not update retrieval cache counter {counter}: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit rate and memory statistics."""
+        counters = self.cache.get_many([
+            f"{self.KEY_PREFIX}:stats:{name}"
+            for name in ("hits", "misses", "entries_written", "bytes_written")
+        ])
+        hits = counters.get(f"{self.KEY_PREFIX}:stats:hits", 0)
+        misses = counters.get(f"{self.KEY_PREFIX}:stats:misses", 0)
+        lookups = hits + misses
+        
+        return {
+            "alias": self.alias,
+            "backend": f"{type(self.cache).__module__}.{type(self.cache).__name__}",
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries_written": counters.get(f"{self.KEY_PREFIX}:stats:entries_written", 0),
+            "bytes_written": counters.get(f"{self.KEY_PREFIX}:stats:bytes_written", 0),
+            "memory_bytes": self._memory_bytes(),
+        }
+    
+    def _memory_bytes(self) -> Optional[int]:
+        """Ask the cache backend for its memory use, when it can tell."""
+        try:
+            # LocMemCache keeps pickled values in a per-process dict
+            if hasattr(self.cache, "_cache") and isinstance(self.cache._cache, dict):
+                return sum(len(value) for value in list(self.cache._cache.values()))
+            # RedisCache exposes the server's own accounting
+            if hasattr(self.cache, "_cache") and hasattr(self.cache._cache, "get_client"):
+                return self.cache._cache.get_client().info("memory")["used_memory"]
+        except Exception as e:
+            logger.debug(f"Could not read retrieval cache memory use: {str(e)}")
+        return None
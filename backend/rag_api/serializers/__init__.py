@@ -1,9 +1,18 @@
+from .base import DynamicFieldsModelSerializer
 from .document_serializers import DocumentSerializer, DocumentUploadSerializer
-from .query_serializers import QuerySerializer, QueryHistorySerializer
+from .query_serializers import (
+    QuerySerializer,
+    QueryHistorySerializer,
+    ConversationSerializer,
+    ConversationTurnSerializer
+)
 
 __all__ = [
+    'DynamicFieldsModelSerializer',
     'DocumentSerializer', 
     'DocumentUploadSerializer',
     'QuerySerializer', 
-    'QueryHistorySerializer'
+    'QueryHistorySerializer',
+    'ConversationSerializer',
+    'ConversationTurnSerializer'
 ] 
\ No newline at end of file
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer that takes an optional ``fields`` argument limiting the fields it outputs."""
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+    
+    @classmethod
+    def parse_fields(cls, value):
+        """Parse a comma-separated ``fields`` query parameter.
+        
+        Returns:
+            The list of field names, or None when the parameter is empty.
+        
+        Raises:
+            ValueError: If a name is not one of the serializer's fields
+        """
+        if not value:
+            return None
+        
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(cls.Meta.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(cls.Meta.fields)}")
+        return fields
@@ -1,15 +1,33 @@
 from rest_framework import serializers
-from ..models import QueryHistory
+from ..models import Conversation, ConversationTurn, QueryHistory
+from .base import DynamicFieldsModelSerializer
 from .document_serializers import DocumentSerializer
 
-class QueryHistorySerializer(serializers.ModelSerializer):
-    """Serializer for QueryHistory model."""
+class QueryHistorySerializer(DynamicFieldsModelSerializer):
+    """Serializer for QueryHistory model; pass ``fields`` to output only some fields."""
     documents_retrieved = DocumentSerializer(many=True, read_only=True)
     
     class Meta:
         model = QueryHistory
-        fields = ['id', 'query_text', 'response_text', 'timestamp', 'documents_retrieved']
+        fields = ['id', 'query_text', 'response_text', 'timestamp', 'documents_retrieved', 'served_from_cache']
 
 class QuerySerializer(serializers.Serializer):
     """Serializer for query requests."""
-    query = serializers.CharField() 
\ No newline at end of file
+    query = serializers.CharField()
+    # Overall time budget in seconds; defaults to QUERY_DEADLINE
+    deadline = serializers.FloatField(required=False, min_value=0.1, max_value=300) 
+
+class ConversationTurnSerializer(serializers.ModelSerializer):
+    """Serializer for ConversationTurn model."""
+    
+    class Meta:
+        model = ConversationTurn
+        fields = ['id', 'query_text', 'response_text', 'timestamp', 'sources', 'reused_context']
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """Serializer for Conversation model."""
+    turns = ConversationTurnSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Conversation
+        fields = ['id', 'created_at', 'updated_at', 'turns']
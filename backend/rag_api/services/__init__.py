@@ -1,5 +1,7 @@
 from .document_service import DocumentService
 from .query_service import QueryService
 from .system_service import SystemService
+from .async_query_service import AsyncQueryService
+from .conversation_service import ConversationService
 
-__all__ = ['DocumentService', 'QueryService', 'SystemService'] 
\ No newline at end of file
+__all__ = ['DocumentService', 'QueryService', 'SystemService', 'AsyncQueryService', 'ConversationService'] 
\ No newline at end of file
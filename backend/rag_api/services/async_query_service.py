@@ -0,0 +1,102 @@
+import logging
+
+from ..deadline import Deadline
+from ..embedding import get_embedding_generator
+from ..executors import run_database, run_vector_store
+from ..metrics import time_stage
+from ..rag_config import config
+from ..text_generation import TextGenerator
+from ..vector_store import VectorStore
+from .query_service import QueryService
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class AsyncQueryService:
+    """Async counterpart of QueryService for the ASGI entry point.
+    
+    Cohere and Gemini are called through their async clients, so a request
+    waiting on them holds no thread. Blocking Chroma and ORM work runs on
+    the bounded pools in ``executors``; the steps themselves are shared with
+    ``QueryService`` so both paths behave the same.
+    """
+    
+    @staticmethod
+    async def process_query(query_text, deadline_seconds=None):
+        """Process a query and return the response and source documents.
+        
+        Deadline handling matches ``QueryService.process_query``.
+        """
+        try:
+            deadline = Deadline(deadline_seconds)
+            
+            # Initialize RAG components
+            vector_store = await run_vector_store(VectorStore)
+            embedding_generator = get_embedding_generator()
+            
+            logger.info(f"Processing query (async): {query_text[:50]}...")
+            
+            with time_stage("query", "embed"):
+                query_embedding = await embedding_generator.generate_query_embedding_async(
+                    query_text, timeout=deadline.stage_timeout("embed")
+                )
+            logger.info("Generated query embedding")
+            
+            index_version = await run_vector_store(vector_store.index_version.current)
+            
+            # Reuse the answer to a near-identical recent query, if any
+            cached = await run_database(QueryService.lookup_cached_answer, query_embedding, index_version)
+            if cached:
+                await AsyncQueryService._record(
+                    QueryService.save_cached_history, query_text, query_embedding, index_version, cached
+                )
+                return {
+                    "query": query_text,
+                    "response": cached["response"],
+                    "sources": cached["sources"],
+                    "cached": True,
+                    "degraded": False
+                }
+            
+            deadline.check("search")
+            search_results = await run_vector_store(
+                QueryService.search, vector_store, query_embedding, timeout=deadline.stage_timeout("search")
+            )
+            
+            # Format search results and generate the response
+            text_generator = TextGenerator()
+            with time_stage("query", "format"):
+                formatted_docs = text_generator.format_search_results(search_results)
+            try:
+                deadline.check("generation")
+                with time_stage("query", "generate"):
+                    response_text = await text_generator.generate_response_async(
+                        query_text, formatted_docs, timeout=deadline.stage_timeout("generate")
+                    )
+            except TimeoutError as e:
+                logger.warning(f"Returning sources only: {str(e)}")
+                return QueryService.degraded_response(query_text, search_results)
+            
+            await AsyncQueryService._record(
+                QueryService.save_history,
+                query_text, response_text, search_results, query_embedding, index_version
+            )
+            
+            return {
+                "query": query_text,
+                "response": response_text,
+                "sources": QueryService.format_sources(search_results),
+                "cached": False,
+                "degraded": False
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            raise
+    
+    @staticmethod
+    async def _record(save, *args):
+        """Record history: queueing is instant, a synchronous write goes to the database pool."""
+        if config.history_write_mode == "sync":
+            return await run_database(save, *args)
+        return save(*args)
\ No newline at end of file
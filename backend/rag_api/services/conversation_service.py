@@ -0,0 +1,179 @@
+import logging
+import re
+
+from ..models import Conversation, ConversationTurn
+from ..answer_cache import encode_embedding
+from ..deadline import Deadline
+from ..metrics import CACHE_LOOKUPS, time_stage
+from ..text_generation import TextGenerator
+from ..vector_store import VectorStore
+from ..rag_config import config
+from .query_service import QueryService
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Question and filler words that say nothing about which chunks a follow-up needs
+FOLLOW_UP_WORDS = frozenset({
+    "about", "also", "could", "does", "explain", "from", "have", "many", "more", "much",
+    "please", "should", "tell", "than", "that", "their", "them", "then", "there", "these",
+    "they", "this", "those", "what", "when", "where", "which", "with", "would",
+    "درباره", "چطور", "چگونه", "توضیح", "بیشتر", "چیست",
+})
+
+class ConversationService:
+    """Service for multi-turn conversations that reuse retrieved context."""
+    
+    @staticmethod
+    def create_conversation():
+        """Start a new conversation."""
+        return Conversation.objects.create()
+    
+    @staticmethod
+    def get_conversation(conversation_id):
+        """Get a conversation with its turns.
+        
+        Raises:
+            Conversation.DoesNotExist: If no conversation has this ID
+        """
+        return Conversation.objects.prefetch_related('turns').get(pk=conversation_id)
+    
+    @staticmethod
+    def delete_conversation(conversation_id):
+        """Delete a conversation and its turns.
+        
+        Raises:
+            Conversation.DoesNotExist: If no conversation has this ID
+        """
+        Conversation.objects.get(pk=conversation_id).delete()
+    
+    @staticmethod
+    def process_turn(conversation_id, query_text, deadline_seconds=None):
+        """Answer a question in a conversation.
+        
+        If the index has not changed and the follow-up's words are covered
+        by the previous turn (``SESSION_REUSE_THRESHOLD``), its chunks are
+        reused and neither Cohere nor the vector store is called. Otherwise
+        the follow-up is embedded together with the previous question, so
+        "and what about section 3?" is searched in context. The last
+        ``SESSION_HISTORY_TURNS`` turns are included in the prompt.
+        
+        Raises:
+            Conversation.DoesNotExist: If no conversation has this ID
+            TimeoutError: If the deadline passes before the sources are found.
+        """
+        conversation = Conversation.objects.get(pk=conversation_id)
+        previous_turns = list(conversation.turns.order_by('-timestamp', '-id')[:config.session_history_turns])[::-1]
+        last_turn = previous_turns[-1] if previous_turns else None
+        
+        deadline = Deadline(deadline_seconds)
+        vector_store = VectorStore()
+        index_version = vector_store.index_version.current()
+        
+        reused_context = ConversationService.can_reuse_context(last_turn, query_text, index_version)
+        CACHE_LOOKUPS.inc(cache="session_context", result="hit" if reused_context else "miss")
+        if reused_context:
+            logger.info(f"Reusing the retrieved context of turn {last_turn.id}")
+            search_results = last_turn.context
+            # Keep the embedding the context was retrieved with
+            search_embedding = last_turn.search_embedding
+        else:
+            search_text = f"{last_turn.query_text}\n{query_text}" if last_turn else query_text
+            query_embedding = QueryService.embed_query(search_text, timeout=deadline.stage_timeout("embed"))
+            deadline.check("search")
+            search_results = QueryService.search(vector_store, query_embedding, timeout=deadline.stage_timeout("search"))
+            search_embedding = encode_embedding(query_embedding)
+        
+        text_generator = TextGenerator()
+        with time_stage("query", "format"):
+            formatted_docs = text_generator.format_search_results(search_results)
+        
+        response_text = None
+        try:
+            deadline.check("generation")
+            with time_stage("query", "generate"):
+                response_text = text_generator.generate_response(
+                    query_text,
+                    formatted_docs,
+                    timeout=deadline.stage_timeout("generate"),
+                    conversation=[
+                        {"query": turn.query_text, "response": turn.response_text}
+                        for turn in previous_turns
+                        if turn.response_text
+                    ]
+                )
+        except TimeoutError as e:
+            logger.warning(f"Returning sources only: {str(e)}")
+        
+        sources = QueryService.format_sources(search_results)
+        
+        # The turn is stored even without an answer so the next one can reuse its context
+        turn = ConversationTurn.objects.create(
+            conversation=conversation,
+            query_text=query_text,
+            response_text=response_text or '',
+            sources=sources,
+            chunk_ids=search_results.get("ids", [[]])[0],
+            context=search_results,
+            search_embedding=search_embedding,
+            index_version=index_version,
+            reused_context=reused_context
+        )
+        conversation.save(update_fields=['updated_at'])
+        
+        if response_text is None:
+            response_data = QueryService.degraded_response(query_text, search_results)
+        else:
+            # Answers depend on the conversation, so they stay out of the answer cache
+            QueryService.save_history(query_text, response_text, search_results)
+            response_data = {
+                "query": query_text,
+                "response": response_text,
+                "sources": sources,
+                "cached": False,
+                "degraded": False
+            }
+        
+        return {
+            **response_data,
+            "conversation_id": conversation.id,
+            "turn_id": turn.id,
+            "reused_context": reused_context
+        }
+    
+    @staticmethod
+    def can_reuse_context(last_turn, query_text, index_version):
+        """Decide whether the previous turn's retrieved chunks still fit a follow-up.
+        
+        This is decided from the text alone, before anything is embedded:
+        the context is reused when at least ``SESSION_REUSE_THRESHOLD`` of
+        the follow-up's content words appear in the previous question, its
+        answer or its chunks. "Why?" or "and what does section 3 say?" are
+        covered; a question that brings in new terms gets a new search.
+        """
+        if last_turn is None or not last_turn.chunk_ids:
+            return False
+        if last_turn.index_version != index_version:
+            return False
+        
+        words = ConversationService._content_words(query_text)
+        if not words:
+            # "Why?" or "And then?" can only refer to the previous turn
+            return True
+        
+        previous_text = " ".join([
+            last_turn.query_text,
+            last_turn.response_text,
+            *(last_turn.context.get("documents") or [[]])[0]
+        ])
+        covered = len(words & ConversationService._content_words(previous_text)) / len(words)
+        logger.info(f"Follow-up words covered by the previous turn: {covered:.2f}")
+        return covered >= config.session_reuse_threshold
+    
+    @staticmethod
+    def _content_words(text):
+        """Lowercased words of four or more letters, and numbers, other than ``FOLLOW_UP_WORDS``."""
+        return {
+            word for word in re.findall(r"\w+", text.lower())
+            if (len(word) >= 4 or word.isdigit()) and word not in FOLLOW_UP_WORDS
+        }
@@ -5,10 +5,14 @@ import shutil
 from pathlib import Path
 
 from django.conf import settings
+from django.db.models import Count, Max
 from ..models import Document
-from ..document_processor import DocumentProcessor
-from ..embedding import EmbeddingGenerator
-from ..vector_store import VectorStore
+from ..document_processor import get_document_processor
+from ..embedding import get_embedding_generator
+from ..vector_store import ReadOnlyVectorStoreError, VectorStore
+from ..vector_publish import snapshot_publisher
+from ..retrieval_cache import IndexVersion
+from ..metrics import time_stage
 from ..rag_config import config
 
 # Configure logging
@@ -17,14 +21,62 @@ logger = logging.getLogger(__name__)
 class DocumentService:
     """Service for handling document operations."""
     
+    # Fields the document list can be sorted by
+    SORT_FIELDS = ('title', 'file_name', 'file_type', 'upload_date', 'chunk_count')
+    
     @staticmethod
-    def get_all_documents():
-        """Get all documents ordered by upload date."""
-        return Document.objects.all().order_by('-upload_date')
+    def get_all_documents(ordering='-upload_date', file_type=None, title=None):
+        """Get documents, optionally filtered by type and title.
+        
+        Args:
+            ordering: A sort field, prefixed with "-" for descending order
+            file_type: Only documents with this file type (case-insensitive)
+            title: Only documents whose title contains this text
+        
+        Raises:
+            ValueError: If ``ordering`` is not a sort field
+        """
+        if ordering.lstrip('-') not in DocumentService.SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{ordering}'. Available: {', '.join(DocumentService.SORT_FIELDS)}")
+        
+        documents = Document.objects.all()
+        if file_type:
+            documents = documents.filter(file_type__iexact=file_type)
+        if title:
+            documents = documents.filter(title__icontains=title)
+        
+        # The ID breaks ties so pages never overlap
+        return documents.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
+    
+    @staticmethod
+    def get_list_version():
+        """Get a cheap stamp that changes whenever the document list does.
+        
+        Built from one aggregate query (row count and newest upload) plus
+        the vector store's index version, which is bumped by every upload
+        and deletion, so no document rows are read.
+        
+        Returns:
+            (version string, last modified Unix timestamp or None)
+        """
+        stamp = Document.objects.aggregate(count=Count('id'), latest=Max('upload_date'))
+        latest = stamp['latest']
+        index_version = IndexVersion(config.chroma_persist_directory, "documents")
+        
+        version = f"{stamp['count']}:{latest.isoformat() if latest else ''}:{index_version.current()}"
+        timestamps = [latest.timestamp() if latest else None, index_version.last_modified()]
+        timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+        return version, max(timestamps) if timestamps else None
     
     @staticmethod
     def process_and_save_document(uploaded_file, title):
-        """Process and save a document, returning the created document record."""
+        """Process and save a document, returning the created document record.
+        
+        Raises:
+            ReadOnlyVectorStoreError: In a vector store reader process
+        """
+        DocumentService.check_writable()
+        
         # Create documents directory if it doesn't exist
         documents_dir = Path(config.documents_directory)
         documents_dir.mkdir(parents=True, exist_ok=True)
@@ -43,32 +95,25 @@ class DocumentService:
             # Copy file to temporary directory for processing
             shutil.copy2(permanent_file_path, file_path)
             
+            document = None
             try:
                 # Initialize RAG components
-                doc_processor = DocumentProcessor()
-                embedding_generator = EmbeddingGenerator()
+                doc_processor = get_document_processor()
+                embedding_generator = get_embedding_generator()
                 vector_store = VectorStore()
                 
                 logger.info(f"Processing document: {uploaded_file.name} in {temp_dir}")
                 
                 # Process document
-                documents = doc_processor.load_documents(temp_dir)
+                with time_stage("ingest", "convert"):
+                    documents = doc_processor.load_documents(temp_dir)
                 logger.info(f"Loaded {len(documents)} document(s) from {uploaded_file.name}")
                 
-                chunks = doc_processor.process_documents(documents)
+                with time_stage("ingest", "chunk"):
+                    chunks = doc_processor.process_documents(documents)
                 logger.info(f"Created {len(chunks)} chunks from {uploaded_file.name}")
                 
-                # Log chunk metadata for debugging
-                for i, chunk in enumerate(chunks[:2]):  # Log first two chunks for debugging
-                    logger.debug(f"Chunk {i} metadata: {chunk.metadata}")
-                
-                embedded_chunks = embedding_generator.embed_document_chunks(chunks)
-                logger.info(f"Generated embeddings for {len(embedded_chunks['ids'])} chunks")
-                
-                vector_store.add_documents(embedded_chunks)
-                logger.info(f"Added document chunks to vector store")
-                
-                # Save document record
+                # Save document record first so its ID can be stored with every chunk
                 document = Document.objects.create(
                     title=title,
                     file_name=uploaded_file.name,
@@ -77,11 +122,82 @@ class DocumentService:
                 )
                 logger.info(f"Created document record in database: {document.id} - {document.title}")
                 
+                for chunk in chunks:
+                    chunk.metadata["document_id"] = document.id
+                
+                # Log chunk metadata for debugging
+                for i, chunk in enumerate(chunks[:2]):  # Log first two chunks for debugging
+                    logger.debug(f"Chunk {i} metadata: {chunk.metadata}")
+                
+                with time_stage("ingest", "embed"):
+                    embedded_chunks = embedding_generator.embed_document_chunks(
+                        chunks,
+                        id_prefix=f"doc_{document.id}_chunk"
+                    )
+                logger.info(f"Generated embeddings for {len(embedded_chunks['ids'])} chunks")
+                
+                with time_stage("ingest", "store"):
+                    vector_store.add_documents(embedded_chunks)
+                logger.info(f"Added document chunks to vector store")
+                DocumentService.publish_changes()
+                
                 return document
                 
             except Exception as e:
-                # If processing fails, delete the saved file
-                if permanent_file_path.exists():
-                    permanent_file_path.unlink()
                 logger.error(f"Error processing document: {str(e)}")
-                raise 
\ No newline at end of file
+                
+                # If processing fails, delete any partial index entries and the saved file.
+                # A cleanup failure is logged so it never replaces the original error.
+                if document is not None:
+                    try:
+                        vector_store.delete_document(document.id)
+                        document.delete()
+                    except Exception as cleanup_error:
+                        logger.error(f"Failed to remove partial document {document.id}: {str(cleanup_error)}")
+                try:
+                    if permanent_file_path.exists():
+                        permanent_file_path.unlink()
+                except Exception as cleanup_error:
+                    logger.error(f"Failed to remove stored file {permanent_file_path}: {str(cleanup_error)}")
+                raise
+    
+    @staticmethod
+    def delete_document(document_id):
+        """Delete a document, its chunks in the vector store and its stored file.
+        
+        Raises:
+            Document.DoesNotExist: If no document has this ID
+            ReadOnlyVectorStoreError: In a vector store reader process
+        """
+        DocumentService.check_writable()
+        document = Document.objects.get(pk=document_id)
+        
+        vector_store = VectorStore()
+        deleted_chunks = vector_store.delete_document(document.id)
+        logger.info(f"Deleted {deleted_chunks} chunks of document {document.id} from vector store")
+        
+        # Only remove the file if no other document record points at it
+        file_path = Path(config.documents_directory) / document.file_name
+        shared_file = Document.objects.filter(file_name=document.file_name).exclude(pk=document.pk).exists()
+        if not shared_file and file_path.exists():
+            file_path.unlink()
+        
+        document.delete()
+        logger.info(f"Deleted document record: {document_id}")
+        DocumentService.publish_changes()
+        
+        return deleted_chunks
+    
+    @staticmethod
+    def check_writable():
+        """Refuse document changes in a vector store reader before anything is saved."""
+        if config.vector_store_role == "reader":
+            raise ReadOnlyVectorStoreError(
+                "This process is a vector store reader; send uploads and deletions to the ingest (writer) process"
+            )
+    
+    @staticmethod
+    def publish_changes():
+        """Queue a background publish of the vector store for readers, in snapshot mode."""
+        if config.vector_store_mode == "snapshot":
+            snapshot_publisher.request()
@@ -1,10 +1,17 @@
 import logging
 from pathlib import Path
 
+from django.db.models import Q
+
 from ..models import Document, QueryHistory
-from ..embedding import EmbeddingGenerator
+from ..embedding import get_embedding_generator
 from ..vector_store import VectorStore
 from ..text_generation import TextGenerator
+from ..answer_cache import answer_cache, encode_embedding
+from ..deadline import Deadline
+from ..metrics import CACHE_LOOKUPS, FALLBACKS, time_stage
+from ..history_writer import record_history
+from ..rag_config import config
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,92 +20,283 @@ class QueryService:
     """Service for handling query operations."""
     
     @staticmethod
-    def get_query_history():
-        """Get all query history ordered by timestamp."""
-        return QueryHistory.objects.all().order_by('-timestamp')
+    def get_query_history(fields=None):
+        """Get all query history ordered by timestamp.
+        
+        Args:
+            fields: Serialized fields that will be read, or None for all.
+                Columns only the others need are not loaded, and the
+                retrieved documents are prefetched only when requested.
+        """
+        queries = QueryHistory.objects.order_by('-timestamp')
+        
+        # The embedding and sources are only used by the answer cache
+        deferred = ['query_embedding', 'sources', 'index_version']
+        if fields is not None:
+            deferred += [name for name in ('query_text', 'response_text') if name not in fields]
+        queries = queries.defer(*deferred)
+        
+        if fields is None or 'documents_retrieved' in fields:
+            queries = queries.prefetch_related('documents_retrieved')
+        
+        return queries
     
     @staticmethod
-    def process_query(query_text):
-        """Process a query and return the response and source documents."""
+    def process_query(query_text, deadline_seconds=None):
+        """Process a query and return the response and source documents.
+        
+        The query runs against a deadline (``deadline_seconds`` or
+        ``QUERY_DEADLINE``) split across embedding, search and generation.
+        If generation cannot finish in time, the retrieved sources are
+        returned without a response and with ``"degraded": true``.
+        
+        Raises:
+            TimeoutError: If the deadline passes before the sources are found.
+        """
         try:
+            deadline = Deadline(deadline_seconds)
+            
             # Initialize RAG components
-            embedding_generator = EmbeddingGenerator()
             vector_store = VectorStore()
-            text_generator = TextGenerator()
             
-            logger.info(f"Processing query: {query_text[:50]}...")
+            query_embedding = QueryService.embed_query(query_text, timeout=deadline.stage_timeout("embed"))
+            index_version = vector_store.index_version.current()
             
-            # Generate query embedding
-            query_embedding = embedding_generator.generate_query_embedding(query_text)
-            logger.info("Generated query embedding")
+            # Reuse the answer to a near-identical recent query, if any
+            cached = QueryService.lookup_cached_answer(query_embedding, index_version)
+            if cached:
+                QueryService.save_cached_history(query_text, query_embedding, index_version, cached)
+                return {
+                    "query": query_text,
+                    "response": cached["response"],
+                    "sources": cached["sources"],
+                    "cached": True,
+                    "degraded": False
+                }
             
-            # Search for relevant documents
-            search_results = vector_store.search(query_embedding)
-            logger.info(f"Found {len(search_results.get('documents', [[]])[0])} relevant document chunks")
+            deadline.check("search")
+            text_generator = TextGenerator()
+            search_results = QueryService.search(vector_store, query_embedding, timeout=deadline.stage_timeout("search"))
             
             # Format search results for better context
-            formatted_docs = text_generator.format_search_results(search_results)
+            with time_stage("query", "format"):
+                formatted_docs = text_generator.format_search_results(search_results)
             
             # Generate response with formatted documents
-            response_text = text_generator.generate_response(
-                query_text, 
-                formatted_docs
-            )
+            try:
+                deadline.check("generation")
+                with time_stage("query", "generate"):
+                    response_text = text_generator.generate_response(
+                        query_text, 
+                        formatted_docs,
+                        timeout=deadline.stage_timeout("generate")
+                    )
+            except TimeoutError as e:
+                logger.warning(f"Returning sources only: {str(e)}")
+                return QueryService.degraded_response(query_text, search_results)
             
-            # Create query history record
-            query_history = QueryHistory.objects.create(
-                query_text=query_text,
-                response_text=response_text
+            QueryService.save_history(
+                query_text, response_text, search_results, query_embedding, index_version
             )
             
-            # Get document IDs from search results
-            document_ids = set()
-            for metadata in search_results.get("metadatas", [[]])[0]:
-                source = metadata.get("source", "")
-                filename = metadata.get("filename", "")
-                
-                # Try to find document by filename first
-                if filename:
-                    docs = Document.objects.filter(file_name__iexact=filename)
-                    if docs.exists():
-                        document_ids.add(docs.first().id)
-                        continue
-                
-                # If no filename or no match, try with source path
-                if source:
-                    source_filename = Path(source).name
-                    # Find document by filename - try both exact and case-insensitive match
-                    docs = Document.objects.filter(file_name__iexact=source_filename)
-                    if not docs.exists():
-                        # Try with just the stem (filename without extension)
-                        file_stem = Path(source_filename).stem
-                        docs = Document.objects.filter(file_name__icontains=file_stem)
-                    
-                    if docs.exists():
-                        document_ids.add(docs.first().id)
-            
-            # Add retrieved documents to query history
-            if document_ids:
-                query_history.documents_retrieved.add(*document_ids)
-            
             # Format response
             response_data = {
                 "query": query_text,
                 "response": response_text,
-                "sources": [
-                    {
-                        "content": doc[:200] + "..." if len(doc) > 200 else doc,
-                        "metadata": metadata
-                    }
-                    for doc, metadata in zip(
-                        search_results.get("documents", [[]])[0],
-                        search_results.get("metadatas", [[]])[0]
-                    )
-                ]
+                "sources": QueryService.format_sources(search_results),
+                "cached": False,
+                "degraded": False
             }
             
             return response_data
             
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    def stream_query(query_text):
+        """Process a query, yielding (event, data) pairs as the answer is produced.
+        
+        Yields a "sources" event once retrieval finishes, a "token" event per
+        generated text fragment and a final "done" event. The query history
+        record is only queued after generation completes. A cached answer is
+        sent as a single "token" event.
+        """
+        vector_store = VectorStore()
+        query_embedding = QueryService.embed_query(query_text)
+        index_version = vector_store.index_version.current()
+        
+        cached = QueryService.lookup_cached_answer(query_embedding, index_version)
+        if cached:
+            yield "sources", {"query": query_text, "sources": cached["sources"], "cached": True}
+            yield "token", {"text": cached["response"]}
+            history = QueryService.save_cached_history(query_text, query_embedding, index_version, cached)
+            # The history ID is only known once the record is written: null in "background" mode
+            yield "done", {"response": cached["response"], "history_id": history.pk if history else None, "cached": True}
+            return
+        
+        text_generator = TextGenerator()
+        search_results = QueryService.search(vector_store, query_embedding)
+        
+        yield "sources", {
+            "query": query_text,
+            "sources": QueryService.format_sources(search_results),
+            "cached": False
+        }
+        
+        with time_stage("query", "format"):
+            formatted_docs = text_generator.format_search_results(search_results)
+        
+        response_parts = []
+        with time_stage("query", "generate"):
+            for text in text_generator.generate_response_stream(query_text, formatted_docs):
+                response_parts.append(text)
+                yield "token", {"text": text}
+        
+        response_text = "".join(response_parts)
+        history = QueryService.save_history(
+            query_text, response_text, search_results, query_embedding, index_version
+        )
+        
+        yield "done", {"response": response_text, "history_id": history.pk if history else None, "cached": False}
+    
+    @staticmethod
+    def embed_query(query_text, timeout=None):
+        """Generate the embedding for a query."""
+        embedding_generator = get_embedding_generator()
+        
+        logger.info(f"Processing query: {query_text[:50]}...")
+        
+        # Generate query embedding
+        with time_stage("query", "embed"):
+            query_embedding = embedding_generator.generate_query_embedding(query_text, timeout=timeout)
+        logger.info("Generated query embedding")
+        
+        return query_embedding
+    
+    @staticmethod
+    def search(vector_store, query_embedding, timeout=None):
+        """Search the vector store for chunks relevant to a query embedding."""
+        with time_stage("query", "search"):
+            search_results = vector_store.search(query_embedding, timeout=timeout)
+        logger.info(f"Found {len(search_results.get('documents', [[]])[0])} relevant document chunks")
+        
+        return search_results
+    
+    @staticmethod
+    def lookup_cached_answer(query_embedding, index_version):
+        """Look up a semantically equivalent answer in the answer cache."""
+        if not config.answer_cache_enabled:
+            return None
+        
+        cached = answer_cache.lookup(query_embedding, index_version)
+        CACHE_LOOKUPS.inc(cache="answer", result="hit" if cached else "miss")
+        if cached:
+            logger.info(f"Answer cache hit (similarity {cached['similarity']:.3f}) from query {cached['history_id']}")
+        return cached
+    
+    @staticmethod
+    def format_sources(search_results):
+        """Format search results as the source list returned to clients."""
+        return [
+            {
+                "content": doc[:200] + "..." if len(doc) > 200 else doc,
+                "metadata": metadata
+            }
+            for doc, metadata in zip(
+                search_results.get("documents", [[]])[0],
+                search_results.get("metadatas", [[]])[0]
+            )
+        ]
+    
+    @staticmethod
+    def degraded_response(query_text, search_results):
+        """Build the sources-only response used when there is no time left to generate."""
+        FALLBACKS.inc(kind="sources_only")
+        return {
+            "query": query_text,
+            "response": None,
+            "sources": QueryService.format_sources(search_results),
+            "cached": False,
+            "degraded": True
+        }
+    
+    @staticmethod
+    def save_history(query_text, response_text, search_results, query_embedding=None, index_version=''):
+        """Record a query and its answer, linked to the retrieved documents.
+        
+        The record is written by the history writer, after the response in
+        the default "background" mode. When the query embedding is given,
+        the record also feeds the answer cache.
+        
+        Returns:
+            The QueryHistory in "sync" write mode, None in "background" mode.
+        """
+        return record_history({
+            "query_text": query_text,
+            "response_text": response_text,
+            "sources": QueryService.format_sources(search_results),
+            "metadatas": search_results.get("metadatas", [[]])[0],
+            "query_embedding": query_embedding,
+            "encoded_embedding": encode_embedding(query_embedding) if query_embedding else None,
+            "index_version": index_version
+        })
+    
+    @staticmethod
+    def save_cached_history(query_text, query_embedding, index_version, cached):
+        """Record a query answered from the answer cache.
+        
+        Returns:
+            The QueryHistory in "sync" write mode, None in "background" mode.
+        """
+        return record_history({
+            "query_text": query_text,
+            "response_text": cached["response"],
+            "sources": cached["sources"],
+            "query_embedding": query_embedding,
+            "encoded_embedding": encode_embedding(query_embedding),
+            "index_version": index_version,
+            # Link the same documents as the answer being reused
+            "cached_from": cached["history_id"]
+        })
+    
+    @staticmethod
+    def resolve_document_ids(metadatas):
+        """Map retrieved chunk metadata back to Document IDs.
+        
+        Chunks carry their Document's primary key as ``document_id``. Chunks
+        ingested before that (see the ``backfill_document_ids`` command) are
+        matched by file name, falling back to the file stem.
+        """
+        document_ids = set()
+        file_names = set()
+        for metadata in metadatas:
+            if metadata.get("document_id") is not None:
+                document_ids.add(int(metadata["document_id"]))
+            elif metadata.get("filename") or metadata.get("source"):
+                file_names.add((metadata.get("filename") or Path(metadata["source"]).name).lower())
+        
+        # One query covers both the IDs and any legacy file names
+        conditions = Q(id__in=document_ids)
+        for file_name in file_names:
+            conditions |= Q(file_name__iexact=file_name)
+        
+        resolved = set()
+        matched_names = set()
+        for document_id, file_name in Document.objects.filter(conditions).values_list('id', 'file_name'):
+            if document_id in document_ids:
+                resolved.add(document_id)
+            elif file_name.lower() in file_names and file_name.lower() not in matched_names:
+                resolved.add(document_id)
+                matched_names.add(file_name.lower())
+        
+        # Legacy chunks whose file name did not match exactly
+        for file_name in file_names - matched_names:
+            document_id = Document.objects.filter(
+                file_name__icontains=Path(file_name).stem
+            ).values_list('id', flat=True).first()
+            if document_id is not None:
+                resolved.add(document_id)
+        
+        return resolved
@@ -1,6 +1,12 @@
 import logging
 from ..vector_store import VectorStore
 from ..rag_config import config
+from ..admission import query_admission
+from ..answer_cache import answer_cache
+from ..history_writer import history_writer
+from ..warmup import warmup
+from ..vector_publish import snapshot_publisher
+from ..metrics import ANSWER_CACHE_ENTRIES, HISTORY_QUEUE_DEPTH, render_metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,10 +25,37 @@ class SystemService:
                 "document_count": stats["document_count"],
                 "collection_name": stats["collection_name"],
                 "persist_directory": stats["persist_directory"],
+                "shard_count": stats["shard_count"],
+                "shards": stats["shards"],
+                "index_version": vector_store.index_version.current(),
+                "retrieval_cache": vector_store.retrieval_cache.stats() if vector_store.retrieval_cache else None,
+                "answer_cache": answer_cache.stats(),
+                "history_writer": history_writer.stats(),
+                "admission": query_admission.stats(),
+                "vector_store_mode": config.vector_store_mode,
+                "vector_store_role": config.vector_store_role,
+                "snapshot_publisher": snapshot_publisher.stats() if config.vector_store_mode == "snapshot" else None,
+                "generation_backend": config.generation_backend,
+                "generation_fallback": config.generation_fallback or None,
+                "embedding_backend": config.embedding_backend,
                 "chunk_size": config.chunk_size,
                 "chunk_overlap": config.chunk_overlap,
                 "top_k_results": config.top_k_results
             }
         except Exception as e:
             logger.error(f"Error getting system info: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
+    
+    @staticmethod
+    def get_readiness():
+        """Get the warmup state, starting warmup if it has not run or has failed."""
+        warmup.ensure_started()
+        return warmup.state()
+    
+    @staticmethod
+    def get_metrics():
+        """Get this process's metrics in the Prometheus text format."""
+        # Gauges are read from their sources at scrape time
+        HISTORY_QUEUE_DEPTH.set(history_writer.stats()["queued"])
+        ANSWER_CACHE_ENTRIES.set(answer_cache.stats()["entries"])
+        return render_metrics()
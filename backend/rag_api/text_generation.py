@@ -1,45 +1,102 @@
-"""Text generation module for the RAG system using Google's Gemini API."""
+"""Text generation module for the RAG system.
 
-from typing import List, Dict, Any, Optional
-import google.generativeai as genai
+Prompts are built and context is packed here; the text itself comes from a
+generation backend (Gemini, or a local stand-in), see ``generation_backends``.
+"""
+
+import logging
+import math
+from typing import List, Dict, Any, Iterator, Optional
 from tqdm import tqdm
 from pathlib import Path
 
+from .generation_backends import GenerationBackend, get_generation_backend
 from .rag_config import config
 
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A block truncated below this many tokens is dropped instead of packed
+MIN_TRUNCATED_BLOCK_TOKENS = 100
+
+# Earlier answers quoted in a conversation prompt are cut to this many tokens
+CONVERSATION_TURN_TOKENS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without calling the tokenizer.
+    
+    Latin-script text averages about four characters per token, while
+    Persian and other non-ASCII scripts split into much shorter tokens, so
+    they are counted at about two characters per token.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most ``max_tokens`` estimated tokens, preferring a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    # Binary search the longest prefix that fits
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    
+    truncated = text[:low]
+    boundary = truncated.rfind(" ")
+    if boundary > low * 0.8:
+        truncated = truncated[:boundary]
+    return truncated.rstrip() + " ..." if truncated.strip() else ""
+
 
 class TextGenerator:
-    """Generates text responses using Google's Gemini API."""
+    """Generates text responses from retrieved context using a generation backend."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "models/gemini-2.0-pro-exp-02-05"):
-        """Initialize the text generator with API key and model."""
-        self.api_key = api_key or config.gemini_api_key
-        self.model = model
-        
-        # Configure the Gemini API
-        genai.configure(api_key=self.api_key)
-        self.generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 1024,
-        }
-        
-        # Initialize the model
-        self.gemini_model = genai.GenerativeModel(
-            model_name=self.model,
-            generation_config=self.generation_config
-        )
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 context_token_budget: Optional[int] = None, backend: Optional[GenerationBackend] = None):
+        """Initialize the text generator with its backend and context budget.
+        
+        Args:
+            api_key: Gemini API key, when the configured backend is Gemini
+            model: Gemini model name, when the configured backend is Gemini
+            context_token_budget: Estimated tokens of context per prompt
+            backend: Backend to use instead of the configured one
+        """
+        self.backend = backend or get_generation_backend(api_key=api_key, model=model)
+        self.context_token_budget = context_token_budget or config.context_token_budget
     
-    def generate_response(self, query: str, context_docs: List[str]) -> str:
-        """Generate a response based on the query and retrieved documents."""
+    def build_prompt(self, query: str, context_docs: List[str],
+                     conversation: Optional[List[Dict[str, str]]] = None) -> str:
+        """Build the generation prompt from the query and retrieved documents.
+        
+        Args:
+            query: The user's question
+            context_docs: Formatted context blocks
+            conversation: Earlier turns of the session, oldest first, as
+                dicts with ``query`` and ``response``
+        """
         # Combine the context documents into a single context string
         context = "\n\n---\n\n".join(context_docs)
         
+        # Earlier turns let follow-up questions refer back to them
+        history = ""
+        if conversation:
+            turns = "\n\n".join(
+                f"User: {turn['query']}\nAssistant: {truncate_to_tokens(turn['response'], CONVERSATION_TURN_TOKENS)}"
+                for turn in conversation
+            )
+            history = f"Conversation so far:\n{turns}\n\n"
+        
         # Create a prompt that includes the context and query
         prompt = f"""You are an AI assistant that answers questions based on the provided context.
 
-Context information:
+{history}Context information:
 {context}
 
 User question: {query}
@@ -48,43 +105,137 @@ Please answer the question based only on the provided context. If the context do
 
 Important: Include citations to the source documents in your response. When you reference information from the context, mention the source document number (e.g., [Document 1], [Document 2, Page 3]).
 """
+        return prompt
+    
+    def generate_response(self, query: str, context_docs: List[str], timeout: Optional[float] = None,
+                          conversation: Optional[List[Dict[str, str]]] = None) -> str:
+        """Generate a response based on the query and retrieved documents.
+        
+        Raises:
+            TimeoutError: If the backend did not answer within ``timeout`` seconds.
+        """
+        prompt = self.build_prompt(query, context_docs, conversation)
         
         # Generate the response
-        response = self.gemini_model.generate_content(prompt)
+        return self.backend.generate(prompt, timeout=timeout)
+    
+    async def generate_response_async(self, query: str, context_docs: List[str],
+                                      timeout: Optional[float] = None) -> str:
+        """Generate a response without blocking the event loop."""
+        prompt = self.build_prompt(query, context_docs)
         
-        return response.text
+        return await self.backend.generate_async(prompt, timeout=timeout)
     
-    def format_search_results(self, search_results: Dict[str, Any]) -> List[str]:
-        """Format search results from vector store for use in generation."""
-        documents = search_results.get("documents", [[]])[0]
-        metadatas = search_results.get("metadatas", [[]])[0]
-        distances = search_results.get("distances", [[]])[0]
+    def generate_response_stream(self, query: str, context_docs: List[str]) -> Iterator[str]:
+        """Generate a response, yielding text fragments as the backend produces them."""
+        prompt = self.build_prompt(query, context_docs)
+        
+        yield from self.backend.generate_stream(prompt)
+    
+    def format_search_results(self, search_results: Dict[str, Any],
+                              token_budget: Optional[int] = None) -> List[str]:
+        """Pack search results from vector store into a token-bounded context.
+        
+        Chunks are merged into blocks when they are adjacent in the same
+        document and page (their overlapping characters are dropped), then
+        blocks are added in relevance order until ``token_budget`` estimated
+        tokens are used. The block that crosses the budget is truncated if a
+        useful amount of room is left, so prompt size stays bounded whatever
+        ``top_k`` is.
+        """
+        token_budget = token_budget or self.context_token_budget
+        blocks = self._merge_adjacent_chunks(search_results)
         
         formatted_docs = []
-        for i, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
-            # Extract source information
-            source = metadata.get("source", "Unknown")
-            filename = metadata.get("filename", Path(source).name if isinstance(source, str) else "Unknown")
-            page_num = metadata.get("page_num", None)
-            chunk_index = metadata.get("chunk_index", "Unknown")
-            position_percent = metadata.get("position_percent", None)
-            excerpt = metadata.get("excerpt", None)
+        used_tokens = 0
+        for block in blocks:
+            header = f"Document {len(formatted_docs) + 1} ({self._source_citation(block['metadata'])}, Relevance: {block['relevance']:.2f})"
+            remaining = token_budget - used_tokens - estimate_tokens(header)
+            
+            text = block["text"]
+            text_tokens = estimate_tokens(text)
+            if text_tokens > remaining:
+                # Only keep a truncated block if it still carries real content
+                if remaining < MIN_TRUNCATED_BLOCK_TOKENS and formatted_docs:
+                    break
+                text = truncate_to_tokens(text, max(remaining, 0))
+                text_tokens = estimate_tokens(text)
+                if not text:
+                    break
             
-            # Build source citation
-            source_citation = f"Source: {filename}"
-            if page_num is not None:
-                source_citation += f", Page {page_num}"
-            if position_percent is not None:
-                source_citation += f", Position {position_percent}%"
-            if chunk_index != "Unknown":
-                source_citation += f", Chunk {chunk_index}"
+            formatted_docs.append(f"{header}\n\n{text}")
+            used_tokens += estimate_tokens(header) + text_tokens
             
-            # Format the document with enhanced source information
-            formatted_doc = f"Document {i+1} ({source_citation}, Relevance: {1-distance:.2f})"
-            if excerpt:
-                formatted_doc += f"\nExcerpt: {excerpt}"
-            formatted_doc += f"\n\n{doc}"
+            if used_tokens >= token_budget:
+                break
+        
+        logger.info(
+            f"Packed {len(formatted_docs)} context blocks from {len(blocks)} merged chunks "
+            f"(~{used_tokens}/{token_budget} tokens)"
+        )
+        return formatted_docs
+    
+    @staticmethod
+    def _source_citation(metadata: Dict[str, Any]) -> str:
+        """Build the compact source citation for a context block."""
+        source = metadata.get("source", "Unknown")
+        filename = metadata.get("filename", Path(source).name if isinstance(source, str) else "Unknown")
+        page_num = metadata.get("page_num", None)
+        
+        source_citation = f"Source: {filename}"
+        if page_num is not None:
+            source_citation += f", Page {page_num}"
+        return source_citation
+    
+    @staticmethod
+    def _merge_adjacent_chunks(search_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Merge retrieved chunks that are consecutive in the same document page.
+        
+        Returns:
+            Blocks ordered by the rank of their most relevant chunk, each with
+            ``text``, ``metadata`` (of its first chunk) and ``relevance``.
+        """
+        documents = search_results.get("documents", [[]])[0]
+        metadatas = search_results.get("metadatas", [[]])[0]
+        distances = search_results.get("distances", [[]])[0]
+        
+        # Group chunks by document and page, remembering each one's rank
+        groups = {}
+        for rank, (doc, metadata, distance) in enumerate(zip(documents, metadatas, distances)):
+            metadata = metadata or {}
+            document_key = metadata.get("document_id") or metadata.get("source") or metadata.get("filename")
+            key = (document_key, metadata.get("page_num")) if document_key is not None else ("rank", rank)
+            groups.setdefault(key, []).append({
+                "rank": rank,
+                "text": doc,
+                "metadata": metadata,
+                "relevance": 1 - distance,
+            })
+        
+        blocks = []
+        for chunks in groups.values():
+            chunks.sort(key=lambda chunk: (chunk["metadata"].get("chunk_index", chunk["rank"]), chunk["rank"]))
             
-            formatted_docs.append(formatted_doc)
+            block = None
+            for chunk in chunks:
+                index = chunk["metadata"].get("chunk_index")
+                previous_index = block["last"]["metadata"].get("chunk_index") if block else None
+                if block and index is not None and previous_index is not None and index == previous_index + 1:
+                    # Skip the characters the two chunks overlap on
+                    overlap = block["last"]["metadata"].get("chunk_end_char", 0) - chunk["metadata"].get("chunk_start_char", 0)
+                    block["text"] += chunk["text"][max(overlap, 0):]
+                    block["rank"] = min(block["rank"], chunk["rank"])
+                    block["relevance"] = max(block["relevance"], chunk["relevance"])
+                    block["last"] = chunk
+                else:
+                    block = {
+                        "rank": chunk["rank"],
+                        "text": chunk["text"],
+                        "metadata": chunk["metadata"],
+                        "relevance": chunk["relevance"],
+                        "last": chunk,
+                    }
+                    blocks.append(block)
         
-        return formatted_docs
\ No newline at end of file
+        blocks.sort(key=lambda block: block["rank"])
+        return blocks
@@ -2,9 +2,17 @@ from django.urls import path
 from ..views import (
     DocumentListView, 
     DocumentUploadView,
+    DocumentDetailView,
     QueryView,
+    QueryStreamView,
+    AsyncQueryView,
     QueryHistoryView,
-    SystemInfoView
+    ConversationListView,
+    ConversationDetailView,
+    ConversationQueryView,
+    SystemInfoView,
+    SystemMetricsView,
+    SystemReadyView
 )
 from ..views_sources import QuerySourcesView
 
@@ -12,12 +20,22 @@ urlpatterns = [
     # Document endpoints
     path('documents/', DocumentListView.as_view(), name='document-list'),
     path('documents/upload/', DocumentUploadView.as_view(), name='document-upload'),
+    path('documents/<int:pk>/', DocumentDetailView.as_view(), name='document-detail'),
     
     # Query endpoints
     path('query/', QueryView.as_view(), name='query'),
+    path('query/async/', AsyncQueryView.as_view(), name='query-async'),
+    path('query/stream/', QueryStreamView.as_view(), name='query-stream'),
     path('query/sources/', QuerySourcesView.as_view(), name='query-sources'),
     path('query/history/', QueryHistoryView.as_view(), name='query-history'),
     
+    # Conversation endpoints
+    path('conversations/', ConversationListView.as_view(), name='conversation-list'),
+    path('conversations/<int:pk>/', ConversationDetailView.as_view(), name='conversation-detail'),
+    path('conversations/<int:pk>/query/', ConversationQueryView.as_view(), name='conversation-query'),
+    
     # System endpoints
     path('system/info/', SystemInfoView.as_view(), name='system-info'),
+    path('system/metrics/', SystemMetricsView.as_view(), name='system-metrics'),
+    path('system/ready/', SystemReadyView.as_view(), name='system-ready'),
 ] 
\ No newline at end of file
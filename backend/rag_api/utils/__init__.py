@@ -1,3 +1,5 @@
 from .error_handlers import APIException, handle_exception
+from .pagination import DocumentPagination, QueryHistoryPagination
+from .throttles import QueryRateThrottle
 
-__all__ = ['APIException', 'handle_exception'] 
\ No newline at end of file
+__all__ = ['APIException', 'handle_exception', 'DocumentPagination', 'QueryHistoryPagination', 'QueryRateThrottle'] 
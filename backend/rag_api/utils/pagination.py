@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+class QueryHistoryPagination(CursorPagination):
+    """Cursor pagination over query history, newest first.
+    
+    The cursor encodes a position in the timestamp ordering, so each page
+    is one indexed range query however deep the client pages, and rows
+    written while paging never shift or repeat entries.
+    """
+    ordering = '-timestamp'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class DocumentPagination(PageNumberPagination):
+    """Page-number pagination for the document list, which can be sorted by any column."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,16 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+class QueryRateThrottle(SimpleRateThrottle):
+    """Per-client rate limit for the query endpoints (``DEFAULT_THROTTLE_RATES['query']``).
+    
+    Clients are identified by address, taken from ``X-Forwarded-For`` when
+    ``NUM_PROXIES`` is set. A client over its rate gets a 429 with a
+    ``Retry-After`` header before any admission slot is taken.
+    """
+    scope = 'query'
+    
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
@@ -0,0 +1,392 @@
+"""Published read-only vector store copies for the RAG system.
+
+With ``VECTOR_STORE_MODE=snapshot``, one process owns writes
+(``VECTOR_STORE_ROLE=writer``, e.g. a dedicated ingest server). It ingests
+into its own Chroma directory and, after each write, publishes a complete
+copy in the background::
+    
+    <VECTOR_SNAPSHOT_DIRECTORY>/
+        CURRENT       version of the copy readers should serve
+        <version>/    a complete Chroma persist directory, never written again
+
+Query workers (``VECTOR_STORE_ROLE=reader``) only ever read a published
+copy. When ``CURRENT`` moves, a worker opens the new copy and loads its
+index in a background thread while requests keep using the old one, then
+switches over between requests. Ingest therefore never blocks a search,
+and every search sees one complete version of the index.
+
+A copy is built through the snapshot export and import (see
+``vector_snapshot``), so it is taken through Chroma's API rather than by
+copying files that may be mid-write.
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .rag_config import config
+from .vector_snapshot import export_snapshot, import_snapshot
+from .vector_store import ReadOnlyVectorStoreError, VectorStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "CURRENT"
+
+# Readers hold a lease file per version they serve, under this directory,
+# refreshed every LEASE_REFRESH seconds; the writer never prunes a version
+# with a lease younger than LEASE_TTL (a reader that died stops refreshing)
+LEASE_DIRECTORY = ".leases"
+LEASE_REFRESH = 60
+LEASE_TTL = 600
+
+
+class PublishedIndex:
+    """The directory of published copies and the pointer to the current one."""
+    
+    def __init__(self, root: Union[str, Path, None] = None):
+        """Initialize with the publish directory (defaults to ``VECTOR_SNAPSHOT_DIRECTORY``)."""
+        self.root = Path(root or config.vector_snapshot_directory)
+        self.pointer = self.root / POINTER_FILE
+    
+    def latest(self) -> Optional[str]:
+        """Get the version ``CURRENT`` points to, or None before the first publish."""
+        try:
+            return self.pointer.read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def path(self, version: str) -> Path:
+        """Get the Chroma directory of a published version."""
+        return self.root / version
+    
+    def point_to(self, version: str) -> None:
+        """Make ``version`` the current copy."""
+        # Write then rename so readers never see a partial pointer
+        temp_path = self.root / f".{POINTER_FILE}.{uuid.uuid4().hex}.tmp"
+        temp_path.write_text(version, encoding="utf-8")
+        os.replace(temp_path, self.pointer)
+    
+    def lease_path(self, version: str) -> Path:
+        """Get this process's lease file for a version."""
+        return self.root / LEASE_DIRECTORY / version / f"{socket.gethostname()}-{os.getpid()}"
+    
+    def take_lease(self, version: str) -> None:
+        """Create or refresh this process's lease on a version."""
+        lease = self.lease_path(version)
+        lease.parent.mkdir(parents=True, exist_ok=True)
+        lease.touch()
+    
+    def drop_lease(self, version: str) -> None:
+        """Remove this process's lease on a version."""
+        lease = self.lease_path(version)
+        lease.unlink(missing_ok=True)
+        try:
+            lease.parent.rmdir()
+        except OSError:
+            # Other readers still hold leases on it
+            pass
+    
+    def leased(self, version: str) -> bool:
+        """Check whether any reader refreshed a lease on a version within ``LEASE_TTL``."""
+        cutoff = time.time() - LEASE_TTL
+        try:
+            return any(lease.stat().st_mtime >= cutoff for lease in (self.root / LEASE_DIRECTORY / version).iterdir())
+        except FileNotFoundError:
+            return False
+    
+    def prune(self, keep: int) -> None:
+        """Delete all but the newest ``keep`` copies, never the current one or one a reader leases."""
+        latest = self.latest()
+        versions = sorted(
+            (path for path in self.root.iterdir() if path.is_dir() and not path.name.startswith(".")),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        for path in versions[max(keep, 1):]:
+            if path.name == latest:
+                continue
+            if self.leased(path.name):
+                logger.info(f"Keeping published vector store copy {path.name}: a reader still serves it")
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.rmtree(self.root / LEASE_DIRECTORY / path.name, ignore_errors=True)
+            logger.info(f"Removed published vector store copy {path.name}")
+
+
+class PublishedVersion:
+    """Index version of a reader's pinned copy, used in place of ``IndexVersion``."""
+    
+    def __init__(self, version: str, path: Union[str, Path]):
+        """Initialize with the version being served and its directory."""
+        self.version = version
+        self.path = Path(path)
+    
+    def current(self) -> str:
+        """Get the version this store serves."""
+        return self.version
+    
+    def last_modified(self) -> Optional[float]:
+        """Get the time the copy was published as a Unix timestamp."""
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+    
+    def bump(self) -> str:
+        """Published copies never change."""
+        raise ReadOnlyVectorStoreError("Published vector store copies are read-only")
+
+
+def publish_snapshot(source: Optional[VectorStore] = None, root: Union[str, Path, None] = None,
+                     keep: Optional[int] = None, batch_size: int = 1000) -> Optional[str]:
+    """Publish a copy of the writer's store and point ``CURRENT`` at it.
+    
+    Args:
+        source: The store to copy (defaults to the configured one)
+        root: Publish directory (defaults to ``VECTOR_SNAPSHOT_DIRECTORY``)
+        keep: Copies to keep, including the new one (defaults to ``VECTOR_SNAPSHOT_KEEP``)
+        batch_size: Records copied per page
+    
+    Returns:
+        The published version, or None if the store changed while it was
+        being copied. The write that changed it asks for another publish.
+    """
+    source = source or VectorStore(read_only=False)
+    published = PublishedIndex(root)
+    keep = keep or config.vector_snapshot_keep
+    
+    version = source.index_version.current()
+    if published.latest() == version:
+        return version
+    
+    published.root.mkdir(parents=True, exist_ok=True)
+    build_dir = published.root / f".{version}.{uuid.uuid4().hex}.tmp"
+    start = time.perf_counter()
+    
+    try:
+        with tempfile.TemporaryDirectory(dir=published.root, prefix=".export-") as export_dir:
+            export_snapshot(source, export_dir, batch_size=batch_size)
+            copy = VectorStore(
+                persist_directory=str(build_dir),
+                collection_name=source.collection_name,
+                num_shards=source.num_shards,
+                shard_key=source.shard_key,
+                read_only=False
+            )
+            import_snapshot(copy, export_dir, batch_size=batch_size)
+            del copy
+            release_client(build_dir)
+        
+        if source.index_version.current() != version:
+            logger.info(f"Vector store changed while publishing version {version}; skipping it")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return None
+        
+        os.replace(build_dir, published.path(version))
+    except Exception:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+    
+    published.point_to(version)
+    published.prune(keep)
+    logger.info(f"Published vector store version {version} in {time.perf_counter() - start:.1f}s")
+    return version
+
+
+def release_client(path: Union[str, Path]) -> None:
+    """Stop Chroma's cached client system for a directory, freeing its memory.
+    
+    Chroma keeps one system per persist directory for the life of the
+    process, so copies that are no longer served would otherwise stay in
+    memory. This relies on Chroma internals and is skipped if they change.
+    """
+    try:
+        from chromadb.api.client import SharedSystemClient
+        
+        systems = getattr(SharedSystemClient, "_identifier_to_system", None)
+        if systems is None:
+            systems = getattr(SharedSystemClient, "_identifer_to_system", {})
+        system = systems.pop(str(path), None)
+        getattr(SharedSystemClient, "_identifier_to_refcount", {}).pop(str(path), None)
+        if system is not None:
+            system.stop()
+    except Exception as e:
+        logger.warning(f"Could not release the Chroma client for {path}: {str(e)}")
+
+
+# The version this process serves, versions being loaded, how many VectorStore
+# instances use each version, and versions whose Chroma system is still open
+_serving = {"version": None, "lease_refreshed": 0.0}
+_loading = set()
+_pins = {}
+_open = set()
+# Reentrant: a VectorStore may be garbage-collected, and unpinned, while it is held
+_serving_lock = threading.RLock()
+
+
+def serving_snapshot(holder: Any) -> Tuple[str, str]:
+    """Get the published version a reader should serve now, and its directory.
+    
+    The version is pinned for as long as ``holder`` (the ``VectorStore``
+    opening it) is alive: its Chroma system is not released, and its lease
+    keeps the writer from pruning it, until no instance uses it any more.
+    
+    The first call serves the current copy straight away (warmup loads
+    it). Later, when ``CURRENT`` moves, the new copy is loaded in the
+    background and served once ready; until then the old one is returned.
+    
+    Raises:
+        RuntimeError: If nothing has been published yet
+    """
+    published = PublishedIndex()
+    latest = published.latest()
+    
+    with _serving_lock:
+        current = _serving["version"]
+        if current is None:
+            if latest is None:
+                raise RuntimeError(
+                    f"No vector store copy published in {published.root}; "
+                    "run `manage.py publish_vector_snapshot` on the writer"
+                )
+            _serving["version"] = current = latest
+            _open.add(current)
+            published.take_lease(current)
+        elif latest is not None and latest != current and latest not in _loading:
+            _loading.add(latest)
+            threading.Thread(target=_load_version, args=(published, latest), name="snapshot-load", daemon=True).start()
+        
+        _pins[current] = _pins.get(current, 0) + 1
+        weakref.finalize(holder, _unpin, published, current)
+        
+        if time.monotonic() - _serving["lease_refreshed"] >= LEASE_REFRESH:
+            _serving["lease_refreshed"] = time.monotonic()
+            for version in _open:
+                published.take_lease(version)
+    
+    return current, str(published.path(current))
+
+
+def _unpin(published: PublishedIndex, version: str) -> None:
+    """Drop one instance's use of a version, retiring it if it is no longer served or used."""
+    with _serving_lock:
+        _pins[version] -= 1
+        if _pins[version]:
+            return
+        del _pins[version]
+        if version == _serving["version"] or version not in _open:
+            return
+        _open.discard(version)
+    _retire(published, version)
+
+
+def _retire(published: PublishedIndex, version: str) -> None:
+    """Free a version nothing in this process uses: its Chroma system, then its lease."""
+    release_client(published.path(version))
+    published.drop_lease(version)
+    logger.info(f"Released vector store version {version}")
+
+
+def _load_version(published: PublishedIndex, version: str) -> None:
+    """Open a newly published copy, load its index, then start serving it."""
+    start = time.perf_counter()
+    try:
+        published.take_lease(version)
+        VectorStore(persist_directory=str(published.path(version)), read_only=True).load_index()
+    except Exception as e:
+        logger.error(f"Could not load published vector store version {version}: {str(e)}")
+        with _serving_lock:
+            _loading.discard(version)
+        release_client(published.path(version))
+        published.drop_lease(version)
+        return
+    
+    with _serving_lock:
+        previous = _serving["version"]
+        _serving["version"] = version
+        _open.add(version)
+        _loading.discard(version)
+        # Requests still using the previous copy keep it until their stores are gone
+        retired = previous if previous is not None and not _pins.get(previous) and previous in _open else None
+        if retired is not None:
+            _open.discard(retired)
+    logger.info(f"Serving vector store version {version}, loaded in {time.perf_counter() - start:.1f}s")
+    
+    if retired is not None:
+        _retire(published, retired)
+
+
+class SnapshotPublisher:
+    """Publishes the writer's store in the background after writes.
+    
+    Writes during a publish are coalesced into one more publish, so a
+    burst of uploads produces at most two copies.
+    """
+    
+    def __init__(self):
+        """Initialize an idle publisher."""
+        self._lock = threading.Lock()
+        self._pending = False
+        self._thread = None
+        self._atexit_registered = False
+        self.published = 0
+        self.failed = 0
+        self.last_version = None
+    
+    def request(self) -> None:
+        """Ask for a publish of the current state of the store."""
+        with self._lock:
+            self._pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-publisher", daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.wait)
+                    self._atexit_registered = True
+    
+    def _run(self) -> None:
+        """Publish until no request is pending."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            
+            try:
+                version = publish_snapshot()
+                if version is not None:
+                    self.published += 1
+                    self.last_version = version
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Publishing the vector store failed: {str(e)}")
+    
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a running publish, e.g. before a management command exits."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get publish counts and the last published version."""
+        return {
+            "running": self._thread is not None,
+            "published": self.published,
+            "failed": self.failed,
+            "last_version": self.last_version,
+        }
+
+
+# Process-wide publisher for the writer
+snapshot_publisher = SnapshotPublisher()
@@ -0,0 +1,174 @@
+"""Snapshot export and import for the RAG vector store.
+
+A snapshot is a directory holding everything needed to rebuild a collection
+without re-embedding:
+
+- ``manifest.json``: collection name, record count and embedding dimension
+- ``embeddings.npy``: float32 matrix with one row per record
+- ``records.parquet``: ids, document texts and JSON-encoded metadata, in the
+  same row order as ``embeddings.npy``
+
+Both data files are written and read page by page, so neither side holds
+the whole collection in memory.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Union
+
+from .vector_store import VectorStore
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.parquet"
+
+
+def export_snapshot(vector_store: VectorStore, output_dir: Union[str, Path],
+                    batch_size: int = 1000) -> Dict[str, Any]:
+    """Export a vector store collection to a snapshot directory.
+
+    Args:
+        vector_store: The store to export
+        output_dir: Directory to write the snapshot into (created if missing)
+        batch_size: Number of records fetched from the collection per page
+
+    Returns:
+        The snapshot manifest.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from numpy.lib.format import open_memmap
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # The count bounds the embeddings matrix; records added mid-export are left out
+    expected_count = vector_store.count()
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("document", pa.string()),
+        ("metadata", pa.string()),
+    ])
+
+    embeddings = None
+    dimension = 0
+    written = 0
+
+    with pq.ParquetWriter(output_dir / RECORDS_FILE, schema, compression="zstd") as writer:
+        pages = vector_store.iter_documents(
+            batch_size=batch_size,
+            include=["metadatas", "documents", "embeddings"]
+        )
+        for page in pages:
+            if written >= expected_count:
+                break
+
+            page_size = min(len(page["ids"]), expected_count - written)
+            page_embeddings = np.asarray(page["embeddings"][:page_size], dtype=np.float32)
+
+            if embeddings is None:
+                dimension = page_embeddings.shape[1]
+                embeddings = open_memmap(
+                    output_dir / EMBEDDINGS_FILE,
+                    mode="w+",
+                    dtype=np.float32,
+                    shape=(expected_count, dimension)
+                )
+
+            embeddings[written:written + page_size] = page_embeddings
+            writer.write_table(pa.table({
+                "id": page["ids"][:page_size],
+                "document": page["documents"][:page_size],
+                "metadata": [
+                    json.dumps(metadata or {}, ensure_ascii=False)
+                    for metadata in page["metadatas"][:page_size]
+                ],
+            }, schema=schema))
+            written += page_size
+
+    if embeddings is None:
+        # Empty collection: still write a valid, empty matrix
+        np.save(output_dir / EMBEDDINGS_FILE, np.zeros((0, 0), dtype=np.float32))
+    else:
+        embeddings.flush()
+        del embeddings
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection_name": vector_store.collection_name,
+        "count": written,
+        "dimension": dimension,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Exported {written} records from '{vector_store.collection_name}' to {output_dir}")
+    return manifest
+
+
+def import_snapshot(vector_store: VectorStore, snapshot_dir: Union[str, Path],
+                    batch_size: int = 1000) -> Dict[str, Any]:
+    """Load a snapshot directory into a vector store collection.
+
+    Args:
+        vector_store: The store to load records into
+        snapshot_dir: Directory previously written by ``export_snapshot``
+        batch_size: Number of records added to the collection per page
+
+    Returns:
+        The snapshot manifest.
+    """
+    import numpy as np
+    import pyarrow.parquet as pq
+
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+
+    if manifest["format_version"] > SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Snapshot format version {manifest['format_version']} is newer than "
+            f"the supported version {SNAPSHOT_FORMAT_VERSION}"
+        )
+
+    count = manifest["count"]
+    if count == 0:
+        return manifest
+
+    embeddings = np.load(snapshot_dir / EMBEDDINGS_FILE, mmap_mode="r")
+    records = pq.ParquetFile(snapshot_dir / RECORDS_FILE)
+
+    offset = 0
+    for batch in records.iter_batches(batch_size=batch_size):
+        rows = batch.to_pydict()
+        page_size = len(rows["id"])
+        vector_store.add_documents({
+            "ids": rows["id"],
+            "embeddings": embeddings[offset:offset + page_size].tolist(),
+            "metadatas": [json.loads(metadata) for metadata in rows["metadata"]],
+            "documents": rows["document"],
+        })
+        offset += page_size
+
+    if offset != count:
+        logger.warning(f"Snapshot manifest lists {count} records but {offset} were imported")
+
+    logger.info(f"Imported {offset} records from {snapshot_dir} into '{vector_store.collection_name}'")
+    return manifest
+
+
+def read_manifest(snapshot_dir: Union[str, Path]) -> Dict[str, Any]:
+    """Read the manifest of a snapshot directory."""
+    manifest_path = Path(snapshot_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"Snapshot manifest not found: {manifest_path}")
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,97 +1,482 @@
 """Vector database module for the RAG system using ChromaDB."""
 
-from typing import List, Dict, Any, Optional, Union
-import chromadb
-from chromadb.config import Settings
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Iterator, Optional, Union
 from tqdm import tqdm
 
 from .rag_config import config
 from .document_processor import DocumentChunk
+from .retrieval_cache import IndexVersion, RetrievalCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Shared pool for querying shards in parallel, created on first use
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool used for shard fan-out."""
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(
+                    max_workers=config.shard_search_workers,
+                    thread_name_prefix="shard-search"
+                )
+    return _search_executor
+
+
+class ReadOnlyVectorStoreError(RuntimeError):
+    """Raised when a write reaches a vector store opened read-only (``VECTOR_STORE_ROLE=reader``)."""
+
+
+def hnsw_metadata(hnsw_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate HNSW settings (SPACE, M, EF_CONSTRUCTION, EF_SEARCH) to Chroma collection metadata."""
+    return {
+        "hnsw:space": hnsw_settings["SPACE"],
+        "hnsw:M": hnsw_settings["M"],
+        "hnsw:construction_ef": hnsw_settings["EF_CONSTRUCTION"],
+        "hnsw:search_ef": hnsw_settings["EF_SEARCH"],
+    }
 
 
 class VectorStore:
-    """Vector database for storing and retrieving document embeddings."""
+    """Vector database for storing and retrieving document embeddings.
+    
+    Chunks are partitioned across ``num_shards`` Chroma collections. Shard 0
+    is the collection named ``collection_name`` itself, so a single-shard
+    store is a plain collection and existing data stays searchable when the
+    shard count is raised. Writes are routed by ``shard_key``; reads and
+    deletions fan out to every shard, so routing changes never hide data.
+    
+    Search results are cached by ``RetrievalCache`` under the collection's
+    ``IndexVersion``; every method that writes to the index bumps the
+    version, which invalidates all cached results at once.
+    
+    HNSW parameters come from ``RAG_SETTINGS['HNSW']`` (plus any
+    ``COLLECTION_HNSW`` override for ``collection_name``). Chroma fixes them
+    when a collection is created, so changing them only affects existing
+    shards after ``rebuild_shard``.
     
-    def __init__(self, persist_directory: Optional[str] = None, collection_name: str = "documents"):
-        """Initialize the vector store with persistence settings."""
+    ``VECTOR_STORE_MODE`` picks where the collections live: an embedded
+    Chroma directory per process ("embedded"), a shared Chroma server
+    ("server"), or, for readers, the copy last published by the single
+    writer ("snapshot", see ``vector_publish``).
+    """
+    
+    def __init__(self, persist_directory: Optional[str] = None, collection_name: str = "documents",
+                 num_shards: Optional[int] = None, shard_key: Optional[str] = None,
+                 read_only: Optional[bool] = None):
+        """Initialize the vector store with persistence and sharding settings.
+        
+        Args:
+            persist_directory: Directory for ChromaDB persistence
+            collection_name: Base name of the collection (and name of shard 0)
+            num_shards: Number of collections to partition chunks across
+            shard_key: "id" to route by a hash of the chunk ID, or the name of a
+                metadata field (e.g. "document_id" or "tenant") to keep chunks
+                that share that value on the same shard
+            read_only: Refuse writes (defaults to true with ``VECTOR_STORE_ROLE=reader``)
+        
+        An explicit ``persist_directory`` always opens that embedded directory,
+        whatever the mode.
+        """
+        self.read_only = config.vector_store_role == "reader" if read_only is None else read_only
         self.persist_directory = persist_directory or config.chroma_persist_directory
         self.collection_name = collection_name
+        self.num_shards = max(1, num_shards or config.vector_shards)
+        self.shard_key = shard_key or config.shard_key
+        self.hnsw_metadata = hnsw_metadata(config.hnsw_settings(collection_name))
         
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(
-            path=self.persist_directory,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        import chromadb
+        from chromadb.config import Settings
+        
+        self.index_version = IndexVersion(self.persist_directory, self.collection_name)
+        mode = config.vector_store_mode if persist_directory is None else "embedded"
+        
+        if mode == "server":
+            # The server orders writes from every process; the version token stays on shared disk
+            self.client = chromadb.HttpClient(
+                host=config.chroma_server_host,
+                port=config.chroma_server_port,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        else:
+            if mode == "snapshot" and self.read_only:
+                # Serve the published copy this process has loaded, pinned for this instance
+                from .vector_publish import PublishedVersion, serving_snapshot
+                
+                version, self.persist_directory = serving_snapshot(self)
+                self.index_version = PublishedVersion(version, self.persist_directory)
+            
+            # Initialize ChromaDB client with persistence
+            self.client = chromadb.PersistentClient(
+                path=self.persist_directory,
+                settings=Settings(anonymized_telemetry=False)
+            )
+        
+        # Get or create one collection per shard
+        self.shard_names = [self._shard_name(i) for i in range(self.num_shards)]
+        self.collections = [
+            self.client.get_or_create_collection(name=name, metadata=self.hnsw_metadata)
+            for name in self.shard_names
+        ]
+        
+        self.retrieval_cache = RetrievalCache() if config.retrieval_cache_enabled else None
+    
+    @property
+    def collection(self):
+        """The primary (shard 0) collection."""
+        return self.collections[0]
+    
+    def _shard_name(self, index: int) -> str:
+        """Get the collection name of a shard."""
+        return self.collection_name if index == 0 else f"{self.collection_name}_shard_{index}"
+    
+    def _shard_for(self, chunk_id: str, metadata: Optional[Dict[str, Any]]) -> int:
+        """Pick the shard a chunk is written to."""
+        if self.num_shards == 1:
+            return 0
+        
+        key = chunk_id
+        if self.shard_key != "id" and metadata and metadata.get(self.shard_key) is not None:
+            key = str(metadata[self.shard_key])
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(key.encode("utf-8")) % self.num_shards
+    
+    def _check_writable(self) -> None:
+        """Raise ``ReadOnlyVectorStoreError`` if this store was opened read-only."""
+        if self.read_only:
+            raise ReadOnlyVectorStoreError(
+                "This process is a vector store reader; send writes to the ingest (writer) process"
+            )
     
     def add_documents(self, embedded_chunks: Dict[str, Any]) -> None:
         """Add document embeddings to the vector store."""
+        self._check_writable()
+        
+        # Group chunk positions by destination shard
+        shard_positions = {}
+        for position, chunk_id in enumerate(embedded_chunks["ids"]):
+            metadata = embedded_chunks["metadatas"][position]
+            shard_positions.setdefault(self._shard_for(chunk_id, metadata), []).append(position)
+        
         # Add documents in batches to avoid memory issues
         batch_size = 100
-        total_docs = len(embedded_chunks["ids"])
-        
-        for i in tqdm(range(0, total_docs, batch_size), desc="Adding to vector store"):
-            end_idx = min(i + batch_size, total_docs)
-            self.collection.add(
-                ids=embedded_chunks["ids"][i:end_idx],
-                embeddings=embedded_chunks["embeddings"][i:end_idx],
-                metadatas=embedded_chunks["metadatas"][i:end_idx],
-                documents=embedded_chunks["documents"][i:end_idx]
-            )
+        
+        for shard_index, positions in shard_positions.items():
+            collection = self.collections[shard_index]
+            for i in tqdm(range(0, len(positions), batch_size), desc="Adding to vector store"):
+                batch = positions[i:i + batch_size]
+                collection.add(
+                    ids=[embedded_chunks["ids"][p] for p in batch],
+                    embeddings=[embedded_chunks["embeddings"][p] for p in batch],
+                    metadatas=[embedded_chunks["metadatas"][p] for p in batch],
+                    documents=[embedded_chunks["documents"][p] for p in batch]
+                )
+        
+        if shard_positions:
+            self.index_version.bump()
     
-    def search(self, query_embedding: List[float], top_k: Optional[int] = None) -> Dict[str, Any]:
-        """Search for similar documents using a query embedding."""
+    def search(self, query_embedding: List[float], top_k: Optional[int] = None,
+               where: Optional[Dict[str, Any]] = None, use_cache: bool = True,
+               timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Search for similar documents using a query embedding.
+        
+        With several shards, each one is queried for ``top_k`` results in
+        parallel and the union is cut back to the global ``top_k`` by
+        distance. A shard that fails (e.g. while being rebuilt) or has not
+        answered within ``timeout`` is skipped so the other shards still
+        answer.
+        
+        Args:
+            query_embedding: The query vector
+            top_k: Number of results (defaults to ``TOP_K_RESULTS``)
+            where: Optional Chroma metadata filter
+            use_cache: Whether to read and fill the retrieval cache
+            timeout: Seconds to wait for the shards
+        
+        Raises:
+            TimeoutError: If no shard answered within ``timeout``.
+        """
         top_k = top_k or config.top_k_results
         
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["metadatas", "documents", "distances"]
+        if not (use_cache and self.retrieval_cache):
+            return self._search_shards(query_embedding, top_k, where, timeout)
+        
+        cache_key = RetrievalCache.make_key(
+            self.collection_name, query_embedding, top_k, where, self.index_version.current()
         )
+        results = self.retrieval_cache.get(cache_key)
+        if results is None:
+            results = self._search_shards(query_embedding, top_k, where, timeout)
+            self.retrieval_cache.set(cache_key, results)
         
         return results
     
+    def _search_shards(self, query_embedding: List[float], top_k: int,
+                       where: Optional[Dict[str, Any]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Query every shard and merge the results."""
+        if self.num_shards == 1 and timeout is None:
+            return self._query_shard(0, query_embedding, top_k, where)
+        
+        executor = _get_search_executor()
+        futures = [
+            executor.submit(self._query_shard, i, query_embedding, top_k, where)
+            for i in range(self.num_shards)
+        ]
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        
+        shard_results = []
+        timed_out = 0
+        for i, future in enumerate(futures):
+            try:
+                wait = max(expires_at - time.monotonic(), 0) if expires_at is not None else None
+                shard_results.append(future.result(timeout=wait))
+            except FutureTimeoutError:
+                timed_out += 1
+                logger.warning(f"Search on shard '{self.shard_names[i]}' missed the {timeout:g}s deadline, skipping it")
+            except Exception as e:
+                logger.warning(f"Search on shard '{self.shard_names[i]}' failed, skipping it: {str(e)}")
+        
+        if not shard_results:
+            if timed_out:
+                raise TimeoutError(f"No shard answered the search within {timeout:g}s")
+            raise RuntimeError("Search failed on every shard")
+        
+        return self._merge_results(shard_results, top_k)
+    
+    def _query_shard(self, index: int, query_embedding: List[float], top_k: int,
+                     where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Query one shard, reopening its collection once if the handle went stale."""
+        query_args = {
+            "query_embeddings": [query_embedding],
+            "n_results": top_k,
+            "where": where,
+            "include": ["metadatas", "documents", "distances"]
+        }
+        try:
+            return self.collections[index].query(**query_args)
+        except Exception:
+            # The shard may have been swapped by a rebuild in another process
+            self.collections[index] = self.client.get_collection(name=self.shard_names[index])
+            return self.collections[index].query(**query_args)
+    
+    @staticmethod
+    def _merge_results(shard_results: List[Dict[str, Any]], top_k: int) -> Dict[str, Any]:
+        """Merge per-shard query results into one result set ordered by distance."""
+        hits = []
+        for result in shard_results:
+            hits.extend(zip(
+                result.get("distances", [[]])[0],
+                result.get("ids", [[]])[0],
+                result.get("documents", [[]])[0],
+                result.get("metadatas", [[]])[0]
+            ))
+        hits.sort(key=lambda hit: hit[0])
+        hits = hits[:top_k]
+        
+        return {
+            "ids": [[hit[1] for hit in hits]],
+            "documents": [[hit[2] for hit in hits]],
+            "metadatas": [[hit[3] for hit in hits]],
+            "distances": [[hit[0] for hit in hits]]
+        }
+    
+    def load_index(self) -> None:
+        """Load every shard's index into memory with a one-result search.
+        
+        Chroma reads a collection's HNSW index on its first query; doing
+        that here keeps the cost off the first real search.
+        """
+        for collection in self.collections:
+            page = collection.get(limit=1, include=["embeddings"])
+            if page["embeddings"] is None or not len(page["embeddings"]):
+                continue
+            embedding = page["embeddings"][0]
+            collection.query(
+                query_embeddings=[embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)],
+                n_results=1,
+                include=[]
+            )
+    
+    def count(self) -> int:
+        """Get the number of chunks across all shards."""
+        return sum(collection.count() for collection in self.collections)
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
-        count = self.collection.count()
+        shard_counts = {
+            name: collection.count()
+            for name, collection in zip(self.shard_names, self.collections)
+        }
         return {
             "collection_name": self.collection_name,
-            "document_count": count,
-            "persist_directory": self.persist_directory
+            "document_count": sum(shard_counts.values()),
+            "persist_directory": self.persist_directory,
+            "shard_count": self.num_shards,
+            "shard_key": self.shard_key,
+            "shards": shard_counts
         }
     
     def delete_collection(self) -> None:
-        """Delete the entire collection."""
-        self.client.delete_collection(name=self.collection_name)
-        # Recreate an empty collection
-        self.collection = self.client.get_or_create_collection(name=self.collection_name)
+        """Delete the entire collection (every shard)."""
+        self._check_writable()
+        for i, name in enumerate(self.shard_names):
+            self.client.delete_collection(name=name)
+            # Recreate an empty collection
+            self.collections[i] = self.client.get_or_create_collection(name=name, metadata=self.hnsw_metadata)
+        
+        self.index_version.bump()
     
-    def get_all_documents(self) -> Dict[str, Any]:
+    def rebuild_shard(self, index: int, batch_size: int = 1000) -> int:
+        """Rebuild one shard's collection from its own records.
+        
+        Records are copied into a fresh collection, built with the current
+        HNSW settings, while the old one keeps serving searches; the new
+        collection then takes over the shard name.
+        Other shards are never touched. Writes routed to this shard while
+        the rebuild runs may be lost, so pause ingest for it first.
+        
+        Args:
+            index: The shard to rebuild
+            batch_size: Number of records copied per page
+        
+        Returns:
+            The number of records copied.
+        """
+        self._check_writable()
+        name = self.shard_names[index]
+        old_collection = self.collections[index]
+        rebuild_name = f"{name}_rebuild"
+        
+        # Clear leftovers from an interrupted rebuild
+        try:
+            self.client.delete_collection(name=rebuild_name)
+        except Exception:
+            pass
+        new_collection = self.client.create_collection(name=rebuild_name, metadata=self.hnsw_metadata)
+        
+        copied = 0
+        offset = 0
+        while True:
+            page = old_collection.get(
+                include=["metadatas", "documents", "embeddings"],
+                limit=batch_size,
+                offset=offset
+            )
+            if not page["ids"]:
+                break
+            new_collection.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                metadatas=page["metadatas"],
+                documents=page["documents"]
+            )
+            copied += len(page["ids"])
+            offset += len(page["ids"])
+            if len(page["ids"]) < batch_size:
+                break
+        
+        # Swap: searches on this shard fail only between these two calls
+        self.client.delete_collection(name=name)
+        new_collection.modify(name=name)
+        self.collections[index] = new_collection
+        self.index_version.bump()
+        
+        logger.info(f"Rebuilt shard '{name}' with {copied} records")
+        return copied
+    
+    def iter_documents(self, batch_size: int = 1000,
+                       include: Optional[List[str]] = None,
+                       where: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over the collection one page at a time, shard by shard.
+        
+        Args:
+            batch_size: Maximum number of records fetched per page
+            include: Fields to fetch besides ids (any of "documents",
+                "metadatas" and "embeddings"). Defaults to documents and
+                metadatas, so vectors are only loaded when asked for.
+            where: Optional metadata filter restricting the records returned
+        
+        Yields:
+            Dicts with ids and the requested fields for each page.
+        """
+        include = include if include is not None else ["metadatas", "documents"]
+        
+        for collection in self.collections:
+            offset = 0
+            while True:
+                page = collection.get(
+                    include=include,
+                    limit=batch_size,
+                    offset=offset,
+                    where=where
+                )
+                if not page["ids"]:
+                    break
+                
+                yield page
+                
+                if len(page["ids"]) < batch_size:
+                    break
+                offset += len(page["ids"])
+    
+    def get_all_documents(self, include: Optional[List[str]] = None) -> Dict[str, Any]:
         """Get all documents from the collection.
         
+        Prefer ``iter_documents`` for large collections; this method still
+        materializes every requested field in memory.
+        
+        Args:
+            include: Fields to fetch besides ids. Defaults to documents and
+                metadatas; pass "embeddings" explicitly to load vectors.
+        
         Returns:
-            Dict with ids, documents, metadatas, and embeddings.
+            Dict with ids and the requested fields.
         """
-        # Get collection count
-        count = self.collection.count()
-        
-        if count == 0:
-            return {
-                "ids": [],
-                "documents": [],
-                "metadatas": [],
-                "embeddings": []
-            }
-        
-        # Get all documents
-        results = self.collection.get(
-            include=["metadatas", "documents", "embeddings"]
-        )
+        include = include if include is not None else ["metadatas", "documents"]
+        results = {"ids": [], **{field: [] for field in include}}
+        
+        for page in self.iter_documents(include=include):
+            results["ids"].extend(page["ids"])
+            for field in include:
+                results[field].extend(page[field])
         
         return results
     
+    def delete_document(self, document_id: int) -> int:
+        """Delete every chunk belonging to one document.
+        
+        Args:
+            document_id: The ``Document`` primary key stored in the chunk metadata
+        
+        Returns:
+            The number of chunks deleted.
+        """
+        self._check_writable()
+        where = {"document_id": document_id}
+        deleted = 0
+        
+        for collection in self.collections:
+            chunk_ids = collection.get(where=where, include=[])["ids"]
+            if chunk_ids:
+                collection.delete(ids=chunk_ids)
+                deleted += len(chunk_ids)
+        
+        if deleted:
+            self.index_version.bump()
+        
+        return deleted
+    
     def update_document_metadata(self, document_id: str, metadata: Dict[str, Any]) -> None:
         """Update metadata for a specific document.
         
@@ -99,21 +484,64 @@ class VectorStore:
             document_id: The ID of the document to update
             metadata: The new metadata to set
         """
-        # Get the current document to preserve other fields
-        current = self.collection.get(
-            ids=[document_id],
-            include=["metadatas", "documents", "embeddings"]
-        )
+        updated = self.update_metadata({document_id: metadata})
         
-        if not current["ids"]:
+        if not updated:
             raise ValueError(f"Document with ID {document_id} not found")
+    
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]], batch_size: int = 100) -> int:
+        """Merge new metadata into many chunks without loading their embeddings.
         
-        # Update metadata (merge with existing metadata)
-        current_metadata = current["metadatas"][0]
-        updated_metadata = {**current_metadata, **metadata}
+        Args:
+            updates: Mapping of chunk ID to the metadata fields to merge in
+            batch_size: Number of chunks read and written per call
+        
+        Returns:
+            The number of chunks updated. Unknown IDs are skipped.
+        """
+        self._check_writable()
+        chunk_ids = list(updates)
+        updated = 0
+        
+        for collection in self.collections:
+            for i in range(0, len(chunk_ids), batch_size):
+                current = collection.get(
+                    ids=chunk_ids[i:i + batch_size],
+                    include=["metadatas"]
+                )
+                if not current["ids"]:
+                    continue
+                
+                collection.update(
+                    ids=current["ids"],
+                    metadatas=[
+                        {**(current_metadata or {}), **updates[chunk_id]}
+                        for chunk_id, current_metadata in zip(current["ids"], current["metadatas"])
+                    ]
+                )
+                updated += len(current["ids"])
+        
+        # Cached results carry metadata, so they are stale too
+        if updated:
+            self.index_version.bump()
+        
+        return updated
+    
+    def update_metadata_where(self, where: Dict[str, Any], metadata: Dict[str, Any],
+                              batch_size: int = 100) -> int:
+        """Merge the same metadata fields into every chunk matching a filter.
+        
+        Args:
+            where: Chroma metadata filter selecting the chunks to update
+            metadata: The metadata fields to merge in
+            batch_size: Number of chunks read and written per call
+        
+        Returns:
+            The number of chunks updated.
+        """
+        # Collect ids first: updating while paginating could shift the pages
+        chunk_ids = []
+        for page in self.iter_documents(batch_size=batch_size, include=[], where=where):
+            chunk_ids.extend(page["ids"])
         
-        # Update the document
-        self.collection.update(
-            ids=[document_id],
-            metadatas=[updated_metadata]
-        )
\ No newline at end of file
+        return self.update_metadata({chunk_id: metadata for chunk_id in chunk_ids}, batch_size=batch_size)
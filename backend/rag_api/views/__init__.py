@@ -1,11 +1,21 @@
-from .document_views import DocumentListView, DocumentUploadView
-from .query_views import QueryView, QueryHistoryView
-from .system_views import SystemInfoView
+from .document_views import DocumentListView, DocumentUploadView, DocumentDetailView
+from .query_views import QueryView, QueryStreamView, QueryHistoryView
+from .system_views import SystemInfoView, SystemMetricsView, SystemReadyView
+from .async_query_views import AsyncQueryView
+from .conversation_views import ConversationListView, ConversationDetailView, ConversationQueryView
 
 __all__ = [
     'DocumentListView',
     'DocumentUploadView', 
+    'DocumentDetailView',
     'QueryView', 
+    'QueryStreamView',
+    'AsyncQueryView',
     'QueryHistoryView', 
-    'SystemInfoView'
+    'ConversationListView',
+    'ConversationDetailView',
+    'ConversationQueryView',
+    'SystemInfoView',
+    'SystemMetricsView',
+    'SystemReadyView'
 ] 
\ No newline at end of file
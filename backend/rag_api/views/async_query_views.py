@@ -0,0 +1,74 @@
+import json
+import logging
+import math
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from ..admission import AdmissionRejected, query_admission
+from ..serializers import QuerySerializer
+from ..services.async_query_service import AsyncQueryService
+from ..utils import QueryRateThrottle
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncQueryView(View):
+    """Async API view for querying the RAG system.
+    
+    DRF's APIView is synchronous, so this is a plain Django async view with
+    the same request and response shape as ``QueryView``. Under ASGI a
+    request waiting on Cohere or Gemini holds no worker thread.
+    """
+    
+    async def post(self, request):
+        """Process a query and return the response."""
+        # DRF only applies throttles to its own views, so check the rate here
+        throttle = QueryRateThrottle()
+        if not throttle.allow_request(request, self):
+            response = JsonResponse(
+                {"error": "Request was throttled"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response["Retry-After"] = str(max(1, math.ceil(throttle.wait() or 1)))
+            return response
+        
+        try:
+            data = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Request body must be JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = QuerySerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            async with query_admission.admit_async():
+                response_data = await AsyncQueryService.process_query(
+                    serializer.validated_data['query'],
+                    deadline_seconds=serializer.validated_data.get('deadline')
+                )
+            return JsonResponse(response_data, json_dumps_params={"ensure_ascii": False})
+        except AdmissionRejected as e:
+            response = JsonResponse(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response["Retry-After"] = str(e.retry_after)
+            return response
+        except TimeoutError as e:
+            logger.warning(f"Query deadline exceeded: {str(e)}")
+            return JsonResponse(
+                {"error": str(e)},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            return JsonResponse(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
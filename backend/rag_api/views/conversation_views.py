@@ -0,0 +1,110 @@
+import logging
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from ..admission import AdmissionRejected, query_admission
+from ..models import Conversation
+from ..services import ConversationService
+from ..serializers import ConversationSerializer, QuerySerializer
+from ..utils import QueryRateThrottle
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class ConversationListView(APIView):
+    """API view for starting conversations."""
+    
+    def post(self, request):
+        """Start a new conversation."""
+        try:
+            conversation = ConversationService.create_conversation()
+            return Response(ConversationSerializer(conversation).data, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            logger.error(f"Error creating conversation: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ConversationDetailView(APIView):
+    """API view for a single conversation."""
+    
+    def get(self, request, pk):
+        """Get a conversation with its turns."""
+        try:
+            conversation = ConversationService.get_conversation(pk)
+            return Response(ConversationSerializer(conversation).data)
+        except Conversation.DoesNotExist:
+            return Response(
+                {"error": f"Conversation {pk} not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error fetching conversation {pk}: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    def delete(self, request, pk):
+        """Delete a conversation and its turns."""
+        try:
+            ConversationService.delete_conversation(pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        except Conversation.DoesNotExist:
+            return Response(
+                {"error": f"Conversation {pk} not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error deleting conversation {pk}: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ConversationQueryView(APIView):
+    """API view for asking the next question in a conversation."""
+    throttle_classes = [QueryRateThrottle]
+    
+    def post(self, request, pk):
+        """Answer a question, reusing the previous turn's context when it still fits."""
+        serializer = QuerySerializer(data=request.data)
+        
+        if serializer.is_valid():
+            try:
+                with query_admission.admit():
+                    response_data = ConversationService.process_turn(
+                        pk,
+                        serializer.validated_data['query'],
+                        deadline_seconds=serializer.validated_data.get('deadline')
+                    )
+                return Response(response_data)
+            except AdmissionRejected as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            except Conversation.DoesNotExist:
+                return Response(
+                    {"error": f"Conversation {pk} not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            except TimeoutError as e:
+                logger.warning(f"Query deadline exceeded: {str(e)}")
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_504_GATEWAY_TIMEOUT
+                )
+            except Exception as e:
+                logger.error(f"Error processing conversation query: {str(e)}")
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -1,11 +1,17 @@
+import hashlib
 import logging
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from ..models import Document
 from ..services import DocumentService
 from ..serializers import DocumentSerializer, DocumentUploadSerializer
+from ..utils import DocumentPagination
+from ..vector_store import ReadOnlyVectorStoreError
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,11 +20,44 @@ class DocumentListView(APIView):
     """API view for listing documents."""
     
     def get(self, request):
-        """Get all documents."""
+        """Get a page of documents.
+        
+        Query parameters: ``page``, ``page_size``, ``ordering`` (e.g.
+        ``-upload_date`` or ``title``), ``file_type`` and ``title``. The
+        response carries ETag and Last-Modified headers; a conditional
+        request for an unchanged list gets 304 Not Modified without the
+        documents being read.
+        """
         try:
-            documents = DocumentService.get_all_documents()
-            serializer = DocumentSerializer(documents, many=True)
-            return Response(serializer.data)
+            version, last_modified = DocumentService.get_list_version()
+            etag = '"' + hashlib.sha1(f"{version}|{request.get_full_path()}".encode("utf-8")).hexdigest() + '"'
+            last_modified = int(last_modified) if last_modified is not None else None
+            
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+            
+            try:
+                documents = DocumentService.get_all_documents(
+                    ordering=request.query_params.get('ordering', '-upload_date'),
+                    file_type=request.query_params.get('file_type'),
+                    title=request.query_params.get('title')
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            
+            paginator = DocumentPagination()
+            page = paginator.paginate_queryset(documents, request, view=self)
+            serializer = DocumentSerializer(page, many=True)
+            
+            response = paginator.get_paginated_response(serializer.data)
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Clients may keep the list but must revalidate it on every use
+            response['Cache-Control'] = 'no-cache'
+            return response
         except Exception as e:
             logger.error(f"Error fetching documents: {str(e)}")
             return Response(
@@ -49,6 +88,11 @@ class DocumentUploadView(APIView):
                     status=status.HTTP_201_CREATED
                 )
                 
+            except ReadOnlyVectorStoreError as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
             except Exception as e:
                 logger.error(f"Error uploading document: {str(e)}")
                 return Response(
@@ -56,4 +100,30 @@ class DocumentUploadView(APIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST) 
+
+
+class DocumentDetailView(APIView):
+    """API view for a single document."""
+    
+    def delete(self, request, pk):
+        """Delete a document and all of its chunks from the vector store."""
+        try:
+            DocumentService.delete_document(pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        except Document.DoesNotExist:
+            return Response(
+                {"error": f"Document {pk} not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except ReadOnlyVectorStoreError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        except Exception as e:
+            logger.error(f"Error deleting document {pk}: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
\ No newline at end of file
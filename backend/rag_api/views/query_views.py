@@ -1,16 +1,23 @@
+import json
 import logging
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from ..admission import AdmissionRejected, AdmittedStream, AsyncAdmittedStream, query_admission
 from ..services import QueryService
 from ..serializers import QueryHistorySerializer, QuerySerializer
+from ..utils import QueryHistoryPagination, QueryRateThrottle
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 class QueryView(APIView):
     """API view for querying the RAG system."""
+    throttle_classes = [QueryRateThrottle]
     
     def post(self, request):
         """Process a query and return the response."""
@@ -19,9 +26,24 @@ class QueryView(APIView):
         if serializer.is_valid():
             try:
                 query_text = serializer.validated_data['query']
-                response_data = QueryService.process_query(query_text)
+                with query_admission.admit():
+                    response_data = QueryService.process_query(
+                        query_text, deadline_seconds=serializer.validated_data.get('deadline')
+                    )
                 return Response(response_data)
                 
+            except AdmissionRejected as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            except TimeoutError as e:
+                logger.warning(f"Query deadline exceeded: {str(e)}")
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_504_GATEWAY_TIMEOUT
+                )
             except Exception as e:
                 logger.error(f"Error processing query: {str(e)}")
                 return Response(
@@ -32,15 +54,84 @@ class QueryView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class QueryStreamView(APIView):
+    """API view streaming a query's sources and answer as server-sent events.
+    
+    Events, in order: ``sources`` (once retrieval finishes), ``token`` (one
+    per generated text fragment), then ``done`` with the full response, or
+    ``error`` if anything fails mid-stream. Accepts POST with a JSON body or
+    GET with a ``query`` parameter, so browsers can use ``EventSource``.
+    The admission slot is held until the stream closes. Under ASGI the body
+    is asynchronous, so each event is sent as soon as it is produced.
+    """
+    throttle_classes = [QueryRateThrottle]
+    
+    def get(self, request):
+        """Stream a query passed as a URL parameter."""
+        return self._stream(request, QuerySerializer(data=request.query_params))
+    
+    def post(self, request):
+        """Stream a query passed in the request body."""
+        return self._stream(request, QuerySerializer(data=request.data))
+    
+    def _stream(self, request, serializer):
+        """Validate the query and start the event stream."""
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        query_text = serializer.validated_data['query']
+        try:
+            query_admission.acquire()
+        except AdmissionRejected as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
+        # A synchronous body would be collected in full before sending under ASGI
+        body_class = AsyncAdmittedStream if isinstance(request._request, ASGIRequest) else AdmittedStream
+        response = StreamingHttpResponse(
+            body_class(self._events(query_text), query_admission),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @staticmethod
+    def _events(query_text):
+        """Encode the query service's events in the SSE wire format."""
+        try:
+            for event, data in QueryService.stream_query(query_text):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+
 class QueryHistoryView(APIView):
     """API view for retrieving query history."""
     
     def get(self, request):
-        """Get all query history."""
+        """Get a page of query history, newest first.
+        
+        Query parameters: ``cursor`` (from the previous page's ``next``
+        link), ``page_size`` and ``fields`` (comma-separated, e.g.
+        ``id,query_text,timestamp`` to leave out the response text).
+        """
+        try:
+            fields = QueryHistorySerializer.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            queries = QueryService.get_query_history()
-            serializer = QueryHistorySerializer(queries, many=True)
-            return Response(serializer.data)
+            queries = QueryService.get_query_history(fields)
+            paginator = QueryHistoryPagination()
+            page = paginator.paginate_queryset(queries, request, view=self)
+            serializer = QueryHistorySerializer(page, many=True, fields=fields)
+            return paginator.get_paginated_response(serializer.data)
         except Exception as e:
             logger.error(f"Error fetching query history: {str(e)}")
             return Response(
@@ -1,4 +1,5 @@
 import logging
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -21,4 +22,44 @@ class SystemInfoView(APIView):
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            ) 
\ No newline at end of file
+            ) 
+
+
+class SystemMetricsView(APIView):
+    """API view exposing per-stage latency histograms and event counters for Prometheus."""
+    
+    def get(self, request):
+        """Get metrics in the Prometheus text exposition format."""
+        try:
+            return HttpResponse(
+                SystemService.get_metrics(),
+                content_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+        except Exception as e:
+            logger.error(f"Error rendering metrics: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class SystemReadyView(APIView):
+    """API view for load balancer readiness probes."""
+    
+    def get(self, request):
+        """Report ready (200) once warmup has finished, otherwise 503 with its progress.
+        
+        The first probe starts warmup in the background.
+        """
+        try:
+            state = SystemService.get_readiness()
+            return Response(
+                state,
+                status=status.HTTP_200_OK if state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        except Exception as e:
+            logger.error(f"Error checking readiness: {str(e)}")
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
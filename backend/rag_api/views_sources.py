@@ -10,9 +10,10 @@ from rest_framework.response import Response
 
 from .models import Document
 from .serializers import QuerySerializer
+from .utils import QueryRateThrottle
 
 # Import local RAG system components
-from .embedding import EmbeddingGenerator
+from .embedding import get_embedding_generator
 from .vector_store import VectorStore
 
 # Configure logging
@@ -21,6 +22,7 @@ logger = logging.getLogger(__name__)
 
 class QuerySourcesView(APIView):
     """API view for retrieving only the sources for a query without generating a response."""
+    throttle_classes = [QueryRateThrottle]
     
     def post(self, request):
         """Process a query and return only the relevant sources."""
@@ -31,7 +33,7 @@ class QuerySourcesView(APIView):
             
             try:
                 # Initialize RAG components
-                embedding_generator = EmbeddingGenerator()
+                embedding_generator = get_embedding_generator()
                 vector_store = VectorStore()
                 
                 logger.info(f"Processing query for sources only: {query_text[:50]}...")
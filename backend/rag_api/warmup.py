@@ -0,0 +1,168 @@
+"""Warmup and readiness for the RAG system.
+
+A new worker imports Chroma, Cohere, Docling and Gemini on first use,
+loads the HNSW index into memory on its first search and Docling's
+models on its first upload. Warmup does that work up front, step by
+step, so a readiness probe can keep the load balancer away until it is
+done. The steps run in ``WARMUP_STEPS`` order:
+
+- ``vector_store``: open every shard and load its index with a one-result search
+- ``embedding``: create the shared embedding generator and its Cohere client
+- ``generation``: construct the generation backend
+- ``document_processor``: construct the shared Docling converter and its PDF pipeline
+- ``query``: embed ``WARMUP_QUERY`` and search with it (no answer is generated)
+
+Warmup starts in a background thread on the first readiness probe, or
+whenever ``warmup.ensure_started()`` is called, and is retried by the next
+probe if a step fails.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from .rag_config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _warm_vector_store() -> Dict[str, Any]:
+    """Open every shard and load its index into memory with a one-result search."""
+    from .vector_store import VectorStore
+    
+    vector_store = VectorStore()
+    vector_store.load_index()
+    
+    return {
+        "chunks": vector_store.count(),
+        "shards": vector_store.num_shards,
+        "version": vector_store.index_version.current(),
+    }
+
+
+def _warm_embedding() -> Dict[str, Any]:
+    """Create the process's shared embedding generator and its Cohere client."""
+    from .embedding import get_embedding_generator
+    
+    generator = get_embedding_generator()
+    if config.embedding_backend == "cohere":
+        generator.client
+    return {"backend": config.embedding_backend, "model": generator.model}
+
+
+def _warm_generation() -> Dict[str, Any]:
+    """Import and construct the generation backend."""
+    from .generation_backends import get_generation_backend
+    
+    return {"backend": get_generation_backend().name}
+
+
+def _warm_document_processor() -> Dict[str, Any]:
+    """Construct the shared document processor and load Docling's PDF pipeline."""
+    from .document_processor import get_document_processor
+    
+    converter = get_document_processor().converter
+    if hasattr(converter, "initialize_pipeline"):
+        from docling.datamodel.base_models import InputFormat
+        
+        converter.initialize_pipeline(InputFormat.PDF)
+    return {}
+
+
+def _warm_query() -> Dict[str, Any]:
+    """Embed ``WARMUP_QUERY`` and search with it, as a query would."""
+    if not config.warmup_query:
+        return {"skipped": True}
+    
+    from .services.query_service import QueryService
+    from .vector_store import VectorStore
+    
+    query_embedding = QueryService.embed_query(config.warmup_query)
+    search_results = QueryService.search(VectorStore(), query_embedding)
+    return {"results": len(search_results.get("ids", [[]])[0])}
+
+
+# Warmup steps by name, in the order they are listed in the defaults
+STEPS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "vector_store": _warm_vector_store,
+    "embedding": _warm_embedding,
+    "generation": _warm_generation,
+    "document_processor": _warm_document_processor,
+    "query": _warm_query,
+}
+
+
+class Warmup:
+    """Runs the configured warmup steps once per process and tracks readiness."""
+    
+    def __init__(self):
+        """Initialize a warmup that has not started yet."""
+        self.status = "pending"
+        self.steps = {}
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether every step has finished successfully."""
+        return self.status == "ready"
+    
+    def ensure_started(self) -> None:
+        """Start warmup in a background thread, unless it is running or done.
+        
+        A failed warmup is started again, so a transient error (e.g. Cohere
+        being unreachable) does not keep the worker out of rotation.
+        """
+        with self._lock:
+            if self.status in ("running", "ready"):
+                return
+            self.status = "running"
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+    
+    def run(self) -> None:
+        """Run each configured step in order, recording how long it took."""
+        self.status = "running"
+        self.steps = {}
+        self.error = None
+        start = time.perf_counter()
+        
+        name = None
+        step_start = start
+        try:
+            for name in config.warmup_steps:
+                if name not in STEPS:
+                    raise ValueError(f"Unknown warmup step '{name}', expected one of: {', '.join(STEPS)}")
+                
+                step_start = time.perf_counter()
+                detail = STEPS[name]()
+                self.steps[name] = {"seconds": round(time.perf_counter() - step_start, 3), **detail}
+                logger.info(f"Warmup step {name} took {self.steps[name]['seconds']:.2f}s")
+        except Exception as e:
+            self.steps[name] = {"seconds": round(time.perf_counter() - step_start, 3), "error": str(e)}
+            self.error = f"{name}: {str(e)}"
+            self.status = "failed"
+            logger.error(f"Warmup failed at step {self.error}")
+        else:
+            self.status = "ready"
+        finally:
+            self.seconds = round(time.perf_counter() - start, 3)
+        
+        if self.ready:
+            logger.info(f"Warmup finished in {self.seconds:.2f}s")
+    
+    def state(self) -> Dict[str, Any]:
+        """Get the warmup status, per-step timings and any error."""
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": dict(self.steps),
+            "error": self.error,
+        }
+
+
+# Process-wide warmup
+warmup = Warmup()
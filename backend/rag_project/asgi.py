@@ -1,4 +1,9 @@
-"""ASGI config for rag_project project."""
+"""ASGI config for rag_project project.
+
+Serve with an ASGI server to use the async query path (/api/query/async/):
+
+    uvicorn rag_project.asgi:application --workers 2
+"""
 
 import os
 
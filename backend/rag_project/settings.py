@@ -66,11 +66,67 @@ TEMPLATES = [
 WSGI_APPLICATION = 'rag_project.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_ENGINE=sqlite (default) or postgres. SQLite connections get the
+# SQLITE_PRAGMAS below on connect (see rag_api.db): WAL lets readers run
+# alongside the history writer and uploads, and the busy timeout makes
+# writers wait for the lock instead of failing with "database is locked".
+# Postgres keeps connections open for DATABASE_CONN_MAX_AGE seconds.
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'rag'),
+            'USER': os.getenv('POSTGRES_USER', 'rag'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait for a write lock
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)),
+            },
+        }
     }
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Safe with WAL: a crash can lose the last commits, never corrupt the file
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20)) * 1000,
+    # Negative values are KiB: a 64 MiB page cache per connection
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456,
+    'foreign_keys': 'ON',
+}
+
+# Caches
+# The 'retrieval' alias holds vector search results. LocMemCache is per
+# process; point it at Redis (django.core.cache.backends.redis.RedisCache)
+# or a FileBasedCache directory to share entries across worker processes.
+RETRIEVAL_CACHE_BACKEND = os.getenv('RETRIEVAL_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+RETRIEVAL_CACHE = {
+    'BACKEND': RETRIEVAL_CACHE_BACKEND,
+    'LOCATION': os.getenv('RETRIEVAL_CACHE_LOCATION', 'rag-retrieval'),
+    'TIMEOUT': int(os.getenv('RETRIEVAL_CACHE_TTL', 3600)),
+}
+if not RETRIEVAL_CACHE_BACKEND.endswith(('RedisCache', 'MemcachedCache', 'PyMemcacheCache', 'PyLibMCCache')):
+    RETRIEVAL_CACHE['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('RETRIEVAL_CACHE_MAX_ENTRIES', 10000))}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'retrieval': RETRIEVAL_CACHE,
 }
 
 # Password validation
@@ -120,13 +176,129 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'EXCEPTION_HANDLER': 'rag_api.utils.error_handlers.handle_exception',
+    # Per-client query rate limit, e.g. '60/minute' (empty, the default, for no
+    # limit). Counts are kept in the default cache, so they are per process with locmem
+    'DEFAULT_THROTTLE_RATES': {
+        'query': os.getenv('QUERY_RATE_LIMIT', '') or None,
+    },
+    # Proxies in front of the app, so clients are identified by X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None,
 }
 
 # RAG System settings
 RAG_SETTINGS = {
     'CHROMA_PERSIST_DIRECTORY': os.getenv('CHROMA_PERSIST_DIRECTORY', os.path.join(PROJECT_ROOT, 'data/chroma')),
+    # Number of collections chunks are partitioned across, and how writes are
+    # routed: 'id' hashes the chunk ID, any other value names a metadata field
+    # (e.g. 'document_id' or 'tenant') whose chunks are kept together
+    'VECTOR_SHARDS': int(os.getenv('VECTOR_SHARDS', 1)),
+    'SHARD_KEY': os.getenv('SHARD_KEY', 'document_id'),
+    'SHARD_SEARCH_WORKERS': int(os.getenv('SHARD_SEARCH_WORKERS', 8)),
+    # Where collections live: 'embedded' (a Chroma directory opened by every
+    # process), 'server' (one Chroma server shared by all processes) or
+    # 'snapshot' (one writer publishes read-only copies that readers serve).
+    # The role is 'writer' for the process that ingests, 'reader' for query
+    # workers that must never write.
+    'VECTOR_STORE_MODE': os.getenv('VECTOR_STORE_MODE', 'embedded'),
+    'VECTOR_STORE_ROLE': os.getenv('VECTOR_STORE_ROLE', 'writer'),
+    'CHROMA_SERVER_HOST': os.getenv('CHROMA_SERVER_HOST', 'localhost'),
+    'CHROMA_SERVER_PORT': int(os.getenv('CHROMA_SERVER_PORT', 8001)),
+    'VECTOR_SNAPSHOT_DIRECTORY': os.getenv('VECTOR_SNAPSHOT_DIRECTORY', os.path.join(PROJECT_ROOT, 'data/chroma_published')),
+    'VECTOR_SNAPSHOT_KEEP': int(os.getenv('VECTOR_SNAPSHOT_KEEP', 3)),
+    # HNSW index parameters applied when a collection is created (or a shard
+    # rebuilt). Defaults match Chroma's own; tune with `manage.py tune_hnsw`.
+    'HNSW': {
+        'SPACE': os.getenv('HNSW_SPACE', 'l2'),
+        'M': int(os.getenv('HNSW_M', 16)),
+        'EF_CONSTRUCTION': int(os.getenv('HNSW_EF_CONSTRUCTION', 100)),
+        'EF_SEARCH': int(os.getenv('HNSW_EF_SEARCH', 10)),
+    },
+    # Per-collection overrides of the HNSW keys above, e.g. {'documents': {'EF_SEARCH': 64}}
+    'COLLECTION_HNSW': {},
+    # Search result cache, stored in the CACHES alias below
+    'RETRIEVAL_CACHE_ENABLED': os.getenv('RETRIEVAL_CACHE_ENABLED', 'True') == 'True',
+    'RETRIEVAL_CACHE_ALIAS': 'retrieval',
+    'RETRIEVAL_CACHE_TTL': int(os.getenv('RETRIEVAL_CACHE_TTL', 3600)),
+    # Semantic answer cache (opt-in): reuse an answer when a query's embedding
+    # has at least this cosine similarity to a recent query on the same index
+    # version
+    'ANSWER_CACHE_ENABLED': os.getenv('ANSWER_CACHE_ENABLED', 'False') == 'True',
+    'ANSWER_CACHE_THRESHOLD': float(os.getenv('ANSWER_CACHE_THRESHOLD', 0.95)),
+    'ANSWER_CACHE_SIZE': int(os.getenv('ANSWER_CACHE_SIZE', 1000)),
+    'ANSWER_CACHE_TTL': int(os.getenv('ANSWER_CACHE_TTL', 86400)),
+    'ANSWER_CACHE_REFRESH': int(os.getenv('ANSWER_CACHE_REFRESH', 10)),
     'DOCUMENTS_DIRECTORY': os.getenv('DOCUMENTS_DIRECTORY', os.path.join(PROJECT_ROOT, 'documents')),
     'CHUNK_SIZE': int(os.getenv('CHUNK_SIZE', 1000)),
     'CHUNK_OVERLAP': int(os.getenv('CHUNK_OVERLAP', 200)),
     'TOP_K_RESULTS': int(os.getenv('TOP_K_RESULTS', 5)),
+    # Conversations: a follow-up reuses the previous turn's retrieved chunks,
+    # without embedding or searching, when at least this fraction of its
+    # content words appear in that turn's question, answer or chunks; the
+    # last few turns are included in the prompt
+    'SESSION_REUSE_THRESHOLD': float(os.getenv('SESSION_REUSE_THRESHOLD', 0.8)),
+    'SESSION_HISTORY_TURNS': int(os.getenv('SESSION_HISTORY_TURNS', 3)),
+    # Query history is written after the response by a background thread in
+    # batches ('background'), or inline before responding ('sync')
+    'HISTORY_WRITE_MODE': os.getenv('HISTORY_WRITE_MODE', 'background'),
+    'HISTORY_BATCH_SIZE': int(os.getenv('HISTORY_BATCH_SIZE', 50)),
+    'HISTORY_FLUSH_INTERVAL': float(os.getenv('HISTORY_FLUSH_INTERVAL', 0.2)),
+    'HISTORY_QUEUE_SIZE': int(os.getenv('HISTORY_QUEUE_SIZE', 10000)),
+    # Retention enforced by `manage.py archive_history`: rows older than the
+    # given days or beyond the newest N rows (0 disables either limit) move
+    # to Parquet files under the archive directory
+    'HISTORY_RETENTION_DAYS': int(os.getenv('HISTORY_RETENTION_DAYS', 90)),
+    'HISTORY_RETENTION_ROWS': int(os.getenv('HISTORY_RETENTION_ROWS', 0)),
+    'HISTORY_ARCHIVE_DIRECTORY': os.getenv('HISTORY_ARCHIVE_DIRECTORY', os.path.join(PROJECT_ROOT, 'data/history_archive')),
+    # Thread pools for blocking Chroma and ORM calls on the async query path
+    'ASYNC_VECTOR_STORE_WORKERS': int(os.getenv('ASYNC_VECTOR_STORE_WORKERS', 8)),
+    'ASYNC_DATABASE_WORKERS': int(os.getenv('ASYNC_DATABASE_WORKERS', 4)),
+    # Threads producing server-sent event streams under ASGI, one per stream step in progress
+    'ASYNC_STREAM_WORKERS': int(os.getenv('ASYNC_STREAM_WORKERS', 16)),
+    # Admission control for query endpoints, per worker process: at most
+    # QUERY_MAX_IN_FLIGHT queries run at once (0 disables the limit), up to
+    # QUERY_QUEUE_SIZE more wait for a slot, each for at most
+    # QUERY_QUEUE_TIMEOUT seconds, and the rest get a 503 with Retry-After
+    'QUERY_MAX_IN_FLIGHT': int(os.getenv('QUERY_MAX_IN_FLIGHT', 8)),
+    'QUERY_QUEUE_SIZE': int(os.getenv('QUERY_QUEUE_SIZE', 16)),
+    'QUERY_QUEUE_TIMEOUT': float(os.getenv('QUERY_QUEUE_TIMEOUT', 2)),
+    # Estimated-token budget for the retrieved context packed into a prompt
+    'CONTEXT_TOKEN_BUDGET': int(os.getenv('CONTEXT_TOKEN_BUDGET', 3000)),
+    # Seconds a query may take overall (clients may pass a shorter or longer
+    # 'deadline'), and each stage's share of the time still left when it starts
+    'QUERY_DEADLINE': float(os.getenv('QUERY_DEADLINE', 30)),
+    'QUERY_DEADLINE_SPLIT': {
+        'embed': 0.2,
+        'search': 0.1,
+        'generate': 0.7,
+    },
+    # Text generation backend ('gemini' or the offline 'local' stand-in), and
+    # an optional backend that takes over for calls where the first one fails
+    'GENERATION_BACKEND': os.getenv('GENERATION_BACKEND', 'gemini'),
+    'GENERATION_FALLBACK': os.getenv('GENERATION_FALLBACK', ''),
+    'GENERATION_MODEL': os.getenv('GENERATION_MODEL', 'models/gemini-2.0-pro-exp-02-05'),
+    # Local stand-in: seconds before the first token, tokens per second after
+    # it, answer length, and the fraction of calls that fail (seeded)
+    'LOCAL_GENERATION': {
+        'LATENCY': float(os.getenv('LOCAL_GENERATION_LATENCY', 0.5)),
+        'TOKEN_RATE': float(os.getenv('LOCAL_GENERATION_TOKEN_RATE', 50)),
+        'RESPONSE_TOKENS': int(os.getenv('LOCAL_GENERATION_RESPONSE_TOKENS', 120)),
+        'ERROR_RATE': float(os.getenv('LOCAL_GENERATION_ERROR_RATE', 0)),
+        'SEED': int(os.getenv('LOCAL_GENERATION_SEED', 0)),
+    },
+    # Steps run before /api/system/ready/ reports ready (see rag_api.warmup),
+    # and the query embedded and searched by the 'query' step ('' skips it)
+    'WARMUP_STEPS': [
+        step.strip()
+        for step in os.getenv('WARMUP_STEPS', 'vector_store,embedding,generation,document_processor,query').split(',')
+        if step.strip()
+    ],
+    'WARMUP_QUERY': os.getenv('WARMUP_QUERY', 'warmup'),
+    # Embedding backend: 'cohere', or the offline 'local' stand-in that hashes
+    # words into vectors after a simulated per-call and per-text delay
+    'EMBEDDING_BACKEND': os.getenv('EMBEDDING_BACKEND', 'cohere'),
+    'LOCAL_EMBEDDING': {
+        'LATENCY': float(os.getenv('LOCAL_EMBEDDING_LATENCY', 0.05)),
+        'PER_TEXT_LATENCY': float(os.getenv('LOCAL_EMBEDDING_PER_TEXT_LATENCY', 0.001)),
+        'DIMENSION': int(os.getenv('LOCAL_EMBEDDING_DIMENSION', 1024)),
+    },
 }
\ No newline at end of file
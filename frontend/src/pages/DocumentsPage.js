@@ -9,6 +9,7 @@ import {
   TableContainer, 
   TableHead, 
   TableRow,
+  TablePagination,
   Dialog,
   DialogActions,
   DialogContent,
@@ -23,6 +24,9 @@ import axios from 'axios';
 
 const DocumentsPage = () => {
   const [documents, setDocuments] = useState([]);
+  const [count, setCount] = useState(0);
+  const [page, setPage] = useState(0);
+  const [rowsPerPage, setRowsPerPage] = useState(50);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [uploadOpen, setUploadOpen] = useState(false);
@@ -34,12 +38,16 @@ const DocumentsPage = () => {
 
   useEffect(() => {
     fetchDocuments();
-  }, []);
+  }, [page, rowsPerPage]); // eslint-disable-line react-hooks/exhaustive-deps
 
   const fetchDocuments = async () => {
     try {
-      const response = await axios.get('/api/documents/');
-      setDocuments(response.data);
+      // The API pages from 1, the table from 0
+      const response = await axios.get('/api/documents/', {
+        params: { page: page + 1, page_size: rowsPerPage }
+      });
+      setDocuments(response.data.results);
+      setCount(response.data.count);
       setLoading(false);
     } catch (err) {
       setError('Failed to load documents');
@@ -48,6 +56,15 @@ const DocumentsPage = () => {
     }
   };
 
+  const handleChangePage = (event, newPage) => {
+    setPage(newPage);
+  };
+
+  const handleChangeRowsPerPage = (event) => {
+    setRowsPerPage(parseInt(event.target.value, 10));
+    setPage(0);
+  };
+
   const handleUploadOpen = () => {
     setUploadOpen(true);
     setTitle('');
@@ -164,6 +181,15 @@ const DocumentsPage = () => {
             )}
           </TableBody>
         </Table>
+        <TablePagination
+          component="div"
+          count={count}
+          page={page}
+          onPageChange={handleChangePage}
+          rowsPerPage={rowsPerPage}
+          onRowsPerPageChange={handleChangeRowsPerPage}
+          rowsPerPageOptions={[25, 50, 100, 200]}
+        />
       </TableContainer>
 
       {/* Upload Dialog */}
@@ -15,7 +15,8 @@ import {
   AccordionSummary,
   AccordionDetails,
   Chip,
-  Box
+  Box,
+  Button
 } from '@mui/material';
 import { ExpandMore as ExpandMoreIcon } from '@mui/icons-material';
 import axios from 'axios';
@@ -23,14 +24,17 @@ import ReactMarkdown from 'react-markdown';
 
 const QueryHistoryPage = () => {
   const [queryHistory, setQueryHistory] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     const fetchQueryHistory = async () => {
       try {
         const response = await axios.get('/api/query/history/');
-        setQueryHistory(response.data);
+        setQueryHistory(response.data.results);
+        setNextPage(response.data.next);
         setLoading(false);
       } catch (err) {
         setError('Failed to load query history');
@@ -42,6 +46,20 @@ const QueryHistoryPage = () => {
     fetchQueryHistory();
   }, []);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      // Keep only the cursor of the absolute "next" link, so the request goes through the same proxy
+      const response = await axios.get('/api/query/history/' + new URL(nextPage).search);
+      setQueryHistory((previous) => [...previous, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (err) {
+      setError('Failed to load older queries');
+      console.error(err);
+    }
+    setLoadingMore(false);
+  };
+
   if (loading) {
     return (
       <div style={{ display: 'flex', justifyContent: 'center', marginTop: '2rem' }}>
@@ -124,6 +142,14 @@ const QueryHistoryPage = () => {
           </Table>
         </TableContainer>
       )}
+
+      {nextPage && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+          </Button>
+        </Box>
+      )}
     </div>
   );
 };